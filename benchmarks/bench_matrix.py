@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+"""
+Matrix benchmark for rpn-15c.
+Dimensions A as an n×n system and B as its right side with the DIM key,
+solves it with ÷ through the cached LU factors, checks the residual of the
+solution and reports DIMs and solves per second.
+
+    python benchmarks/bench_matrix.py [--size N] [--runs N]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", "src" ) )
+
+from textual_rpn15c.keypad import keystrokes
+from textual_rpn15c.rpn_engine import RPN_Engine
+
+# RESULT C, then C = B ÷ A
+SOLVE = "shift-f eex ten-x rcl chs exp-x rcl chs sqrt-x division".split()
+
+
+def dimension( engine, n:int ) -> None:
+    """DIM A n×n and B n×1, filled with a diagonally dominant system"""
+    engine.run( keystrokes( f"{n} {n}" ) + [ "shift-f", "sin", "sqrt-x" ]
+                + keystrokes( f"{n} 1" ) + [ "shift-f", "sin", "exp-x" ] )
+    a, b = engine.matrices[ 'A' ], engine.matrices[ 'B' ]
+    rng = random.Random( n )
+    for i in range( n*n ):
+        a.data[i] = rng.random() + ( n if i % ( n + 1 ) == 0 else 0 )
+    for i in range( n ):
+        b.data[i] = i
+    a.modified()
+    b.modified()
+
+
+def residual( engine, n:int ) -> float:
+    a, b, c = engine.matrices[ 'A' ], engine.matrices[ 'B' ], engine.matrices[ 'C' ]
+    return max( abs( sum( a.data[ row*n + col ]*c.data[col] for col in range( n ) ) - b.data[row] )
+                for row in range( n ) )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[1] )
+    parser.add_argument( "--size", type=int, default=50 )
+    parser.add_argument( "--runs", type=int, default=20 )
+    args = parser.parse_args()
+    n = args.size
+
+    engine = RPN_Engine()
+    dimension( engine, n )
+    engine.run( SOLVE )
+    error = residual( engine, n )
+    if not error < 1e-9*n:
+        sys.exit( f"{n}×{n} solve residual {error}" )
+
+    start = time.perf_counter()
+    for _ in range( args.runs ):
+        dimension( RPN_Engine(), n )
+    results = { "dim/s": args.runs/( time.perf_counter() - start ) }
+    start = time.perf_counter()
+    for _ in range( args.runs ):
+        # filling A again drops the cached factors
+        engine.matrices[ 'A' ].modified()
+        engine.run( SOLVE )
+    results[ "solve/s" ] = args.runs/( time.perf_counter() - start )
+    results[ "residual" ] = error
+    for name, value in results.items():
+        print( f"{name:30s} {value:12.4g}" )
+    print( json.dumps( results ) )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+"""
+Numeric backend benchmark for rpn-15c.
+Measures keys per second of a keystroke script mixing arithmetic, powers,
+logarithms and trigonometry, and batch lines per second in this process,
+for every backend: binary float, 10 digit decimal and 34 digit decimal.
+Py,x and Cy,x of the float backend are checked against math.perm and
+math.comb first.
+
+    python benchmarks/bench_numbers.py [--runs N] [--lines N]
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", "src" ) )
+
+from textual_rpn15c.rpn_batch import evaluate_lines
+from textual_rpn15c.rpn_engine import RPN_Engine
+from textual_rpn15c.rpn_numbers import FLOAT, NUMBERS
+
+SCRIPT = ( "digit-7 enter digit-3 addition digit-2 multiplication sqrt-x digit-3 wye-x shift-g ten-x "
+           "digit-3 digit-0 sin digit-6 digit-0 cos division inverse-x shift-g sqrt-x exp-x "
+           "digit-5 shift-f digit-0 digit-4 subtraction shift-g chs" ).split()
+LINES = [ "0.1 0.2 + 3 *", "2 sqrt sq", "30 sin 60 cos +", "5 ! inv", "2 10 ^ log", "1 exp ln" ]
+
+
+def check_combinatorics( limit:int=200 ) -> None:
+    """Exit when a float Py,x or Cy,x below 2⁵³ is not exact, or a larger one is off in the 12th digit"""
+    for n in range( limit ):
+        for k in range( n + 1 ):
+            for name, function, exact in ( ( "C", FLOAT.combinations, math.comb( n, k ) ),
+                                           ( "P", FLOAT.permutations, math.perm( n, k ) ) ):
+                if exact > 1e300:
+                    continue
+                value = function( float( n ), float( k ) )
+                if value != float( exact ) if exact < 2**53 else not math.isclose( value, exact, rel_tol=1e-12 ):
+                    sys.exit( f"{name}{n},{k} = {value!r} is not {exact}" )
+
+
+def keys_per_second( numbers, runs:int ) -> float:
+    engine = RPN_Engine( numbers )
+    run = engine.run
+    start = time.perf_counter()
+    for _ in range( runs ):
+        run( SCRIPT )
+    return runs*len( SCRIPT )/( time.perf_counter() - start )
+
+
+def lines_per_second( name:str, n:int ) -> float:
+    lines = [ LINES[ i % len( LINES ) ] for i in range( n ) ]
+    start = time.perf_counter()
+    for _ in evaluate_lines( lines, jobs=1, numbers=name ):
+        pass
+    return n/( time.perf_counter() - start )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[1] )
+    parser.add_argument( "--runs", type=int, default=2000 )
+    parser.add_argument( "--lines", type=int, default=5000 )
+    args = parser.parse_args()
+
+    check_combinatorics()
+    results = {}
+    for name, numbers in NUMBERS.items():
+        results[ f"{name} keys/s" ] = keys_per_second( numbers, args.runs )
+        results[ f"{name} lines/s" ] = lines_per_second( name, args.lines )
+    for name, value in results.items():
+        print( f"{name:30s} {value:12.1f}" )
+    print( json.dumps( { name: round( value, 1 ) for name, value in results.items() } ) )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""
+Session pool benchmark for rpn-15c.
+Measures memory per headless calculator session and how many sessions per
+second can be created, cloned, snapshotted and driven with a short keystroke
+script.
+
+    python benchmarks/bench_sessions.py [--sessions N]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", "src" ) )
+
+from textual_rpn15c.rpn_engine import RPN_Engine
+from textual_rpn15c.rpn_session import SessionPool
+
+SCRIPT = "digit-7 enter digit-3 addition digit-2 multiplication sqrt-x".split()
+
+
+def rate( n:int, func ) -> float:
+    """Calls per second of func over n iterations"""
+    start = time.perf_counter()
+    for i in range( n ):
+        func( i )
+    return n/( time.perf_counter() - start )
+
+
+def memory_per_session( n:int, make ) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [ make() for _ in range( n ) ]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sessions
+    return ( after - before )/n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[1] )
+    parser.add_argument( "--sessions", type=int, default=10000 )
+    args = parser.parse_args()
+    n = args.sessions
+
+    pool = SessionPool()
+    used = RPN_Engine()
+    used.run( SCRIPT )
+    results = {
+        "bytes/session": memory_per_session( n, RPN_Engine ),
+        "bytes/session cloned": memory_per_session( n, used.clone ),
+        "create/s": rate( n, lambda i: pool.create() ),
+    }
+    ids = list( pool.sessions )
+    results[ "script/s" ] = rate( n, lambda i: pool.run( ids[i], SCRIPT ) )
+    results[ "clone/s" ] = rate( n, lambda i: pool.clone( ids[i] ) )
+    results[ "snapshot/s" ] = rate( n, lambda i: pool.snapshot( ids[i] ) )
+    results[ "sessions" ] = len( pool )
+    for name, value in results.items():
+        print( f"{name:30s} {value:12.1f}" )
+    print( json.dumps( { name: round( value, 1 ) for name, value in results.items() } ) )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+"""
+Startup benchmark for rpn-15c.
+Reports the import time of the package entry points in a fresh interpreter
+and the time from process start to the first frame and to a usable keypad.
+
+    python benchmarks/bench_startup.py [--runs N]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SRC = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", "src" )
+
+IMPORT_PROBE = """
+import time
+t0 = time.perf_counter()
+import {module}
+print( time.perf_counter() - t0 )
+"""
+
+FRAME_PROBE = """
+import asyncio, time
+t0 = time.perf_counter()
+from textual_rpn15c.rpn_15c import RPN_CalculatorApp
+
+async def probe():
+    app = RPN_CalculatorApp()
+    mount_keypad = app.mount_keypad
+    def timed_mount_keypad():
+        app.first_frame = time.perf_counter() - t0
+        mount_keypad()
+    app.mount_keypad = timed_mount_keypad
+    async with app.run_test( size=(130, 35) ) as pilot:
+        await pilot.pause()
+        app.query_one( "#enter" )
+        print( app.first_frame, time.perf_counter() - t0 )
+
+asyncio.run( probe() )
+"""
+
+
+def probe( code:str ) -> list:
+    env = dict( os.environ, PYTHONPATH=SRC )
+    out = subprocess.run( [ sys.executable, "-c", code ], env=env, check=True,
+                          capture_output=True, text=True ).stdout
+    return [ float( field ) for field in out.split() ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[1] )
+    parser.add_argument( "--runs", type=int, default=5 )
+    args = parser.parse_args()
+
+    results = {}
+    for module in ( "textual_rpn15c", "textual_rpn15c.rpn_engine", "textual_rpn15c.rpn_15c" ):
+        results[ "import " + module ] = min( probe( IMPORT_PROBE.format( module=module ) )[0] for _ in range( args.runs ) )
+    frames = [ probe( FRAME_PROBE ) for _ in range( args.runs ) ]
+    results[ "first frame" ] = min( frame[0] for frame in frames )
+    results[ "keypad ready" ] = min( frame[1] for frame in frames )
+    for name, seconds in results.items():
+        print( f"{name:40s} {1000*seconds:8.1f} ms" )
+    print( json.dumps( { name: round( seconds, 6 ) for name, seconds in results.items() } ) )
+
+
+if __name__ == "__main__":
+    main()
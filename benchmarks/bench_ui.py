@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+"""
+UI latency benchmark for rpn-15c.
+Drives RPN_CalculatorApp headlessly with Textual's Pilot, replaying standard
+keystroke workloads, and reports per key press latency percentiles, LCD
+refreshes and repainted lines per key and memory growth over a long session.
+Latency is measured from the button press to the first LCD line painted and
+to the app settling; --click goes through Pilot mouse clicks instead of
+pressing the buttons directly.
+
+    python benchmarks/bench_ui.py [--repeat N] [--click] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "..", "src" ) )
+
+from textual_rpn15c.rpn_15c import RPN_CalculatorApp
+
+SIZE = ( 130, 35 )
+
+DIGITS = [ "digit-%d" % ( n % 10 ) for n in range( 1, 10 ) ] + [ "decimal", "digit-7", "digit-3" ]
+WORKLOADS = {
+    "digit entry": ( DIGITS + [ "enter" ] + [ "backspace" ]*3 )*3,
+    "chained arithmetic": [ "digit-7", "enter", "digit-3", "addition", "digit-2", "multiplication",
+                            "digit-9", "subtraction", "digit-4", "division", "sqrt-x", "inverse-x" ]*4,
+    "trig deg": [ "shift-g", "digit-7" ] + [ "digit-3", "digit-0", "sin", "cos", "tan" ]*6,
+    "trig rad": [ "shift-g", "digit-8" ] + [ "digit-1", "sin", "cos", "tan" ]*6,
+    "trig grad": [ "shift-g", "digit-9" ] + [ "digit-5", "digit-0", "sin", "cos", "tan" ]*6,
+    "self test": [ "on" ]*3,
+}
+LONG_SESSION = WORKLOADS[ "chained arithmetic" ]*20
+
+
+class Counters:
+    """Counts LCD refresh requests and line renders by wrapping the instance methods"""
+
+    def __init__( self, lcd ) -> None:
+        self.refreshes = self.rendered = self.built = 0
+        self.painted = None
+        refresh, render_line, build_line = lcd.refresh, lcd.render_line, lcd.build_line
+
+        def counted_refresh( *args, **kwargs ):
+            self.refreshes += 1
+            return refresh( *args, **kwargs )
+
+        def counted_render_line( y ):
+            self.rendered += 1
+            if self.painted is None:
+                self.painted = time.perf_counter()
+            return render_line( y )
+
+        def counted_build_line( y ):
+            self.built += 1
+            return build_line( y )
+
+        lcd.refresh, lcd.render_line, lcd.build_line = counted_refresh, counted_render_line, counted_build_line
+
+    def snapshot( self ) -> tuple:
+        return self.refreshes, self.rendered, self.built
+
+
+def percentile( values:list, fraction:float ) -> float:
+    values = sorted( values )
+    return values[ min( len( values ) - 1, int( fraction*len( values ) ) ) ]
+
+
+async def press( app, pilot, key:str, click:bool ) -> None:
+    if click:
+        await pilot.click( "#" + key )
+    else:
+        app.query_one( "#" + key ).press()
+    await pilot.pause()
+
+
+async def replay( keys:list, repeat:int, click:bool=False ) -> dict:
+    """Press keys on a fresh app repeat times, timing each press until the LCD paints and the app settles"""
+    settled = []
+    painted = []
+    counts = [ 0, 0, 0 ]
+    app = RPN_CalculatorApp()
+    async with app.run_test( size=SIZE ) as pilot:
+        await pilot.pause()
+        counters = Counters( app.lcd )
+        for _ in range( repeat ):
+            for key in keys:
+                before = counters.snapshot()
+                counters.painted = None
+                t0 = time.perf_counter()
+                await press( app, pilot, key, click )
+                settled.append( time.perf_counter() - t0 )
+                if counters.painted is not None:
+                    painted.append( counters.painted - t0 )
+                counts = [ total + after - start for total, after, start in zip( counts, counters.snapshot(), before ) ]
+            if app.lcd.self_test:
+                app.state_clear()
+    n = len( settled )
+    painted = painted or [ 0.0 ]
+    return {
+        "keys": n,
+        "paint p50 ms": 1000*percentile( painted, 0.50 ),
+        "paint p90 ms": 1000*percentile( painted, 0.90 ),
+        "paint p99 ms": 1000*percentile( painted, 0.99 ),
+        "settle p50 ms": 1000*percentile( settled, 0.50 ),
+        "settle p90 ms": 1000*percentile( settled, 0.90 ),
+        "settle p99 ms": 1000*percentile( settled, 0.99 ),
+        "refreshes/key": counts[0]/n,
+        "lines rendered/key": counts[1]/n,
+        "lines built/key": counts[2]/n,
+    }
+
+
+async def memory_growth( keys:list, click:bool=False ) -> dict:
+    """Traced memory retained after a long session, measured after a warm up"""
+    app = RPN_CalculatorApp()
+    async with app.run_test( size=SIZE ) as pilot:
+        await pilot.pause()
+        for key in keys[:100]:
+            await press( app, pilot, key, click )
+        gc.collect()
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        for key in keys:
+            await press( app, pilot, key, click )
+        gc.collect()
+        end, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return { "keys": len( keys ), "growth KiB": ( end - start )/1024, "peak KiB": ( peak - start )/1024 }
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run( [ "git", "rev-parse", "--short", "HEAD" ], capture_output=True,
+                               text=True, check=True, cwd=os.path.dirname( os.path.abspath( __file__ ) ) ).stdout.strip()
+    except ( OSError, subprocess.CalledProcessError ):
+        return None
+
+
+def compare( results:dict, baseline:dict ) -> None:
+    """Print the change of every metric against a previous run"""
+    print( f"\ncompared with {baseline.get( 'commit' )}" )
+    for workload, metrics in results[ "workloads" ].items():
+        old = baseline.get( "workloads", {} ).get( workload, {} )
+        for name, value in metrics.items():
+            if name in old and old[ name ]:
+                print( f"{workload:20s} {name:20s} {old[ name ]:10.3f} -> {value:10.3f} {100*( value/old[ name ] - 1 ):+7.1f}%" )
+
+
+async def run( args ) -> dict:
+    results = { "commit": commit(), "python": sys.version.split()[0], "click": args.click, "workloads": {} }
+    for name, keys in WORKLOADS.items():
+        results[ "workloads" ][ name ] = await replay( keys, args.repeat, args.click )
+    results[ "workloads" ][ "long session" ] = await memory_growth( LONG_SESSION, args.click )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser( description=__doc__.splitlines()[1] )
+    parser.add_argument( "--repeat", type=int, default=3, help="times each workload is replayed" )
+    parser.add_argument( "--click", action="store_true", help="press keys with Pilot mouse clicks" )
+    parser.add_argument( "--output", help="write the results as JSON to this file" )
+    parser.add_argument( "--compare", metavar="BASELINE", help="JSON results of an earlier run" )
+    args = parser.parse_args()
+
+    results = asyncio.run( run( args ) )
+    for workload, metrics in results[ "workloads" ].items():
+        print( f"{workload:20s} " + "  ".join( f"{name} {value:.3f}" for name, value in metrics.items() ) )
+    if args.output:
+        with open( args.output, "w" ) as output:
+            json.dump( results, output, indent=2 )
+    else:
+        print( json.dumps( results ) )
+    if args.compare:
+        with open( args.compare ) as baseline:
+            compare( results, json.load( baseline ) )
+
+
+if __name__ == "__main__":
+    main()
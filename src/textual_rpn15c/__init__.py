@@ -1,4 +1,134 @@
-from .rpn_15c import *
+"""
+An RPN calculator with an HP 15c look for your terminal.
+Textual is only imported once the TUI is actually launched.
+"""
+
+import os
+import sys
+
+__version__ = "0.1.0"
+
+
+def __getattr__( name ):
+    # keep `from textual_rpn15c import RPN_CalculatorApp` working without an eager import
+    from . import rpn_15c
+    try:
+        return getattr( rpn_15c, name )
+    except AttributeError:
+        raise AttributeError( f"module {__name__!r} has no attribute {name!r}" ) from None
+
+
+def print_statistics( statistics ) -> None:
+    print( "n", statistics.n )
+    from .rpn_program import RPN_Error
+    for name, method in ( ( "mean", statistics.mean ), ( "s", statistics.std_dev ),
+                          ( "L.R.", statistics.linear_regression ) ):
+        try:
+            print( name, *method() )
+        except RPN_Error:
+            pass
+
+
+def evaluate( args ) -> None:
+    """-e and --samples: evaluate headlessly and print the result"""
+    from .keypad import keystrokes
+    from .rpn_engine import RPN_Engine
+    from .rpn_numbers import NUMBERS
+    engine = RPN_Engine( NUMBERS[ args.numbers ] )
+    if args.seed is not None:
+        engine.random.seed( args.seed )
+    if args.samples is not None:
+        label = None
+        if args.eval is not None:
+            # the keys become the program at label A, which SOLVE-style calls evaluate per draw
+            engine.run( [ "shift-g", "rtos", "shift-f", "sst", "sqrt-x" ] + keystrokes( args.eval, RPN_Engine.KEYMAP )
+                        + [ "shift-g", "gsb", "shift-g", "rtos" ] )
+            label = "A"
+        engine.accumulate_random( args.samples, label )
+        print_statistics( engine.statistics )
+        return
+    if args.vector is not None:
+        engine.load_vector( sys.stdin if args.vector == "-" else args.vector, args.column )
+    engine.run( keystrokes( args.eval, RPN_Engine.KEYMAP ) )
+    engine.enter_actions()
+    if args.vector is not None:
+        from .rpn_vector import Vector
+        if isinstance( engine.state.X, Vector ):
+            # the column goes to stdout, or to the output file with the LCD printed as usual
+            if args.output is None or args.output == "-":
+                engine.export_vector( sys.stdout )
+                return
+            engine.export_vector( args.output )
+    print( engine.display() )
+
+
 def main() -> None:
-    main_cli()
-#    print("Hello from textual-rpn-15c!")
+    import argparse
+    parser = argparse.ArgumentParser( prog="rpn-15c", description="An RPN calculator with an HP 15c look." )
+    parser.add_argument( "--version", action="version", version=f"%(prog)s {__version__}" )
+    parser.add_argument( "-e", "--eval", metavar="KEYS",
+                         help="evaluate key ids, numbers and expression words headlessly and print X, "
+                              "an error goes to stderr with exit status 1" )
+    parser.add_argument( "--stats", metavar="FILE",
+                         help="accumulate x,y pairs, one per line, from FILE or - for stdin and print the Σ+ statistics" )
+    parser.add_argument( "-b", "--batch", metavar="FILE", nargs="+",
+                         help="evaluate every line of the files, - for stdin, and print X or the error per line" )
+    parser.add_argument( "-j", "--jobs", metavar="N", type=int,
+                         help="worker processes for --batch, one per core by default" )
+    parser.add_argument( "--profile", metavar="FILE", nargs="?", const="rpn-15c-profile.json",
+                         help="time every operation and LCD render, F12 shows the timings, "
+                              "written as JSON to FILE on exit or SIGUSR1" )
+    parser.add_argument( "--memory", metavar="FILE",
+                         help="keep the calculator state in FILE between runs, "
+                              "$XDG_STATE_HOME/rpn-15c/memory by default" )
+    parser.add_argument( "--no-memory", action="store_true",
+                         help="start from the power on state and keep nothing on exit" )
+    parser.add_argument( "--history", metavar="N", type=int, default=1000,
+                         help="undo levels kept for Ctrl+Z and Ctrl+Y, 0 switches undo off (default 1000)" )
+    parser.add_argument( "--samples", metavar="N", type=int,
+                         help="accumulate N RAN# draws headlessly and print the Σ+ statistics: with -e the "
+                              "keys are a function of the draw in X giving x and y is the draw, "
+                              "without -e x and y are two draws" )
+    parser.add_argument( "--seed", metavar="X", type=float,
+                         help="seed the RAN# generator as STO RAN# does before --samples or -e" )
+    parser.add_argument( "--numbers", choices=( "float", "decimal", "precise" ), default="float",
+                         help="arithmetic for -e, --batch and the TUI: binary floats, 10 digit decimal like "
+                              "the 15c or 34 digit decimal (default float)" )
+    parser.add_argument( "--vector", metavar="FILE",
+                         help="load the values of FILE, one per line, - for stdin with -e, into X as a vector "
+                              "that every key transforms at once, for -e or the TUI" )
+    parser.add_argument( "--column", metavar="N", type=int, default=0,
+                         help="the field of each --vector line to load, counting from 0 (default 0)" )
+    parser.add_argument( "--output", metavar="FILE",
+                         help="write the vector in X to FILE after -e, stdout by default, or on Ctrl+E in the TUI, "
+                              "the --vector file with .out appended by default" )
+    args = parser.parse_args()
+    if args.batch:
+        from .rpn_batch import run_batch
+        sys.exit( 1 if run_batch( args.batch, args.jobs, numbers=args.numbers ) else 0 )
+    if args.stats is not None:
+        from .rpn_stats import Statistics
+        statistics = Statistics()
+        if args.stats == "-":
+            statistics.ingest( sys.stdin )
+        else:
+            with open( args.stats ) as lines:
+                statistics.ingest( lines )
+        print_statistics( statistics )
+        sys.exit( 0 )
+    if args.samples is not None or args.eval is not None:
+        from .rpn_batch import error_text
+        try:
+            evaluate( args )
+        except Exception as error:
+            print( error_text( error ), file=sys.stderr )
+            sys.exit( 1 )
+        sys.exit( 0 )
+    from .rpn_15c import main_cli
+    memory = None
+    if not args.no_memory:
+        from .rpn_memory import default_path
+        memory = args.memory or default_path()
+    if args.vector is not None and not os.path.isfile( args.vector ):
+        parser.error( f"--vector {args.vector}: no such file" )
+    main_cli( args.profile, memory, args.history, args.numbers, args.vector, args.column, args.output )
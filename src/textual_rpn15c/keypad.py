@@ -0,0 +1,159 @@
+"""
+Static layout of the 15c keypad, free of any Textual import.
+Each key is (label, f title, g subtitle, button id) in grid order, a nested
+tuple is the CLEAR cluster that shares the third row. The keyboard map and
+the words of RPN expressions translate typed or pasted text to button ids.
+"""
+
+CLEAR_CLUSTER = (
+    ("GSB", "Σ", "  RTN  ", "gsb"),
+    ("R↓", "PRGM", "  R↑   ", "r-down"),
+    ("x ≷ y", "REG", "  RND  ", "x-swap-y"),
+    ("←", "PREFIX", "  CLx  ", "backspace"),
+)
+
+KEYPAD = (
+    ("√x", "A", "  x²   ", "sqrt-x"),
+    ("eˣ", "B", "  LN   ", "exp-x"),
+    ("10ˣ", "C", "  LOG  ", "ten-x"),
+    (" yˣ", "D", "   %   ", "wye-x"),
+    ("1/x", "E", "  Δ%   ", "inverse-x"),
+    ("CHS", " MATRIX", "  ABS  ", "chs"),
+    ("7", "FIX", "  DEG  ", "digit-7"),
+    ("8", "SCI", "  RAD  ", "digit-8"),
+    ("9", "ENG", "  GRD  ", "digit-9"),
+    ("÷", "SOLVE", "  x≤y  ", "division"),
+
+    ("SST", "LBL", "  BST  ", "sst"),
+    ("GTO", "HYP", " HYP⁻¹ ", "gto"),
+    ("SIN", "DIM", " SIN⁻¹ ", "sin"),
+    ("COS", "(i)", " COS⁻¹ ", "cos"),
+    ("TAN", "I", " TAN⁻¹ ", "tan"),
+    ("EEX", " RESULT", "   π   ", "eex"),
+    ("4", "x ≷", "  S F  ", "digit-4"),
+    ("5", "DSE", "  C F  ", "digit-5"),
+    ("6", "ISG", "  F ?  ", "digit-6"),
+    ("×", "∫ᵧˣ", "  x=0  ", "multiplication"),
+
+    ("R/S", "PSE", "  P/R  ", "rtos"),
+    CLEAR_CLUSTER,
+    ("E\nN\nT\nE\nR", " RAN # ", " LSTx  ", "enter"),
+    ("1", "→ R", "  → P  ", "digit-1"),
+    ("2", "→H.MS", "  → H  ", "digit-2"),
+    ("3", "→RAD", " →DEG  ", "digit-3"),
+    ("−", "Re ≷ Im", "  TEST ", "subtraction"),
+
+    ("ON", "", "", "on"),
+    ("f", "", "       ", "shift-f"),
+    ("g", "", "       ", "shift-g"),
+    ("STO", "FRAC", "  INT  ", "sto"),
+    ("RCL", "USER", "  MEM  ", "rcl"),
+    ("0", "x!", "   x̄   ", "digit-0"),
+    ("•", "s", "  ŷ,r  ", "decimal"),
+    ("Σ+", "L.R.", "  Σ-   ", "sum"),
+    ("+", "Py,x", " Cy,x  ", "addition"),
+)
+
+KEY_IDS = tuple(
+    key[3] for entry in KEYPAD for key in ( entry if isinstance( entry[0], tuple ) else (entry,) )
+)
+
+
+def key_codes() -> dict:
+    """15c key codes: row and column of the key, or the digit itself"""
+    rows = ( KEY_IDS[0:10], KEY_IDS[10:20], KEY_IDS[20:30], KEY_IDS[30:35] + ("enter",) + KEY_IDS[35:] )
+    codes = {}
+    for row, keys in enumerate( rows, 1 ):
+        for column, key in enumerate( keys, 1 ):
+            codes.setdefault( key, 10*row + column % 10 )
+    for digit in range( 10 ):
+        codes[ "digit-%d" % digit ] = digit
+    return codes
+
+KEY_CODES = key_codes()
+
+
+# typed characters and Textual key names to button ids
+KEYBOARD = {
+    "+": "addition", "-": "subtraction", "*": "multiplication", "/": "division",
+    ".": "decimal", ",": "decimal", "^": "wye-x", "f": "shift-f", "g": "shift-g",
+    "c": "chs", "e": "eex", "x": "x-swap-y", "r": "r-down", "s": "sto", "l": "rcl",
+    "q": "sqrt-x", "i": "inverse-x",
+    "enter": "enter", "backspace": "backspace", "delete": "backspace",
+}
+KEYBOARD.update( { str( digit ): "digit-%d" % digit for digit in range( 10 ) } )
+
+# expression words and the keys they press
+WORDS = {
+    "+": ( "addition", ), "-": ( "subtraction", ), "*": ( "multiplication", ), "/": ( "division", ),
+    "^": ( "wye-x", ), "**": ( "wye-x", ), "chs": ( "chs", ), "neg": ( "chs", ),
+    "sqrt": ( "sqrt-x", ), "sq": ( "shift-g", "sqrt-x" ), "exp": ( "exp-x", ), "ln": ( "shift-g", "exp-x" ),
+    "alog": ( "ten-x", ), "log": ( "shift-g", "ten-x" ), "inv": ( "inverse-x", ), "abs": ( "shift-g", "chs" ),
+    "sin": ( "sin", ), "cos": ( "cos", ), "tan": ( "tan", ), "pi": ( "shift-g", "eex" ),
+    "swap": ( "x-swap-y", ), "rdn": ( "r-down", ), "rup": ( "shift-g", "r-down" ),
+    "deg": ( "shift-g", "digit-7" ), "rad": ( "shift-g", "digit-8" ), "grad": ( "shift-g", "digit-9" ),
+    "frac": ( "shift-f", "sto" ), "int": ( "shift-g", "sto" ), "!": ( "shift-f", "digit-0" ),
+    "perm": ( "shift-f", "addition" ), "comb": ( "shift-g", "addition" ), "ran": ( "shift-f", "enter" ),
+}
+
+
+def number_keys( token:str ) -> list:
+    """The keys that enter a number such as -1.5e-3, or None when token is not one"""
+    try:
+        float( token )
+    except ValueError:
+        return None
+    mantissa, _, exponent = token.lower().partition( "e" )
+    if not mantissa.lstrip( "+-" ).replace( ".", "", 1 ).isdigit():
+        return None
+    keys = [ KEYBOARD[ char ] for char in mantissa.lstrip( "+-" ) ]
+    if mantissa.startswith( "-" ):
+        keys.append( "chs" )
+    if exponent:
+        keys.append( "eex" )
+        keys += [ KEYBOARD[ char ] for char in exponent.lstrip( "+-" ) ]
+        if exponent.startswith( "-" ):
+            keys.append( "chs" )
+    return keys
+
+
+def operable( keys, keymap:dict ) -> bool:
+    """Every key of an f or g shifted sequence has an operation in keymap"""
+    shift = ''
+    for key in keys:
+        if key in ( "shift-f", "shift-g" ):
+            shift = key[-1]
+            continue
+        if ( shift, key ) not in keymap:
+            return False
+        shift = ''
+    return True
+
+
+def keystrokes( text:str, keymap:dict | None=None ) -> list:
+    """Button ids for pasted text: key ids, numbers and expression words.
+    ENTER is inserted between numbers that follow each other. With the engine's keymap a number
+    or word whose keys have no operation, such as an exponent without EEX, is rejected."""
+    keys = []
+    after_number = False
+    for token in text.split():
+        digits = number_keys( token )
+        if digits is not None:
+            if keymap is not None and not operable( digits, keymap ):
+                raise ValueError( f"cannot enter {token!r} on this keypad" )
+            if after_number:
+                keys.append( "enter" )
+            keys += digits
+            after_number = True
+            continue
+        if token in KEY_CODES:
+            keys.append( token )
+        elif token.lower() in WORDS:
+            word = WORDS[ token.lower() ]
+            if keymap is not None and not operable( word, keymap ):
+                raise ValueError( f"cannot enter {token!r} on this keypad" )
+            keys += word
+        else:
+            raise ValueError( f"cannot enter {token!r}" )
+        after_number = False
+    return keys
@@ -7,17 +7,47 @@ or [https://www.hpmuseum.org/forum/archive/index.php?thread-19260.html]
 looks like a real calculator.
 """
 
-import math
+import asyncio
+import signal
+import time
+import traceback
+from collections import deque
+from functools import partial
+
 from textual import events, on
 from textual.app import App, ComposeResult
-from textual.containers import Container, Horizontal, Vertical, Grid
+from textual.binding import Binding
+from textual.containers import Container, Horizontal, Vertical, VerticalScroll, Grid
+from rich.segment import Segment
+from textual.geometry import Region
 from textual.reactive import var
-from textual.widgets import Button, Digits, Label, Static
+from textual.renderables.digits import DIGITS, DIGITS3X3_BOLD, Digits as DigitsRenderable
+from textual.strip import Strip
+from textual.widgets import Button, Label, Static
 from textual.widget import Widget
+from textual.worker import Worker, WorkerState
+
+try:
+    from .keypad import CLEAR_CLUSTER, KEYBOARD, KEYPAD, keystrokes
+    from .rpn_engine import Cancelled, RPN_Engine, RPN_Error
+    from .rpn_format import N_DIGITS, OFF_TEXT, lcd_cells
+    from .rpn_numbers import FLOAT, NUMBERS, describe
+except ImportError:
+    from keypad import CLEAR_CLUSTER, KEYBOARD, KEYPAD, keystrokes
+    from rpn_engine import Cancelled, RPN_Engine, RPN_Error
+    from rpn_format import N_DIGITS, OFF_TEXT, lcd_cells
+    from rpn_numbers import FLOAT, NUMBERS, describe
 
 
 class HP_Display( Widget ):
-    """LCD panel that approximates the HP 15c layout"""
+    """LCD panel that approximates the HP 15c layout.
+
+    The segment digits and the annunciators are drawn by this one widget as
+    line strips. Glyph strips are cached per character and active state and
+    only the cells whose content changed are refreshed.
+    """
+
+    COMPONENT_CLASSES = { "lcd--off", "lcd--active", "lcd--rule" }
 
     DEFAULT_CSS = """
     HP_Display {
@@ -28,82 +58,161 @@ class HP_Display( Widget ):
         /* bezel */
         background: darkgrey 40%;
         padding: 1;
-
-        #lcd_display {
-            background: aquamarine 20%;
-            color: darkslategray 10%;
-            .lcd.active{
-                color: darkslategray 100%;
-            }
-            #lcd_digits {
-                Digits {
-                    border-top: tall slategray 50%;
-                }
-                .separator {
-                    width:1;
-                }
-            }
-            #lcd_status {
-                height: 1;
-                padding-left: 3;
-                Label {
-                    margin-left: 2;
-                }
-            }
-        }
+    }
+    HP_Display > .lcd--off {
+        background: aquamarine 20%;
+        color: darkslategray 10%;
+        text-style: bold;
+    }
+    HP_Display > .lcd--active {
+        background: aquamarine 20%;
+        color: darkslategray 100%;
+        text-style: bold;
+    }
+    HP_Display > .lcd--rule {
+        background: aquamarine 20%;
+        color: slategray 50%;
     }
     """
     
+    # lower case segment letters for "running" and "Error"
+    LETTERS = {
+        "r": ( "", "┏━╸", "┃" ),
+        "o": ( "", "┏━┓", "┗━┛" ),
+        "u": ( "", "╻ ╻", "┗━┛" ),
+        "n": ( "", "┏━┓", "┃ ┃" ),
+        "i": ( "", " ╻", " ┃" ),
+        "g": ( "┏━┓", "┗━┫", "╺━┛" ),
+    }
+    CHARACTERS = " 0123456789ABCDEF" + "".join( LETTERS )
+
     value = var("")
-    n_digits = 10
-    off_val = "-"+",".join( "8"*n_digits )
+    self_test = var(False)
+    n_digits = N_DIGITS
+    off_val = OFF_TEXT
     status_strs = ["USER", "f", "g", "BEGIN", "GRAD", "DMY", "C", "PRGM"]
-    lcd_digs = [None]*n_digits
-    lcd_seps = [None]*n_digits
+    digit_rows = 3
+    status_row = digit_rows + 1
     
     def __init__(self, id:str | None=None) -> None:
         super().__init__( id=id )
-
-    def compose(self) -> ComposeResult:
-        with Vertical( id="lcd_display" ):
-            with Horizontal( id="lcd_digits" ):
-                for i in range( self.n_digits ):
-                    if i: self.lcd_seps[i] = Digits( classes="lcd separator idx_"+ str(i) )
-                    else: self.lcd_seps[i] = Digits( classes="lcd negative idx_"+ str(i) )
-                    self.lcd_digs[i] = Digits( classes="lcd digit idx_"+ str(i) )
-                    yield self.lcd_seps[i]
-                    yield self.lcd_digs[i]
-                yield Digits( " ", classes="separator idx_"+ str(self.n_digits-1) )
-            with Horizontal( id="lcd_status" ):
-                for l in self.status_strs:
-                    yield Label( l, id=l+"-state", classes="lcd" )
+        self.cells = self.layout( "" )
+        self.status = { name: (name, False) for name in self.status_strs }
+        self.status_x = {}
+        x = 3
+        for name in self.status_strs:
+            self.status_x[ name ] = x + 2
+            x += 2 + len( name )
+        self._styles = None
+        self._glyphs = {}
+        self._lines = {}
+
+    @staticmethod
+    def cell_region( idx:int ) -> Region:
+        """Content region of cell idx, even cells are separators, odd are digits"""
+        if idx % 2:
+            return Region( 2*idx - 1, 1, 3, HP_Display.digit_rows )
+        return Region( 2*idx, 1, 1, HP_Display.digit_rows )
+
+    def layout( self, buffer:str ) -> tuple:
+        """The (character, active) pair of every separator and digit cell, cached per text"""
+        return lcd_cells( buffer, self.CHARACTERS )
 
     def watch_value(self) -> None:
         self.parse_value()
 
+    def watch_self_test(self) -> None:
+        self.parse_value()
+        self._lines.pop( self.status_row, None )
+        self.refresh( Region( 0, self.status_row, self.size.width, 1 ) )
+
     def parse_value(self) -> None:
-        buffer = self.value
-        n_chars = len( buffer )
-        for idx in range( self.n_digits ):
-            self.lcd_seps[idx].remove_class("active")
-            self.lcd_seps[idx].update( self.off_val[ 2*idx ] )
-            self.lcd_digs[idx].remove_class("active")
-            self.lcd_digs[idx].update( self.off_val[ 2*idx+1] )
-            if n_chars:
-                if buffer[0] in '-.,':
-                    self.lcd_seps[idx].update( buffer[0] )
-                    self.lcd_seps[idx].add_class("active")
-                    buffer = buffer[1:]
-                    n_chars -= 1
-                if n_chars and buffer[0] in '0123456789ABCDEF':
-                    self.lcd_digs[idx].update( buffer[0] )
-                    self.lcd_digs[idx].add_class("active")
-                    buffer = buffer[1:]
-                    n_chars -= 1
+        if self.self_test:
+            cells = [ (char, True) for char in self.off_val ]
+        else:
+            cells = self.layout( self.value )
+        old_cells = self.cells
+        self.cells = cells
+        dirty = [ idx for idx, cell in enumerate( cells ) if cell != old_cells[idx] ]
+        if dirty:
+            for y in range( 1, self.status_row ):
+                self._lines.pop( y, None )
+            self.refresh( *[ self.cell_region( idx ) for idx in dirty ] )
+
+    def annunciate( self, name:str, active:bool, text:str | None=None ) -> None:
+        """Light or clear a status annunciator, optionally replacing its text"""
+        if text is None:
+            text = self.status[ name ][0]
+        if self.status[ name ] == ( text, active ):
+            return
+        self.status[ name ] = ( text, active )
+        self._lines.pop( self.status_row, None )
+        self.refresh( Region( self.status_x[ name ], self.status_row, len( text ), 1 ) )
+
+    def glyph( self, char:str, active:bool, width:int ) -> tuple:
+        """The cached strips of one character, a row per strip"""
+        key = ( char, active, width )
+        strips = self._glyphs.get( key )
+        if strips is None:
+            style = self._styles[ active ]
+            char = char.translate( DigitsRenderable.REPLACEMENTS )
+            position = DIGITS.find( char )
+            if char in self.LETTERS:
+                rows = self.LETTERS[ char ]
+            elif position < 0:
+                rows = ( " ", " ", char )
+            else:
+                rows = DIGITS3X3_BOLD[ 3*position:3*position+3 ]
+            strips = tuple( Strip( [ Segment( row[:width].ljust( width ), style ) ], width ) for row in rows )
+            self._glyphs[ key ] = strips
+        return strips
+
+    def render_line( self, y:int ) -> Strip:
+        styles = (
+            self.get_component_rich_style( "lcd--off" ),
+            self.get_component_rich_style( "lcd--active" ),
+            self.get_component_rich_style( "lcd--rule" ),
+        )
+        if styles != self._styles:
+            self._styles = styles
+            self._glyphs.clear()
+            self._lines.clear()
+        line = self._lines.get( y )
+        if line is None:
+            line = self._lines[ y ] = self.build_line( y )
+        return line
+
+    def build_line( self, y:int ) -> Strip:
+        width = self.size.width
+        off_style, active_style, rule_style = self._styles
+        n_cells = 2*self.n_digits
+        if y == 0:
+            strip = Strip( [ Segment( "▔"*( 2*n_cells + 1 ), rule_style ) ] )
+        elif y < self.status_row:
+            row = y - 1
+            strips = [ self.glyph( char, active, 1 + 2*(idx % 2) )[row] for idx, (char, active) in enumerate( self.cells ) ]
+            strips.append( self.glyph( " ", False, 1 )[row] )
+            strip = Strip.join( strips )
+        elif y == self.status_row:
+            segments = []
+            x = 0
+            for name in self.status_strs:
+                text, active = self.status[ name ]
+                active = active or self.self_test
+                segments.append( Segment( " "*( self.status_x[ name ] - x ), off_style ) )
+                segments.append( Segment( text, active_style if active else off_style ) )
+                x = self.status_x[ name ] + len( text )
+            strip = Strip( segments )
+        else:
+            strip = Strip( [] )
+        return strip.extend_cell_length( width, off_style ).crop( 0, width )
 
 
 class HP_Buttons( Container ):
     class HP_Button( Button ):
+        # keyboard input goes to the app's keymap, a focused button would eat Enter
+        can_focus = False
+
         def __init__(self, *args, **kwargs):
             super().__init__( id=kwargs["id"] )
             self.label = args[0]
@@ -114,75 +223,73 @@ class HP_Buttons( Container ):
         calc_buttons =  Grid(id="hp_buttons")
         calc_buttons.border_subtitle = " H   E   W   L   E   T   T  •  P   A   C   K   A   R   D "
         with calc_buttons:
-            yield self.HP_Button("√x", "A", "  x²   ", id="sqrt-x")
-            yield self.HP_Button("eˣ", "B", "  LN   ", id="exp-x")
-            yield self.HP_Button("10ˣ", "C", "  LOG  ", id="ten-x")
-            yield self.HP_Button(" yˣ", "D", "   %   ", id="wye-x")
-            yield self.HP_Button("1/x", "E", "  Δ%   ", id="inverse-x")
-            yield self.HP_Button("CHS", " MATRIX", "  ABS  ", id="chs")
-            yield self.HP_Button("7", "FIX", "  DEG  ", id="digit-7")
-            yield self.HP_Button("8", "SCI", "  RAD  ", id="digit-8")
-            yield self.HP_Button("9", "ENG", "  GRD  ", id="digit-9")
-            yield self.HP_Button("÷", "SOLVE", "  x≤y  ", id="division")
-
-            yield self.HP_Button("SST", "LBL", "  BST  ", id="sst")
-            yield self.HP_Button("GTO", "HYP", " HYP⁻¹ ", id="gto")
-            yield self.HP_Button("SIN", "DIM", " SIN⁻¹ ", id="sin")
-            yield self.HP_Button("COS", "(i)", " COS⁻¹ ", id="cos")
-            yield self.HP_Button("TAN", "I", " TAN⁻¹ ", id="tan")
-            yield self.HP_Button("EEX", " RESULT", "   π   ", id="eex")
-            yield self.HP_Button("4", "x ≷", "  S F  ", id="digit-4")
-            yield self.HP_Button("5", "DSE", "  C F  ", id="digit-5")
-            yield self.HP_Button("6", "ISG", "  F ?  ", id="digit-6")
-            yield self.HP_Button("×", "∫ᵧˣ", "  x=0  ", id="multiplication")
-
-            yield self.HP_Button("R/S", "PSE", "  P/R  ", id="rtos")
-            clear_cluster =  Grid(id="cluster")
-            clear_cluster.border_title = "╭───────────────── CLEAR ──────────────────╮  "
-            with clear_cluster:
-                yield self.HP_Button("GSB", "Σ", "  RTN  ", id="gsb")
-                yield self.HP_Button("R↓", "PRGM", "  R↑   ", id="r-down")
-                yield self.HP_Button("x ≷ y", "REG", "  RND  ", id="x-swap-y")
-                yield self.HP_Button("←", "PREFIX", "  CLx  ", id="backspace")
-            yield self.HP_Button("E\nN\nT\nE\nR", " RAN # ", " LSTx  ", id="enter")
-            yield self.HP_Button("1", "→ R", "  → P  ", id="digit-1")
-            yield self.HP_Button("2", "→H.MS", "  → H  ", id="digit-2")
-            yield self.HP_Button("3", "→RAD", " →DEG  ", id="digit-3")
-            yield self.HP_Button("−", "Re ≷ Im", "  TEST ", id="subtraction")
-
-            yield self.HP_Button("ON", "", "", id="on")
-            yield self.HP_Button("f", "", "       ", id="shift-f")
-            yield self.HP_Button("g", "", "       ", id="shift-g")
-            yield self.HP_Button("STO", "FRAC", "  INT  ", id="sto")
-            yield self.HP_Button("RCL", "USER", "  MEM  ", id="rcl")
-            yield self.HP_Button("0", "x!", "   x̄   ", id="digit-0")
-            yield self.HP_Button("•", "s", "  ŷ,r  ", id="decimal")
-            yield self.HP_Button("Σ+", "L.R.", "  Σ-   ", id="sum")
-            yield self.HP_Button("+", "Py,x", " Cy,x  ", id="addition")
+            for entry in KEYPAD:
+                if entry is CLEAR_CLUSTER:
+                    clear_cluster =  Grid(id="cluster")
+                    clear_cluster.border_title = "╭───────────────── CLEAR ──────────────────╮  "
+                    with clear_cluster:
+                        for label, title, subtitle, key in entry:
+                            yield self.HP_Button(label, title, subtitle, id=key)
+                else:
+                    label, title, subtitle, key = entry
+                    yield self.HP_Button(label, title, subtitle, id=key)
 
 class RPN_CalculatorApp(App):
-    """A working TUI calculator."""
+    """A working TUI calculator, a thin view over an RPN_Engine."""
     CSS_PATH = "rpn_15c.tcss"
+    BINDINGS = [ Binding( "f12", "toggle_profile", "Profiler", show=False ),
+                 Binding( "ctrl+z", "undo", "Undo", show=False ),
+                 Binding( "ctrl+y", "redo", "Redo", show=False ),
+                 Binding( "f11", "toggle_history", "History", show=False ),
+                 Binding( "ctrl+e", "export_vector", "Export vector", show=False ) ]
 
-    number_X = var( float('nan') )
-    buffer_X = var("")
     angle_M = var('deg')
 
-
-    def state_reset( self ) -> None:
-        self.state= {}
-        self.state['fix'] = 4
-        self.state['angle_deg'] = True
-        self.state['angle_rad'] = False
-        self.state['angle_grad'] = False
-        self.state['X'] = float( 'nan' )
-        self.state['Y'] = float( 'nan' )
-        self.state['Z'] = float( 'nan' )
-        self.state['T'] = float( 'nan' )
-        self.angle_M = 'deg'
+    def __init__(self, *args, profiler=None, memory=None, history:int=1000, numbers=None,
+                 vector:str | None=None, column:int=0, output:str | None=None, **kwargs):
+        super().__init__( *args, **kwargs )
+        self.engine = RPN_Engine( numbers or FLOAT )
+        # Continuous Memory, the machine comes back as it was left
+        self.memory = memory
+        if memory is not None:
+            memory.load( self.engine )
+        # vector mode, Ctrl+E writes the vector in X back
+        self.load_error = None
+        if vector is not None:
+            try:
+                self.engine.load_vector( vector, column )
+            except ( RPN_Error, OSError ) as error:
+                # shown once the app is up
+                self.load_error = error
+        self.vector_output = output or ( vector and vector + ".out" )
+        if history:
+            self.engine.enable_history( history )
+        self.engine.pause_on_pse = True
+        self.engine.progress = self.show_progress
+        self.busy = False
+        self.progress_due = 0.0
+        self.profiler = profiler
+        self.profile_timer = None
+        self.typeahead = deque()
+        self.flush_pending = False
 
     def on_mount( self ):
-        self.state_reset()
+        self.lcd = self.query_one("HP_Display")
+        if self.profiler is not None:
+            self.profiler.instrument_engine( self.engine )
+            self.profiler.instrument_display( self.lcd )
+            self.profiler.wrap( self, "refresh_view", "view refresh_view" )
+            if hasattr( signal, "SIGUSR1" ):
+                # dumped from the event loop, never inside the record() the signal interrupted
+                asyncio.get_running_loop().add_signal_handler( signal.SIGUSR1, self.profiler.dump )
+        self.refresh_view()
+        if self.load_error is not None:
+            self.show_error( self.load_error )
+        # the display is the first frame, the keypad follows once it is painted
+        self.call_after_refresh( self.mount_keypad )
+
+    def mount_keypad( self ) -> None:
+        self.query_one("#calculator").mount( HP_Buttons( ) )
 
     def compose(self) -> ComposeResult:
         """Add our buttons."""
@@ -192,427 +299,248 @@ class RPN_CalculatorApp(App):
                 with Vertical(id="logo"):
                     yield Label("hp", id="rpn-make")
                     yield Label("15 C", id="rpn-model")
-            yield HP_Buttons( )
-
-    def watch_number_X(self):
-        if math.isnan( self.number_X ):
-            self.query_one("HP_Display").value = '{0:,.{1}f}'.format(0, self.state['fix'])
-        else:
-            self.query_one("HP_Display").value = '{0:,.{1}f}'.format(self.number_X, self.state['fix'])
-
-    def watch_buffer_X(self):
-        self.query_one("HP_Display").value = self.buffer_X
-
-    def enter_actions( self ) -> None:
-        if self.buffer_X:
-            self.push_X( float(self.buffer_X) )
-            self.buffer_X = ""
-        self.number_X = self.state['X']
+        if self.engine.history is not None:
+            with VerticalScroll( id="history" ) as panel:
+                panel.border_title = "History  F11"
+                yield Static( id="history-lines" )
+        if self.profiler is not None:
+            profile = Static( id="profile" )
+            profile.border_title = "Profile  F12"
+            yield profile
+
+    def refresh_view( self ) -> None:
+        """Mirror the engine state onto the LCD and annunciators"""
+        engine = self.engine
+        self.lcd.value = engine.display()
+        self.lcd.annunciate( "f", engine.shift == 'f' )
+        self.lcd.annunciate( "g", engine.shift == 'g' )
+        self.lcd.annunciate( "PRGM", engine.program_mode )
+        self.lcd.annunciate( "C", engine.complex_mode )
+        self.angle_M = engine.angle_M
+        if self.memory is not None and not self.busy:
+            self.memory.save( engine )
+        if engine.history is not None and self.query_one( "#history" ).display:
+            self.update_history()
 
     def watch_angle_M(self):
-        self.state['angle_deg'] = False
-        self.state['angle_rad'] = False
-        self.state['angle_grad'] = False
-        angle_status = self.query_one("#GRAD-state")
-        angle_status.remove_class( "active" )
-        angle_status.update( "GRAD" )
-        if self.angle_M == 'grad':
-            angle_status.add_class( "active" )
-            self.state['angle_grad'] = True
-        elif self.angle_M == 'rad':
-            angle_status.update( " RAD" )
-            angle_status.add_class( "active" )
-            self.state['angle_rad'] = True
+        if self.angle_M == 'rad':
+            self.query_one("HP_Display").annunciate( "GRAD", True, " RAD" )
         else:
-            self.angle_M = 'deg'
-            self.state['angle_deg'] = True
-
-    def pop_T(self) -> float:
-        number = self.state['T']
-        self.state['T'] = float( 'nan' )
-        return number
-
-    def pop_Z(self) -> float:
-        number = self.state['Z']
-        self.state['Z'] = self.pop_T()
-        return number
-
-    def pop_Y(self) -> float:
-        number = self.state['Y']
-        self.state['Y'] = self.pop_Z()
-        return number
-
-    def pop_X(self) -> float:
-        number = self.state['X']
-        self.state['X'] = self.pop_Y()
-        return number
-
-    def push_X(self, number) -> None:
-        self.state['T'] = self.state['Z']
-        self.state['Z'] = self.state['Y']
-        self.state['Y'] = self.state['X']
-        self.state['X'] = number
+            self.query_one("HP_Display").annunciate( "GRAD", self.angle_M == 'grad', "GRAD" )
 
     @on( Button.Pressed )
     def toggle_status( self, event ) -> None:
-        if event.button.id == "shift-f":
-            self.query_one( "#f-state" ).toggle_class( "active" )
-        if event.button.id == "shift-g":
-            self.query_one( "#g-state" ).toggle_class( "active" )
-
-        if event.button.id == "enter":
-            self.enter_actions()
-
-        if event.button.id == "digit-0":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-                self.enter_actions()
-                self.state['X'] = math.factorial( int( self.pop_X() ) )
-                self.number_X = self.state['X']
-            else:
-                self.buffer_X += "0"
-        if event.button.id == "digit-1":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.buffer_X += "1"
-        if event.button.id == "digit-2":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.buffer_X += "2"
-        if event.button.id == "digit-3":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.buffer_X += "3"
-        if event.button.id == "digit-4":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.buffer_X += "4"
-        if event.button.id == "digit-5":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.buffer_X += "5"
-        if event.button.id == "digit-6":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.buffer_X += "6"
-        if event.button.id == "digit-7":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-                self.angle_M = 'deg'
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-                self.enter_actions()
-                self.state['fix'] = int( self.pop_X() )
-                self.number_X = self.state['X']
-            else:
-                self.buffer_X += "7"
-        if event.button.id == "digit-8":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-                self.angle_M = 'rad'
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.buffer_X += "8"
-        if event.button.id == "digit-9":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-                self.angle_M = 'grad'
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.buffer_X += "9"
-        if event.button.id == "decimal":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                if "." not in self.buffer_X:
-                    if self.buffer_X: 
-                        self.buffer_X += "."
-                    else:
-                        self.buffer_X += "0."
-        
-        
-        if event.button.id == "addition":
-            self.enter_actions()
-            self.state['X'] += self.pop_Y()
-            self.number_X = self.state['X']
-        
-        if event.button.id == "subtraction":
-            self.enter_actions()
-            self.state['X'] = self.pop_Y() - self.state['X']
-            self.number_X = self.state['X']
-        
-        if event.button.id == "multiplication":
-            self.enter_actions()
-            self.state['X'] *= self.pop_Y()
-            self.number_X = self.state['X']
-
-        if event.button.id == "division":
-            self.enter_actions()
-            self.state['X'] = self.pop_Y() / self.state['X']
-            self.number_X = self.state['X']
-
-        if event.button.id == "sqrt-x":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-                self.enter_actions()
-                self.state['X'] =  self.pop_X()**2
-                self.number_X = self.state['X']
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-                self.buffer_X += 'A'
-            else:
-                self.enter_actions()
-                self.state['X'] = math.sqrt( self.pop_X() )
-                self.number_X = self.state['X']
-
-        if event.button.id == "exp-x":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-                self.enter_actions()
-                self.state['X'] = math.log( self.pop_X() )
-                self.number_X = self.state['X']
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-                self.buffer_X += 'B'
-            else:
-                self.enter_actions()
-                self.state['X'] = math.exp( self.pop_X() )
-                self.number_X = self.state['X']
-
-        if event.button.id == "ten-x":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-                self.enter_actions()
-                self.state['X'] = math.log( self.pop_X(), 10 )
-                self.number_X = self.state['X']
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-                self.buffer_X += 'C'
-            else:
-                self.enter_actions()
-                self.state['X'] = 10**self.pop_X() 
-                self.number_X = self.state['X']
-
-        if event.button.id == "wye-x":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-                self.buffer_X += 'D'
-            else:
-                self.enter_actions()
-                self.state['X'] = self.pop_Y()**self.pop_X() 
-                self.number_X = self.state['X']
-
-        if event.button.id == "inverse-x":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-                self.buffer_X += 'E'
-            else:
-                self.enter_actions()
-                self.state['X'] = 1/self.pop_X() 
-                self.number_X = self.state['X']
-
-        if event.button.id == "chs":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-                self.enter_actions()
-                self.state['X'] = abs( self.pop_X())
-                self.number_X = self.state['X']
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.enter_actions()
-                self.state['X'] = -1*self.pop_X() 
-                self.number_X = self.state['X']
-
-        if event.button.id == "sst":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                pass
-
-        if event.button.id == "gto":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                pass
-
-        if event.button.id == "sin":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.enter_actions()
-                if self.state[ 'angle_deg' ]:
-                    self.state['X'] = math.sin(math.radians( self.pop_X() ))
-                elif self.state[ 'angle_rad' ]:
-                    self.state['X'] = math.sin( self.pop_X() )
-                elif self.state[ 'angle_grad' ]:
-                    self.state['X'] = math.sin( self.pop_X()*math.pi/200 )
-                self.state['X'] = self.pop_X() 
-                self.number_X = self.state['X']
-
-        if event.button.id == "cos":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.enter_actions()
-                if self.state[ 'angle_deg' ]:
-                    self.state['X'] = math.cos(math.radians( self.pop_X() ))
-                elif self.state[ 'angle_rad' ]:
-                    self.state['X'] = math.cos( self.pop_X() )
-                elif self.state[ 'angle_grad' ]:
-                    self.state['X'] = math.cos( self.pop_X()*math.pi/200 )
-                self.state['X'] = self.pop_X() 
-                self.number_X = self.state['X']
-
-        if event.button.id == "tan":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                self.enter_actions()
-                if self.state[ 'angle_deg' ]:
-                    self.state['X'] = math.tan(math.radians( self.pop_X() ))
-                elif self.state[ 'angle_rad' ]:
-                    self.state['X'] = math.tan( self.pop_X() )
-                elif self.state[ 'angle_grad' ]:
-                    self.state['X'] = math.tan( self.pop_X()*math.pi/200 )
-                self.state['X'] = self.pop_X() 
-                self.number_X = self.state['X']
-
-        if event.button.id == "eex":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-                self.enter_actions()
-                self.state['X'] = math.pi
-                self.number_X = self.state['X']
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                pass
-
-        if event.button.id == "rtos":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                pass
-        if event.button.id == "gsb":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                pass
-
-        if event.button.id == "r-down":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                pass
-
-        if event.button.id == "x-swap-y":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                pass
-
-        if event.button.id == "backspace":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                pass
-
-        if event.button.id == "sto":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-                self.enter_actions()
-                self.state['X'] = math.modf( self.state['X'] )[1]
-                self.number_X = self.state['X']
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-                self.enter_actions()
-                self.state['X'] = math.modf( self.state['X'] )[0]
-                self.number_X = self.state['X']
-            else:
-                pass
-
-        if event.button.id == "rcl":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                pass
-
-        if event.button.id == "sum":
-            if self.query_one( "#g-state" ).has_class("active"):
-                self.query_one( "#g-state" ).toggle_class( "active" )
-            elif self.query_one( "#f-state" ).has_class("active"):
-                self.query_one( "#f-state" ).toggle_class( "active" )
-            else:
-                pass
-
-
+        key = event.button.id
+        if self.busy:
+            # like the 15c any key stops a running program
+            self.engine.cancel()
+            return
+        if key == "on":
+            return
+        self.queue_keys( (key,) )
+
+    def on_key( self, event:events.Key ) -> None:
+        key = KEYBOARD.get( event.character ) if event.is_printable else KEYBOARD.get( event.key )
+        if key is None:
+            return
+        event.stop()
+        if self.busy:
+            self.engine.cancel()
+        else:
+            self.queue_keys( (key,) )
+
+    def on_paste( self, event:events.Paste ) -> None:
+        """Paste a number, an RPN expression or key ids"""
+        try:
+            keys = keystrokes( event.text, RPN_Engine.KEYMAP )
+        except ValueError as error:
+            self.show_error( error )
+            return
+        if not self.busy:
+            self.queue_keys( keys )
+
+    def queue_keys( self, keys ) -> None:
+        """Typeahead: keys are applied together once the pending messages are handled"""
+        self.typeahead.extend( keys )
+        if not self.flush_pending:
+            self.flush_pending = True
+            self.call_later( self.flush_typeahead )
+
+    def flush_typeahead( self ) -> None:
+        """Apply every queued key to the engine and refresh the view once"""
+        self.flush_pending = False
+        engine = self.engine
+        typeahead = self.typeahead
+        while typeahead and not self.busy:
+            key = typeahead.popleft()
+            if engine.runs_long( key ):
+                # the rest of the typeahead continues when the worker is done
+                self.run_engine( partial( engine.press, key ) )
+                return
+            try:
+                engine.press( key )
+            except Exception as error:
+                # whatever a key raises, the session and its memory survive it
+                typeahead.clear()
+                self.log.error( f"key {key}\n{traceback.format_exc()}" )
+                self.show_error( error )
+            if engine.paused:
+                typeahead.clear()
+                self.set_timer( 1, self.resume_program )
+        self.refresh_view()
+
+    def run_engine( self, work ) -> None:
+        """Run work on a thread worker, the LCD shows running until it ends or a key interrupts it"""
+        engine = self.engine
+        self.busy = True
+        engine.evaluations = 0
+        engine.cancelled = False
+        self.saved_stack = engine.stack_snapshot()
+        self.lcd.value = "running"
+        self.run_worker( work, group="engine", thread=True, exit_on_error=False )
+
+    def show_error( self, error:Exception ) -> None:
+        """Error n on the LCD until the next key, the message as a notification"""
+        self.engine.message = f"Error {getattr( error, 'code', 0 )}"
+        self.notify( describe( error ) or type( error ).__name__, title="Error", severity="error" )
+
+    def show_progress( self, estimate:float ) -> None:
+        """Called by the engine on its worker thread, at most ten LCD updates a second"""
+        now = time.monotonic()
+        if not self.busy or now < self.progress_due:
+            return
+        self.progress_due = now + 0.1
+        self.call_from_thread( setattr, self.lcd, "value", self.engine.format_number( estimate ) )
+
+    def on_worker_state_changed( self, event:Worker.StateChanged ) -> None:
+        if event.worker.group != "engine" or not event.worker.is_finished:
+            return
+        error = event.worker.error if event.state == WorkerState.ERROR else None
+        if isinstance( error, Cancelled ):
+            self.engine.restore_stack( self.saved_stack )
+            self.notify( "Interrupted", timeout=2 )
+        elif error is not None:
+            self.show_error( error )
+        elif self.engine.evaluations:
+            self.notify( f"{self.engine.evaluations} function evaluations", timeout=3 )
+        self.busy = False
+        if error is not None or self.engine.paused:
+            self.typeahead.clear()
+        self.refresh_view()
+        if self.engine.paused:
+            self.set_timer( 1, self.resume_program )
+        elif self.typeahead:
+            self.queue_keys( () )
+
+    def resume_program( self ) -> None:
+        """Continue after a PSE, the display was refreshed once for the pause"""
+        if self.engine.paused and not self.busy:
+            self.run_engine( self.engine.resume )
 
     @on( Button.Pressed, "#on" )
     def calculator_post( self ) -> None:
-        self.query_one("HP_Display").value = ""
-        lcd_display = self.query(".lcd")
-        lcd_display.add_class("active")
+        if self.busy:
+            self.engine.cancel()
+            return
+        self.engine.press( "on" )
+        self.lcd.value = ""
+        self.lcd.self_test = True
         self.set_timer( 1, self.state_clear )
         
     def state_clear( self ) -> None:
-        lcd_display = self.query(".lcd").remove_class("active")
-        self.state_reset()
-        self.buffer_X = "" 
-        self.number_X = float('nan')
-
-def main_cli() -> None:
-    RPN_CalculatorApp().run()
+        self.lcd.self_test = False
+        self.refresh_view()
+
+    def action_toggle_profile( self ) -> None:
+        """Show or hide the profiler overlay, refreshed twice a second while shown"""
+        if self.profiler is None:
+            self.notify( "Start rpn-15c with --profile to collect timings", timeout=3 )
+            return
+        panel = self.query_one( "#profile" )
+        panel.display = not panel.display
+        if panel.display:
+            self.update_profile()
+            self.profile_timer = self.set_interval( 0.5, self.update_profile )
+        elif self.profile_timer is not None:
+            self.profile_timer.stop()
+            self.profile_timer = None
+
+    def update_profile( self ) -> None:
+        self.query_one( "#profile" ).update( self.profiler.table() )
+
+    def action_undo( self ) -> None:
+        if not self.busy and self.engine.undo():
+            self.refresh_view()
+
+    def action_redo( self ) -> None:
+        if not self.busy and self.engine.redo():
+            self.refresh_view()
+
+    def action_toggle_history( self ) -> None:
+        """Show or hide the list of states undo and redo move through"""
+        if self.engine.history is None:
+            self.notify( "Undo history is switched off", timeout=3 )
+            return
+        panel = self.query_one( "#history" )
+        panel.display = not panel.display
+        if panel.display:
+            self.update_history()
+
+    def action_export_vector( self ) -> None:
+        if self.busy:
+            return
+        if self.vector_output is None:
+            self.notify( "Start with --vector FILE to export vectors", timeout=3 )
+            return
+        try:
+            count = self.engine.export_vector( self.vector_output )
+        except ( RPN_Error, OSError ) as error:
+            self.show_error( error )
+            return
+        self.notify( f"{count} values written to {self.vector_output}", timeout=3 )
+
+    def update_history( self ) -> None:
+        history = self.engine.history
+        format_number = self.engine.format_number
+        lines = []
+        for index, version in enumerate( history.versions ):
+            marker = "▶" if index == history.position else " "
+            value = version.buffer_X or format_number( version.state.X )
+            lines.append( f"{marker}{version.key or '':<18s}{value:>16s}" )
+        self.query_one( "#history-lines" ).update( "\n".join( lines ) )
+        self.query_one( "#history" ).scroll_to( y=max( history.position - 5, 0 ), animate=False )
+
+    def close_memory( self ) -> None:
+        """Compact Continuous Memory on exit, a running program leaves the journal as it was before it"""
+        if self.memory is not None:
+            self.memory.close( None if self.busy else self.engine )
+
+def main_cli( profile:str | None=None, memory:str | None=None, history:int=1000, numbers:str="float",
+              vector:str | None=None, column:int=0, output:str | None=None ) -> None:
+    """Run the TUI, with profile the operation timings are written there on exit and on SIGUSR1,
+    with memory the calculator state is kept in that file between runs, history undo levels are kept,
+    numbers names the numeric backend, vector is a file loaded into X and output where Ctrl+E writes it"""
+    profiler = None
+    if profile is not None:
+        try:
+            from .rpn_profile import Profiler
+        except ImportError:
+            from rpn_profile import Profiler
+        profiler = Profiler( profile )
+    if memory is not None:
+        try:
+            from .rpn_memory import ContinuousMemory
+        except ImportError:
+            from rpn_memory import ContinuousMemory
+        memory = ContinuousMemory( memory )
+    app = RPN_CalculatorApp( profiler=profiler, memory=memory, history=history, numbers=NUMBERS[ numbers ],
+                             vector=vector, column=column, output=output )
+    try:
+        app.run()
+    finally:
+        app.close_memory()
+        if profiler is not None:
+            profiler.dump()
 
 if __name__ == "__main__":
     main_cli()
@@ -0,0 +1,104 @@
+"""
+Batch evaluation for rpn-15c, without Textual.
+Every input line is an independent job on a fresh engine: either key ids as
+accepted by RPN_Engine.run or an RPN expression such as "2 3 + sqrt", and
+the two can be mixed. Lines are dispatched to a process pool in chunks and
+the results are written in input order as soon as each chunk is done.
+"""
+
+import decimal
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .keypad import KEY_IDS, WORDS
+    from .rpn_engine import RPN_Engine
+    from .rpn_numbers import NUMBERS, describe
+except ImportError:
+    from keypad import KEY_IDS, WORDS
+    from rpn_engine import RPN_Engine
+    from rpn_numbers import NUMBERS, describe
+
+KEYS = frozenset( KEY_IDS )
+
+
+def error_text( error:Exception ) -> str:
+    """How a failed line or script is reported"""
+    return f"Error: {type( error ).__name__}: {describe( error )}"
+
+
+def evaluate_line( line:str, numbers:str="float" ) -> str:
+    """X after evaluating one line on a fresh engine with the named numeric backend, or the error"""
+    engine = RPN_Engine( NUMBERS[ numbers ] )
+    press = engine.press
+    try:
+        for position, token in enumerate( line.split(), 1 ):
+            if token in KEYS:
+                press( token )
+            elif token.lower() in WORDS:
+                for key in WORDS[ token.lower() ]:
+                    press( key )
+            else:
+                engine.enter_actions()
+                try:
+                    number = engine.numbers.number( token )
+                except ( decimal.InvalidOperation, ValueError ):
+                    # name the token for every backend, decimal's signal carries no message
+                    raise ValueError( f"token {position} {token!r} is not a number, key or word" ) from None
+                engine.push_X( number )
+        engine.enter_actions()
+    except Exception as error:
+        return error_text( error )
+    x = engine.state.X
+    return x.descriptor() if hasattr( x, "descriptor" ) else str( x )
+
+
+def evaluate_chunk( lines:list, numbers:str="float" ) -> list:
+    return [ evaluate_line( line, numbers ) for line in lines ]
+
+
+def chunks( lines, size:int ):
+    lines = iter( lines )
+    while chunk := list( itertools.islice( lines, size ) ):
+        yield chunk
+
+
+def evaluate_lines( lines, jobs:int | None=None, chunk:int=256, numbers:str="float" ):
+    """Yield the result of every non-blank line in order.
+
+    jobs is the number of worker processes, None for one per core; with a
+    single job everything runs in this process. numbers names the backend
+    in NUMBERS every line is evaluated with.
+    """
+    lines = ( line for line in lines if line.strip() )
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        yield from ( evaluate_line( line, numbers ) for line in lines )
+        return
+    with ProcessPoolExecutor( jobs ) as pool:
+        # keep a bounded number of chunks in flight so stdin streams through
+        pending = []
+        for work in chunks( lines, chunk ):
+            pending.append( pool.submit( evaluate_chunk, work, numbers ) )
+            if len( pending ) >= 2*jobs:
+                yield from pending.pop( 0 ).result()
+        for future in pending:
+            yield from future.result()
+
+
+def run_batch( paths:list, jobs:int | None=None, out=sys.stdout, numbers:str="float" ) -> int:
+    """Evaluate the lines of every file, - is stdin. Returns the number of failed lines."""
+    failures = 0
+    for path in paths:
+        stream = sys.stdin if path == "-" else open( path )
+        try:
+            for result in evaluate_lines( stream, jobs, numbers=numbers ):
+                failures += result.startswith( "Error" )
+                out.write( result + "\n" )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+    out.flush()
+    return failures
@@ -0,0 +1,90 @@
+"""
+Combinatorics for the 15c engine: x! as Γ(x+1) for real x, permutations Py,x
+and combinations Cy,x. No large factorial is ever built: short products are
+multiplied out term by term, longer ones come from log-gamma, and results
+past the float range are rejected from their logarithm before computing.
+Results are memoized in bounded caches as worksheets repeat arguments.
+"""
+
+import math
+from functools import lru_cache
+
+LOG_MAX = math.log( 1.7976931348623157e308 )
+# results below this are integers a float holds exactly
+EXACT = float( 2**53 )
+# the most factors multiplied out, beyond that log-gamma is quicker
+PRODUCT_TERMS = 64
+MEMO_SIZE = 512
+
+
+def integers( y:float, x:float ) -> tuple:
+    """(n, k) of Py,x and Cy,x, which need integers 0 ≤ x ≤ y"""
+    if not ( math.isfinite( x ) and math.isfinite( y ) and x == math.floor( x ) and y == math.floor( y )
+             and 0 <= x <= y ):
+        raise ValueError( "Py,x and Cy,x need integers 0 ≤ x ≤ y" )
+    return int( y ), int( x )
+
+
+def log_permutations( n:int, k:int ) -> float:
+    return math.lgamma( n + 1 ) - math.lgamma( n - k + 1 )
+
+
+def log_combinations( n:int, k:int ) -> float:
+    return math.lgamma( n + 1 ) - math.lgamma( k + 1 ) - math.lgamma( n - k + 1 )
+
+
+def from_log( log:float, name:str ) -> float:
+    """e^log, rounded to the integer it stands for where a float holds that exactly"""
+    if log > LOG_MAX:
+        raise OverflowError( f"{name} ≈ 10^{log/math.log( 10 ):.0f} overflows" )
+    value = math.exp( log )
+    return float( round( value ) ) if value < EXACT else value
+
+
+@lru_cache( maxsize=MEMO_SIZE )
+def factorial( x:float ) -> float:
+    """x! as Γ(x+1) for any real x, like the 15c, in constant time.
+    Results beyond the float range are reported from lgamma instead of computed."""
+    if not math.isfinite( x ):
+        raise ValueError( "x! needs a finite x" )
+    if x == math.floor( x ) and x < 0:
+        raise ValueError( "x! of a negative integer" )
+    if x > 170:
+        exponent = math.lgamma( x + 1 )/math.log( 10 )
+        raise OverflowError( f"x! ≈ 10^{exponent:.0f} overflows" )
+    return math.gamma( x + 1 )
+
+
+def rounded( exact:int, log:float, name:str ) -> float:
+    """An exact integer result as the nearest float, from its logarithm when past the float range"""
+    try:
+        return float( exact )
+    except OverflowError:
+        pass
+    return from_log( log, name )
+
+
+@lru_cache( maxsize=MEMO_SIZE )
+def permutations( y:float, x:float ) -> float:
+    """Py,x = y!/(y-x)!, the x largest factors of y! multiplied out on integers when there are few"""
+    n, k = integers( y, x )
+    if k > PRODUCT_TERMS:
+        return from_log( log_permutations( n, k ), "Py,x" )
+    result = 1
+    for factor in range( n - k + 1, n + 1 ):
+        result *= factor
+    return rounded( result, log_permutations( n, k ), "Py,x" )
+
+
+@lru_cache( maxsize=MEMO_SIZE )
+def combinations( y:float, x:float ) -> float:
+    """Cy,x = y!/(x!(y-x)!) over the shorter of x and y-x on integers; each partial product is
+    itself a binomial coefficient, so every division is exact and the result is rounded once"""
+    n, k = integers( y, x )
+    k = min( k, n - k )
+    if k > PRODUCT_TERMS:
+        return from_log( log_combinations( n, k ), "Cy,x" )
+    result = 1
+    for i in range( 1, k + 1 ):
+        result = result*( n - k + i )//i
+    return rounded( result, log_combinations( n, k ), "Cy,x" )
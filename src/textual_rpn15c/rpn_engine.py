@@ -0,0 +1,1180 @@
+"""
+Headless engine for the 15c RPN calculator.
+Owns the X/Y/Z/T stack, the f/g shift state and every operation, with no
+Textual import so keystroke scripts evaluate at full interpreter speed.
+The TUI in rpn_15c.py is a thin view over an RPN_Engine.
+"""
+
+import cmath
+import math
+import operator
+from array import array
+
+try:
+    from .keypad import KEY_IDS
+    from .rpn_program import Cancelled, Flow, RPN_Error, RPN_Program
+    from .rpn_format import N_DIGITS, entry_text, entry_value, lcd_text, tolerance
+    from .rpn_history import History
+    from .rpn_integrate import NoConvergence, integrate
+    from .rpn_matrix import Matrices, Matrix
+    from .rpn_numbers import FLOAT, NAN
+    from .rpn_solve import NoRoot, solve
+    from .rpn_random import RandomNumbers
+    from .rpn_stats import Statistics
+    from .rpn_vector import Vector, read_vector, vector_circular, vector_function, vector_operation, write_vector
+except ImportError:
+    from keypad import KEY_IDS
+    from rpn_program import Cancelled, Flow, RPN_Error, RPN_Program
+    from rpn_format import N_DIGITS, entry_text, entry_value, lcd_text, tolerance
+    from rpn_history import History
+    from rpn_integrate import NoConvergence, integrate
+    from rpn_matrix import Matrices, Matrix
+    from rpn_numbers import FLOAT, NAN
+    from rpn_solve import NoRoot, solve
+    from rpn_random import RandomNumbers
+    from rpn_stats import Statistics
+    from rpn_vector import Vector, read_vector, vector_circular, vector_function, vector_operation, write_vector
+
+# the index register I is the last element of the register file, (i) addresses through it
+I_REGISTER = -1
+INDIRECT = None
+# registers in the pool by default, the 15c's 66 would not hold a 7×7 matrix: this holds
+# a 50×50 system, its right side, its inverse and the solution
+MEMORY_SIZE = 8192
+
+
+class MachineState:
+    """Stack and display settings, a handful of slots that copy in one call"""
+
+    __slots__ = ( "X", "Y", "Z", "T", "last_X", "notation", "fix", "angle", "imaginary" )
+
+    def __init__( self, empty=NAN ) -> None:
+        self.X = self.Y = self.Z = self.T = self.last_X = empty
+        # complex mode: the imaginary parts of X, Y, Z, T and LSTx side by side, None in real mode
+        self.imaginary = None
+        # FIX, SCI or ENG with fix digits
+        self.notation = "FIX"
+        self.fix = 4
+        self.angle = 'deg'
+
+    def copy( self ) -> 'MachineState':
+        other = MachineState.__new__( MachineState )
+        other.X, other.Y, other.Z, other.T, other.last_X = self.X, self.Y, self.Z, self.T, self.last_X
+        other.notation, other.fix, other.angle = self.notation, self.fix, self.angle
+        other.imaginary = None if self.imaginary is None else array( 'd', self.imaginary )
+        return other
+
+
+class RPN_Engine( RPN_Program ):
+    """Calculator model driven by the same key ids as the TUI buttons.
+    Instances hold only per-session state, the operation tables live on the class."""
+
+    __slots__ = ( "registers", "matrices", "result_name", "statistics", "progress", "evaluations",
+                  "state", "shift", "buffer_X", "message", "history", "numbers", "random", "memory_size" )
+
+    KEYMAP: dict = {}
+    # operations that may run for a while, the TUI runs them off the event loop
+    BACKGROUND: set = set()
+    # data registers R0 to R.9 after ON, they share the pool with matrices and program lines
+    n_registers = 20
+    lines_per_register = 7
+
+    def __init__( self, numbers=FLOAT, memory_size:int=MEMORY_SIZE ) -> None:
+        # the numeric backend every number operation goes through
+        self.numbers = numbers
+        # registers shared by data registers, matrices and program lines, 66 like the 15c
+        self.memory_size = memory_size
+        # R0 to R9, R.0 to R.9, R20 and up, then I
+        self.registers = numbers.zeros( self.n_registers + 1 )
+        self.message = None
+        self.matrices = Matrices()
+        self.result_name = 'A'
+        self.statistics = Statistics()
+        self.random = RandomNumbers()
+        self.progress = None
+        self.evaluations = 0
+        self.history = None
+        self.program_reset()
+        self.state_reset()
+
+    def clone( self ) -> 'RPN_Engine':
+        """An independent copy of this calculator, compiled program code is shared"""
+        other = object.__new__( type( self ) )
+        other.numbers = self.numbers
+        other.memory_size = self.memory_size
+        other.registers = self.numbers.registers( self.registers )
+        other.message = None
+        other.matrices = self.matrices.copy()
+        other.result_name = self.result_name
+        other.statistics = self.statistics.copy()
+        other.random = self.random.copy()
+        other.progress = None
+        other.evaluations = 0
+        other.history = None
+        other.state = self.state.copy()
+        other.shift = self.shift
+        other.buffer_X = self.buffer_X
+        self.clone_program( other )
+        return other
+
+    def state_reset( self ) -> None:
+        self.state = MachineState( self.numbers.nan )
+        self.shift = ''
+        self.buffer_X = ""
+
+    @property
+    def angle_M( self ) -> str:
+        return self.state.angle
+
+    def set_angle( self, mode:str ) -> None:
+        self.state.angle = mode
+
+    @property
+    def complex_mode( self ) -> bool:
+        return self.state.imaginary is not None
+
+    def set_complex( self, on:bool ) -> None:
+        """Complex mode with a zero imaginary stack, or real mode dropping the imaginary parts"""
+        if not on:
+            self.state.imaginary = None
+        elif self.state.imaginary is None:
+            self.state.imaginary = array( 'd', bytes( 8*5 ) )
+
+    def pop_T(self) -> float:
+        number = self.state.T
+        self.state.T = self.numbers.nan
+        return number
+
+    def pop_Z(self) -> float:
+        number = self.state.Z
+        self.state.Z = self.pop_T()
+        return number
+
+    def pop_Y(self) -> float:
+        number = self.state.Y
+        self.state.Y = self.pop_Z()
+        return number
+
+    def pop_X(self) -> float:
+        number = self.state.X
+        self.state.X = self.pop_Y()
+        imaginary = self.state.imaginary
+        if imaginary is not None:
+            imaginary[0:3] = imaginary[1:4]
+            imaginary[3] = 0.0
+        return number
+
+    def push_X(self, number) -> None:
+        self.state.T = self.state.Z
+        self.state.Z = self.state.Y
+        self.state.Y = self.state.X
+        self.state.X = number
+        imaginary = self.state.imaginary
+        if imaginary is not None:
+            # a pushed number is real
+            imaginary[1:4] = imaginary[0:3]
+            imaginary[0] = 0.0
+
+    def enter_actions( self ) -> None:
+        """Terminate digit entry, pushing the buffer onto the stack"""
+        if self.buffer_X:
+            self.push_X( entry_value( self.buffer_X, self.numbers.number ) )
+            self.buffer_X = ""
+
+    def numbers_only( self, *values ) -> None:
+        """Error 1 for a matrix descriptor or vector given to an operation on numbers"""
+        for value in values:
+            if isinstance( value, Matrix ):
+                raise RPN_Error( 1, "a matrix descriptor where a number is needed" )
+            if isinstance( value, Vector ):
+                raise RPN_Error( 1, "a vector where a number is needed" )
+
+    def real( self, value ) -> float:
+        """A stack or register number as a float for the float based parts"""
+        self.numbers_only( value )
+        return float( value )
+
+    def integer( self, value ) -> int:
+        """A stack or register number as an integer argument, truncated like the 15c"""
+        self.numbers_only( value )
+        if not self.numbers.finite( value ):
+            raise RPN_Error( 1, "an empty or non-finite number where an integer is needed" )
+        return int( value )
+
+    def unary( self, func, descriptors:bool=False ) -> None:
+        """X becomes func(X), which only gets a descriptor or vector when descriptors is set"""
+        self.enter_actions()
+        x = self.state.X
+        if not descriptors:
+            self.numbers_only( x )
+        result = func( x )
+        if isinstance( result, Matrix ):
+            result = self.store_result( result )
+        self.state.X = result
+        self.state.last_X = x
+
+    def binary( self, func, descriptors:bool=False ) -> None:
+        """Apply func(Y, X) and drop the stack, descriptors as for unary"""
+        self.enter_actions()
+        x = self.state.X
+        if not descriptors:
+            self.numbers_only( self.state.Y, x )
+        result = func( self.state.Y, x )
+        if isinstance( result, Matrix ):
+            result = self.store_result( result )
+        self.pop_X()
+        self.state.X = result
+        self.state.last_X = x
+
+    def complex_unary( self, func ) -> None:
+        """X + iX becomes func(X + iX), both parts in one pass"""
+        self.enter_actions()
+        state = self.state
+        imaginary = state.imaginary
+        x = state.X
+        result = complex( func( complex( self.real( x ), imaginary[0] ) ) )
+        number = self.numbers.number
+        state.X = number( result.real )
+        imaginary[4] = imaginary[0]
+        imaginary[0] = float( number( result.imag ) )
+        state.last_X = x
+
+    def complex_binary( self, func ) -> None:
+        """Apply func(Y + iY, X + iX) and drop both stacks"""
+        self.enter_actions()
+        state = self.state
+        imaginary = state.imaginary
+        x, ix = state.X, imaginary[0]
+        result = complex( func( complex( self.real( state.Y ), imaginary[1] ), complex( self.real( x ), ix ) ) )
+        self.pop_X()
+        number = self.numbers.number
+        state.X = number( result.real )
+        imaginary[0] = float( number( result.imag ) )
+        state.last_X = x
+        imaginary[4] = ix
+
+    def number_function( self, name:str ) -> None:
+        """X becomes the backend function name of X, a descriptor goes to the matrix operators
+        and a vector to every element"""
+        # digit entry always ends in a number, so a descriptor or vector can only be in X without one
+        if not self.buffer_X and isinstance( self.state.X, Vector ):
+            self.unary( lambda x: vector_function( name, x ), descriptors=True )
+        elif not self.buffer_X and isinstance( self.state.X, Matrix ) and name in MATRIX_FUNCTIONS:
+            self.unary( MATRIX_FUNCTIONS[ name ], descriptors=True )
+        elif self.state.imaginary is not None:
+            self.complex_function( name )
+        else:
+            self.unary( getattr( self.numbers, name ) )
+
+    def complex_function( self, name:str ) -> None:
+        """A function in complex mode, the ones without a complex form act on the real part"""
+        function = COMPLEX_FUNCTIONS.get( name )
+        if function is not None:
+            self.complex_unary( function )
+            return
+        self.enter_actions()
+        imaginary = self.state.imaginary
+        imaginary[4] = imaginary[0]
+        self.unary( getattr( self.numbers, name ) )
+
+    def number_operation( self, name:str ) -> None:
+        """Y op X with the backend operation name, descriptors go to the matrix operators,
+        vectors element by element"""
+        self.enter_actions()
+        state = self.state
+        if isinstance( state.X, Vector ) or isinstance( state.Y, Vector ):
+            if isinstance( state.X, Matrix ) or isinstance( state.Y, Matrix ):
+                raise RPN_Error( 1, "a matrix descriptor and a vector do not combine" )
+            self.binary( lambda y, x: vector_operation( name, y, x ), descriptors=True )
+        elif ( isinstance( state.X, Matrix ) or isinstance( state.Y, Matrix ) ) and name in MATRIX_FUNCTIONS:
+            self.binary( MATRIX_FUNCTIONS[ name ], descriptors=True )
+        elif state.imaginary is not None and name in COMPLEX_FUNCTIONS:
+            self.complex_binary( COMPLEX_FUNCTIONS[ name ] )
+        else:
+            if state.imaginary is not None:
+                state.imaginary[4] = state.imaginary[0]
+            self.binary( getattr( self.numbers, name ) )
+
+    def circular( self, name:str ) -> None:
+        """sin, cos or tan of X in the current angle mode, always in radians in complex mode"""
+        if not self.buffer_X and isinstance( self.state.X, Vector ):
+            self.unary( lambda x: vector_circular( name, x, self.state.angle ), descriptors=True )
+            return
+        if self.state.imaginary is not None:
+            self.complex_unary( COMPLEX_FUNCTIONS[ name ] )
+            return
+        function = getattr( self.numbers, name )
+        self.unary( lambda x: function( x, self.state.angle ) )
+
+    def op_complex_i( self ) -> None:
+        """f I: Y becomes the real part and X the imaginary part of X, the stack drops"""
+        self.enter_actions()
+        self.set_complex( True )
+        state = self.state
+        x = self.real( state.X )
+        self.pop_X()
+        state.imaginary[0] = x
+
+    def op_re_im( self ) -> None:
+        """f Re≷Im: exchange the real and imaginary parts of X"""
+        self.enter_actions()
+        self.set_complex( True )
+        state = self.state
+        imaginary = state.imaginary
+        real = self.real( state.X )
+        state.X = self.numbers.number( imaginary[0] )
+        imaginary[0] = real
+
+    def digit( self, char:str ) -> None:
+        mantissa, eex, exponent = self.buffer_X.partition( "e" )
+        if eex:
+            # two exponent digits, a third one pushes the first out
+            sign = "-" if exponent.startswith( "-" ) else ""
+            self.buffer_X = mantissa + "e" + sign + ( exponent.lstrip( "-" ) + char )[-2:]
+        elif sum( c.isdigit() for c in mantissa ) < 10:
+            self.buffer_X += char
+
+    @property
+    def value( self ) -> float:
+        """The number X would hold once digit entry is terminated"""
+        if self.buffer_X:
+            return entry_value( self.buffer_X, self.numbers.number )
+        return self.state.X
+
+    def display( self ) -> str:
+        """Text for the LCD: the entry buffer or the formatted X register"""
+        if self.program_mode:
+            return self.program_display()
+        if self.message is not None:
+            return self.message
+        if self.buffer_X:
+            return entry_text( self.buffer_X )
+        return self.format_number( self.state.X )
+
+    def format_number( self, number:float ) -> str:
+        if isinstance( number, Matrix ):
+            return number.descriptor()
+        state = self.state
+        if isinstance( number, Vector ):
+            return number.descriptor( state.notation, state.fix )
+        return lcd_text( number, state.notation, state.fix )
+
+    def display_tolerance( self, number:float ) -> float:
+        """Half a unit in the last displayed digit"""
+        state = self.state
+        return tolerance( number, state.notation, state.fix )
+
+    def stack_snapshot( self ) -> tuple:
+        """What a cancelled operation restores: stack, settings and digit entry"""
+        return self.state.copy(), self.buffer_X
+
+    def restore_stack( self, snapshot:tuple ) -> None:
+        state, self.buffer_X = snapshot
+        self.state = state.copy()
+        self.shift = ''
+
+    def cancel( self ) -> None:
+        """Ask a running program, SOLVE or ∫ to stop, it raises Cancelled at its next jump"""
+        self.cancelled = True
+
+    def runs_long( self, key:str ) -> bool:
+        """Whether pressing key now starts a long running operation"""
+        return not self.program_mode and self.KEYMAP[ self.shift, key ] in self.BACKGROUND
+
+    def press( self, key:str ) -> None:
+        """Process one key press identified by its button id"""
+        shift = self.shift
+        operation = self.KEYMAP[ shift, key ]
+        self.shift = ''
+        self.message = None
+        if self.program_mode and (shift, key) not in self.PROGRAM_IMMEDIATE:
+            self.record( key, operation )
+        else:
+            operation( self )
+        if self.history is not None and not self.shift:
+            self.history.record( self, shift + " " + key if shift else key )
+
+    def run( self, keys ) -> float:
+        """Press a sequence of keys, either an iterable or a space separated string"""
+        if isinstance( keys, str ):
+            keys = keys.split()
+        press = self.press
+        for key in keys:
+            press( key )
+        return self.value
+
+    def enable_history( self, depth:int=1000 ) -> None:
+        """Keep the last depth states for undo and redo"""
+        self.history = History( depth )
+        self.history.record( self )
+
+    def undo( self ) -> bool:
+        version = self.history.undo() if self.history is not None else None
+        if version is not None:
+            self.restore_version( version )
+        return version is not None
+
+    def redo( self ) -> bool:
+        version = self.history.redo() if self.history is not None else None
+        if version is not None:
+            self.restore_version( version )
+        return version is not None
+
+    def restore_version( self, version ) -> None:
+        """Make the engine the state of a history version, the version stays untouched"""
+        self.state = state = version.state.copy()
+        self.buffer_X = version.buffer_X
+        self.shift = ''
+        self.message = None
+        self.result_name = version.result_name
+        self.registers = self.numbers.registers( version.registers )
+        if self.matrices is not version.matrices:
+            self.matrices = version.matrices.copy()
+            # descriptors on the stack follow the copies
+            for name in ( "X", "Y", "Z", "T", "last_X" ):
+                value = getattr( state, name )
+                if isinstance( value, Matrix ) and value.name in self.matrices:
+                    setattr( state, name, self.matrices[ value.name ] )
+        self.statistics.assign( *version.moments )
+        if self.program != version.program:
+            self.program = list( version.program )
+            self._code = self._labels = None
+            self.line = min( self.line, len( self.program ) )
+
+    def op_noop( self ) -> None:
+        """Unassigned shifted keys only clear the shift state"""
+
+    def op_shift_f( self ) -> None:
+        self.shift = 'f'
+
+    def op_shift_g( self ) -> None:
+        self.shift = 'g'
+
+    def op_on( self ) -> None:
+        self.state_reset()
+        self.program_mode = False
+        self.pending = []
+
+    def op_last_x( self ) -> None:
+        """g LSTx: recall X as it was before the last function"""
+        self.enter_actions()
+        self.push_X( self.state.last_X )
+        imaginary = self.state.imaginary
+        if imaginary is not None:
+            imaginary[0] = imaginary[4]
+
+    def set_notation( self, notation:str ) -> None:
+        """f FIX, SCI or ENG with the number of digits taken from X"""
+        self.enter_actions()
+        self.state.fix = min( max( self.integer( self.state.X ), 0 ), 9 )
+        self.pop_X()
+        self.state.notation = notation
+
+    def op_decimal( self ) -> None:
+        if "." not in self.buffer_X and "e" not in self.buffer_X:
+            self.buffer_X += "." if self.buffer_X else "0."
+
+    def op_eex( self ) -> None:
+        """EEX: the digits that follow are the power of ten, starting from 1 without a mantissa"""
+        if "e" not in self.buffer_X:
+            self.buffer_X = ( self.buffer_X or "1" ) + "e"
+
+    def op_chs( self ) -> None:
+        """CHS negates the exponent or mantissa being keyed in, otherwise X"""
+        buffer = self.buffer_X
+        if not buffer:
+            self.number_function( "negate" )
+        elif "e" in buffer:
+            mantissa, _, exponent = buffer.partition( "e" )
+            self.buffer_X = mantissa + "e" + ( exponent[1:] if exponent.startswith( "-" ) else "-" + exponent )
+        else:
+            self.buffer_X = buffer[1:] if buffer.startswith( "-" ) else "-" + buffer
+
+    def op_pi( self ) -> None:
+        self.enter_actions()
+        self.push_X( self.numbers.pi )
+
+    def op_swap( self ) -> None:
+        self.enter_actions()
+        state = self.state
+        state.X, state.Y = state.Y, state.X
+        imaginary = state.imaginary
+        if imaginary is not None:
+            imaginary[0], imaginary[1] = imaginary[1], imaginary[0]
+
+    def op_roll_down( self ) -> None:
+        self.enter_actions()
+        state = self.state
+        state.X, state.Y, state.Z, state.T = state.Y, state.Z, state.T, state.X
+        imaginary = state.imaginary
+        if imaginary is not None:
+            imaginary[0:4] = imaginary[1:4] + imaginary[0:1]
+
+    def op_roll_up( self ) -> None:
+        self.enter_actions()
+        state = self.state
+        state.X, state.Y, state.Z, state.T = state.T, state.X, state.Y, state.Z
+        imaginary = state.imaginary
+        if imaginary is not None:
+            imaginary[0:4] = imaginary[3:4] + imaginary[0:3]
+
+    def op_clear_x( self ) -> None:
+        self.buffer_X = ""
+        self.state.X = self.numbers.zero
+
+    def op_backspace( self ) -> None:
+        if self.program_mode:
+            self.op_delete_line()
+        elif self.buffer_X:
+            buffer = self.buffer_X[:-1]
+            self.buffer_X = "" if buffer == "-" else buffer
+        else:
+            self.op_clear_x()
+
+    def address( self, index:int | None ) -> int:
+        """Register file index of Rn, I or, for INDIRECT, the register I points at"""
+        registers = self.registers
+        if index is INDIRECT:
+            index = abs( self.integer( registers[ I_REGISTER ] ) )
+        if index >= len( registers ) - 1:
+            raise RPN_Error( 3, f"register {index} is not allocated" )
+        return index
+
+    def store( self, index:int | None ) -> None:
+        self.enter_actions()
+        self.numbers_only( self.state.X )
+        self.registers[ self.address( index ) ] = self.state.X
+
+    def recall( self, index:int | None ) -> None:
+        self.enter_actions()
+        self.push_X( self.registers[ self.address( index ) ] )
+
+    def store_arithmetic( self, index:int | None, name:str ) -> None:
+        """STO + − × ÷: the register becomes register op X"""
+        self.enter_actions()
+        self.numbers_only( self.state.X )
+        registers = self.registers
+        index = self.address( index )
+        registers[ index ] = getattr( self.numbers, name )( registers[ index ], self.state.X )
+
+    def recall_arithmetic( self, index:int | None, name:str ) -> None:
+        """RCL + − × ÷: X becomes X op register without lifting the stack"""
+        self.enter_actions()
+        self.numbers_only( self.state.X )
+        self.state.X = getattr( self.numbers, name )( self.state.X, self.registers[ self.address( index ) ] )
+
+    def program_registers( self, lines:int ) -> int:
+        return -( -lines//self.lines_per_register )
+
+    def uncommitted( self, lines:int | None=None ) -> int:
+        """Registers of the pool not taken by data registers, matrices or program lines"""
+        if lines is None:
+            lines = len( self.program )
+        matrices = sum( matrix.rows*matrix.cols for matrix in self.matrices.values() )
+        return self.memory_size - ( len( self.registers ) - 1 ) - matrices - self.program_registers( lines )
+
+    def reserve( self, registers:int, lines:int | None=None ) -> None:
+        if registers > self.uncommitted( lines ):
+            raise RPN_Error( 10, "insufficient memory" )
+
+    def dimension_registers( self ) -> None:
+        """f DIM (i): X is the highest data register, the rest of the pool stays uncommitted"""
+        self.enter_actions()
+        highest = max( 1, abs( self.integer( self.state.X ) ) )
+        registers = self.registers
+        change = highest + 1 - ( len( registers ) - 1 )
+        self.reserve( change )
+        if change > 0:
+            registers[ I_REGISTER:I_REGISTER ] = self.numbers.zeros( change )
+        elif change < 0:
+            del registers[ highest + 1:I_REGISTER ]
+
+    def op_memory( self ) -> None:
+        """g MEM: highest data register, uncommitted registers, program registers and free lines"""
+        lines = len( self.program )
+        program = self.program_registers( lines )
+        free_lines = program*self.lines_per_register - lines
+        self.message = f"{len( self.registers ) - 2:2d} {self.uncommitted():2d} {program:2d}-{free_lines}"
+        if len( self.message.replace( "-", "" ) ) > N_DIGITS:
+            # a large pool leaves no room for the padding
+            self.message = f"{len( self.registers ) - 2} {self.uncommitted()} {program}-{free_lines}"
+
+    def solve_label( self, label:str ) -> None:
+        """f SOLVE: root of the program at label between the estimates in Y and X"""
+        self.enter_actions()
+        state = self.state
+        t = state.T
+        try:
+            root, previous, value, self.evaluations = solve(
+                self.label_function( label ), self.real( state.Y ), self.real( state.X ),
+                self.display_tolerance( float( state.X ) ), progress=self.progress )
+        except NoRoot as error:
+            raise RPN_Error( 8, str( error ) ) from None
+        number = self.numbers.number
+        state.X, state.Y, state.Z, state.T = number( root ), number( previous ), number( value ), t
+
+    def integrate_label( self, label:str ) -> None:
+        """f ∫ᵧˣ: integral of the program at label from Y to X, the error estimate goes to Y"""
+        self.enter_actions()
+        state = self.state
+        lower, upper = state.Y, state.X
+        try:
+            value, error, self.evaluations = integrate(
+                self.label_function( label ), self.real( lower ), self.real( upper ), self.display_tolerance,
+                progress=self.progress )
+        except NoConvergence as error:
+            raise RPN_Error( 0, str( error ) ) from None
+        number = self.numbers.number
+        state.X, state.Y, state.Z, state.T = number( value ), number( error ), upper, lower
+
+    def label_function( self, label:str ):
+        """The program at label as a float function for SOLVE and ∫, whatever the backend"""
+        number = self.numbers.number
+        return lambda x: float( self.call_label( label, number( x ) ) )
+
+    def store_result( self, matrix:Matrix ) -> Matrix:
+        """Copy a matrix operation's result into the RESULT matrix"""
+        result = self.matrices[ self.result_name ]
+        result.assign( matrix )
+        return result
+
+    def matrix_x( self ) -> Matrix:
+        self.enter_actions()
+        matrix = self.state.X
+        if not isinstance( matrix, Matrix ):
+            raise RPN_Error( 1, "X is not a matrix descriptor" )
+        return matrix
+
+    def dimension( self, name:str ) -> None:
+        self.enter_actions()
+        rows, cols = self.integer( self.state.Y ), self.integer( self.state.X )
+        matrix = self.matrices[ name ]
+        self.reserve( rows*cols - matrix.rows*matrix.cols )
+        matrix.dimension( rows, cols )
+
+    def set_result( self, name:str ) -> None:
+        self.result_name = name
+
+    def matrix_function( self, n:int ) -> None:
+        """f MATRIX n"""
+        if n == 0:
+            for matrix in self.matrices.values():
+                matrix.dimension( 0, 0 )
+        elif n == 1:
+            self.registers[0] = self.registers[1] = self.numbers.one
+        elif n == 4:
+            matrix = self.matrix_x()
+            matrix.assign( matrix.transpose() )
+        elif n == 5:
+            self.enter_actions()
+            if not ( isinstance( self.state.Y, Matrix ) and isinstance( self.state.X, Matrix ) ):
+                raise RPN_Error( 1, "Y and X are not matrix descriptors" )
+            self.binary( lambda y, x: y.transpose().matmul( x ), descriptors=True )
+        elif n == 7:
+            self.state.X = self.numbers.number( self.matrix_x().row_norm() )
+        elif n == 8:
+            self.state.X = self.numbers.number( self.matrix_x().frobenius_norm() )
+        elif n == 9:
+            self.state.X = self.numbers.number( self.matrix_x().determinant() )
+
+    def element_index( self ) -> tuple:
+        return self.integer( self.registers[0] ), self.integer( self.registers[1] )
+
+    def advance_index( self, matrix:Matrix ) -> None:
+        """Step R0/R1 to the next element in row-major order, wrapping to 1,1"""
+        row, col = self.element_index()
+        col += 1
+        if col > matrix.cols:
+            row, col = row + 1, 1
+        if row > matrix.rows:
+            row = 1
+        number = self.numbers.number
+        self.registers[0], self.registers[1] = number( row ), number( col )
+
+    def store_element( self, name:str ) -> None:
+        """STO A: X into the element indexed by R0 and R1"""
+        self.enter_actions()
+        matrix = self.matrices[ name ]
+        matrix[ self.element_index() ] = self.real( self.state.X )
+        self.advance_index( matrix )
+
+    def recall_element( self, name:str ) -> None:
+        self.enter_actions()
+        matrix = self.matrices[ name ]
+        self.push_X( self.numbers.number( matrix[ self.element_index() ] ) )
+        self.advance_index( matrix )
+
+    def store_indexed( self, name:str ) -> None:
+        """STO g A: Z into the element at row Y, column X"""
+        self.enter_actions()
+        state = self.state
+        self.matrices[ name ][ self.integer( state.Y ), self.integer( state.X ) ] = self.real( state.Z )
+        self.pop_X()
+        self.pop_X()
+
+    def recall_indexed( self, name:str ) -> None:
+        self.binary( lambda y, x: self.numbers.number( self.matrices[ name ][ self.integer( y ), self.integer( x ) ] ) )
+
+    def store_matrix( self, name:str ) -> None:
+        """STO MATRIX A: copy the matrix in X, or set every element to X"""
+        self.enter_actions()
+        value = self.state.X
+        if isinstance( value, Matrix ):
+            self.matrices[ name ].assign( value )
+        else:
+            self.matrices[ name ].fill( self.real( value ) )
+
+    def recall_matrix( self, name:str ) -> None:
+        self.enter_actions()
+        self.push_X( self.matrices[ name ] )
+
+    def sync_statistics( self ) -> None:
+        """Mirror the accumulator into the summation registers R2 to R7"""
+        if len( self.registers ) < 9:
+            raise RPN_Error( 3, "statistics need registers R2 to R7" )
+        numbers = self.numbers
+        self.registers[2:8] = numbers.registers( map( numbers.number, self.statistics.sums() ) )
+
+    def op_sigma_plus( self ) -> None:
+        """Σ+: accumulate the pair x, y and show n"""
+        self.enter_actions()
+        state = self.state
+        if isinstance( state.X, Vector ):
+            self.sigma_vector()
+            return
+        if isinstance( state.Y, Vector ):
+            raise RPN_Error( 1, "a vector of x values goes in X" )
+        self.numbers_only( state.X, state.Y )
+        self.statistics.add( float( state.X ), 0.0 if math.isnan( state.Y ) else float( state.Y ) )
+        self.sync_statistics()
+        state.X = self.numbers.number( self.statistics.n )
+
+    def op_sigma_minus( self ) -> None:
+        self.enter_actions()
+        state = self.state
+        if isinstance( state.X, Vector ):
+            self.sigma_vector( remove=True )
+            return
+        if isinstance( state.Y, Vector ):
+            raise RPN_Error( 1, "a vector of x values goes in X" )
+        self.numbers_only( state.X, state.Y )
+        self.statistics.remove( float( state.X ), 0.0 if math.isnan( state.Y ) else float( state.Y ) )
+        self.sync_statistics()
+        state.X = self.numbers.number( self.statistics.n )
+
+    def op_clear_sigma( self ) -> None:
+        self.statistics.clear()
+        self.sync_statistics()
+        self.state.X = self.state.Y = self.state.Z = self.state.T = self.numbers.zero
+
+    def push_pair( self, x:float, y:float ) -> None:
+        self.enter_actions()
+        self.push_X( self.numbers.number( y ) )
+        self.push_X( self.numbers.number( x ) )
+
+    def op_mean( self ) -> None:
+        self.push_pair( *self.statistics.mean() )
+
+    def op_std_dev( self ) -> None:
+        self.push_pair( *self.statistics.std_dev() )
+
+    def op_linear_regression( self ) -> None:
+        slope, intercept = self.statistics.linear_regression()
+        self.push_pair( intercept, slope )
+
+    def op_estimate( self ) -> None:
+        """ŷ,r: ŷ for the x in X, the correlation coefficient goes to Y"""
+        self.enter_actions()
+        estimate, r = self.statistics.estimate( self.real( self.state.X ) )
+        self.state.X = self.numbers.number( r )
+        self.push_X( self.numbers.number( estimate ) )
+
+    def ingest( self, lines ) -> int:
+        """Bulk Σ+ of x,y lines from a file or stdin, bypassing the keypad"""
+        count = self.statistics.ingest( lines )
+        self.sync_statistics()
+        return count
+
+    def op_random( self ) -> None:
+        """f RAN#: the next uniform number in [0, 1)"""
+        self.enter_actions()
+        self.push_X( self.numbers.number( self.random.next() ) )
+
+    def store_seed( self ) -> None:
+        """STO RAN#: X seeds the generator"""
+        self.enter_actions()
+        self.random.seed( self.real( self.state.X ) )
+
+    def recall_seed( self ) -> None:
+        """RCL RAN#: the seed, the last number drawn since"""
+        self.enter_actions()
+        self.push_X( self.numbers.number( self.random.value() ) )
+
+    def random_samples( self, n:int ) -> array:
+        """The next n RAN# draws in one buffer, without the keypad"""
+        return self.random.samples( n )
+
+    def run_samples( self, label:str, samples ) -> array:
+        """The program at label evaluated for every sample in X, as SOLVE and ∫ call it"""
+        function = self.label_function( label )
+        return array( 'd', map( function, samples ) )
+
+    def accumulate_random( self, n:int, label:str | None=None, chunk:int=1 << 16 ) -> int:
+        """Bulk Σ+ of n RAN# draws in chunks, without the keypad: with label x is the program
+        at label evaluated for the draw in y, without one x and y are two successive draws"""
+        statistics = self.statistics
+        for start in range( 0, n, chunk ):
+            count = min( chunk, n - start )
+            if label is None:
+                samples = self.random.samples( 2*count )
+                statistics.extend( samples[ ::2 ], samples[ 1::2 ] )
+            else:
+                samples = self.random.samples( count )
+                statistics.extend( self.run_samples( label, samples ), samples )
+        self.sync_statistics()
+        return n
+
+    def load_vector( self, source, column:int=0 ) -> int:
+        """Push the values of a file, one per line or column of x,y lines, as a vector into X.
+        source is a path or the lines themselves."""
+        self.enter_actions()
+        name = source if isinstance( source, str ) else getattr( source, "name", "input" )
+        try:
+            if isinstance( source, str ):
+                with open( source ) as lines:
+                    vector = read_vector( lines, column )
+            else:
+                vector = read_vector( source, column )
+        except ValueError as error:
+            raise RPN_Error( 1, f"{name} {error}" ) from None
+        if not len( vector ):
+            raise RPN_Error( 1, "no values to load" )
+        self.push_X( vector )
+        return len( vector )
+
+    def export_vector( self, target ) -> int:
+        """Write the vector in X one element per line to target, a path or an open file"""
+        self.enter_actions()
+        vector = self.state.X
+        if not isinstance( vector, Vector ):
+            raise RPN_Error( 1, "X does not hold a vector" )
+        if isinstance( target, str ):
+            with open( target, "w" ) as file:
+                write_vector( vector, file )
+        else:
+            write_vector( vector, target )
+        return len( vector )
+
+    def sigma_vector( self, remove:bool=False ) -> None:
+        """Σ+ or Σ- with a vector in X: every element with the matching one of Y, or Y itself, at once.
+        Pairs with a NaN are left out."""
+        state = self.state
+        xs, y = state.X.data, state.Y
+        if isinstance( y, Vector ):
+            if len( y ) != len( xs ):
+                raise RPN_Error( 11, "vector lengths do not match" )
+            ys = y.data
+        else:
+            y = 0.0 if math.isnan( y ) else float( y )
+            ys = array( 'd', [ y ] )*len( xs )
+        total = sum( xs ) + sum( ys )
+        if total != total:
+            pairs = [ pair for pair in zip( xs, ys ) if pair[0] == pair[0] and pair[1] == pair[1] ]
+            xs, ys = array( 'd', ( x for x, _ in pairs ) ), array( 'd', ( y for _, y in pairs ) )
+        if remove:
+            self.statistics.discard( xs, ys )
+        else:
+            self.statistics.extend( xs, ys )
+        self.sync_statistics()
+        state.X = self.numbers.number( self.statistics.n )
+
+    def loop_control( self, index:int | None, step_sign:int ) -> bool:
+        """DSE/ISG on a nnnnn.xxxyy control number, True when the next line is skipped"""
+        index = self.address( index )
+        value = self.registers[ index ]
+        counter = self.integer( value )
+        fraction = round( abs( value - counter ), 5 )
+        goal, step = divmod( round( fraction*100000 ), 100 )
+        counter += step_sign*( step or 1 )
+        self.registers[ index ] = self.numbers.number( counter + ( fraction if counter >= 0 else -fraction ) )
+        if step_sign < 0:
+            return counter <= goal
+        return counter > goal
+
+
+def unary_op( func ):
+    return lambda engine: engine.unary( func )
+
+def binary_op( func ):
+    return lambda engine: engine.binary( func )
+
+def number_function_op( name:str ):
+    return lambda engine: engine.number_function( name )
+
+def number_operation_op( name:str ):
+    return lambda engine: engine.number_operation( name )
+
+def circular_op( name:str ):
+    return lambda engine: engine.circular( name )
+
+def digit_op( char:str ):
+    return lambda engine: engine.digit( char )
+
+def angle_op( mode:str ):
+    return lambda engine: engine.set_angle( mode )
+
+def notation_op( notation:str ):
+    return lambda engine: engine.set_notation( notation )
+
+def register_op( method, *args ):
+    return lambda engine: method( engine, *args )
+
+def prefix_op( shift:str ):
+    """An operation that waits for an argument key"""
+    def operation( engine ):
+        engine.shift = shift
+    RPN_Engine.PREFIXES.add( operation )
+    return operation
+
+def compare( predicate, descriptors:bool=False ):
+    """A TEST of X and Y, only the equality tests take matrix descriptors and vectors"""
+    def test( engine ) -> bool:
+        engine.enter_actions()
+        if not descriptors:
+            engine.numbers_only( engine.state.X, engine.state.Y )
+        return predicate( engine.state.X, engine.state.Y )
+    return test
+
+
+def complex_power( y:complex, x:complex ) -> complex:
+    """yˣ of complex numbers, 0 to a power with a positive real part is 0"""
+    if not y and x.real > 0:
+        return 0j
+    return y**x
+
+# complex mode forms of the backend functions, on Python complex numbers
+COMPLEX_FUNCTIONS = {
+    "add": operator.add,
+    "subtract": operator.sub,
+    "multiply": operator.mul,
+    "divide": operator.truediv,
+    "power": complex_power,
+    "sqrt": cmath.sqrt,
+    "square": lambda z: z*z,
+    "exp": cmath.exp,
+    "ln": cmath.log,
+    "ten_power": lambda z: cmath.exp( z*math.log( 10 ) ),
+    "log10": cmath.log10,
+    "reciprocal": lambda z: 1/z,
+    "absolute": abs,
+    "sine": cmath.sin,
+    "cosine": cmath.cos,
+    "tangent": cmath.tan,
+}
+
+
+def scalar( value ):
+    return value if isinstance( value, Matrix ) else float( value )
+
+# stack arithmetic with a matrix descriptor in X or Y, scalars are used as floats like the elements
+MATRIX_FUNCTIONS = {
+    "add": lambda y, x: scalar( y ) + scalar( x ),
+    "subtract": lambda y, x: scalar( y ) - scalar( x ),
+    "multiply": lambda y, x: scalar( y )*scalar( x ),
+    "divide": lambda y, x: scalar( y )/scalar( x ),
+    "reciprocal": lambda x: 1/x,
+    "negate": operator.neg,
+}
+
+
+LABEL_KEYS = { "sqrt-x": 'A', "exp-x": 'B', "ten-x": 'C', "wye-x": 'D', "inverse-x": 'E' }
+LABEL_KEYS.update( { "digit-%d" % n: str( n ) for n in range( 10 ) } )
+
+# TEST n, 0 to 9
+TESTS = (
+    lambda x, y: x != 0, lambda x, y: x > 0, lambda x, y: x < 0, lambda x, y: x >= 0,
+    lambda x, y: x <= 0, lambda x, y: x == y, lambda x, y: x != y, lambda x, y: x > y,
+    lambda x, y: x < y, lambda x, y: x >= y,
+)
+# x≠0, x=y and x≠y, which hold for descriptors too
+EQUALITY_TESTS = { 0, 5, 6 }
+
+
+OPERATIONS = {
+    ('', "on"): RPN_Engine.op_on,
+    ('', "shift-f"): RPN_Engine.op_shift_f,
+    ('', "shift-g"): RPN_Engine.op_shift_g,
+    ('', "enter"): RPN_Engine.enter_actions,
+    ('g', "enter"): RPN_Engine.op_last_x,
+    ('', "decimal"): RPN_Engine.op_decimal,
+
+    ('', "addition"): number_operation_op( "add" ),
+    ('', "subtraction"): number_operation_op( "subtract" ),
+    ('', "multiplication"): number_operation_op( "multiply" ),
+    ('', "division"): number_operation_op( "divide" ),
+    ('', "wye-x"): number_operation_op( "power" ),
+    ('f', "addition"): number_operation_op( "permutations" ),
+    ('g', "addition"): number_operation_op( "combinations" ),
+
+    ('', "sqrt-x"): number_function_op( "sqrt" ),
+    ('g', "sqrt-x"): number_function_op( "square" ),
+    ('', "exp-x"): number_function_op( "exp" ),
+    ('g', "exp-x"): number_function_op( "ln" ),
+    ('', "ten-x"): number_function_op( "ten_power" ),
+    ('g', "ten-x"): number_function_op( "log10" ),
+    ('', "inverse-x"): number_function_op( "reciprocal" ),
+    ('', "chs"): RPN_Engine.op_chs,
+    ('', "eex"): RPN_Engine.op_eex,
+    ('g', "chs"): number_function_op( "absolute" ),
+    ('f', "digit-0"): number_function_op( "factorial" ),
+    ('', "sum"): RPN_Engine.op_sigma_plus,
+    ('g', "sum"): RPN_Engine.op_sigma_minus,
+    ('f', "sum"): RPN_Engine.op_linear_regression,
+    ('f', "gsb"): RPN_Engine.op_clear_sigma,
+    ('g', "digit-0"): RPN_Engine.op_mean,
+    ('f', "decimal"): RPN_Engine.op_std_dev,
+    ('g', "decimal"): RPN_Engine.op_estimate,
+    ('f', "sto"): number_function_op( "fraction" ),
+    ('g', "sto"): number_function_op( "integer" ),
+
+    ('', "sin"): circular_op( "sine" ),
+    ('', "cos"): circular_op( "cosine" ),
+    ('', "tan"): circular_op( "tangent" ),
+    ('g', "eex"): RPN_Engine.op_pi,
+
+    ('f', "digit-7"): notation_op( "FIX" ),
+    ('f', "digit-8"): notation_op( "SCI" ),
+    ('f', "digit-9"): notation_op( "ENG" ),
+    ('g', "digit-7"): angle_op( 'deg' ),
+    ('g', "digit-8"): angle_op( 'rad' ),
+    ('g', "digit-9"): angle_op( 'grad' ),
+
+    ('', "x-swap-y"): RPN_Engine.op_swap,
+    ('', "r-down"): RPN_Engine.op_roll_down,
+    ('g', "r-down"): RPN_Engine.op_roll_up,
+    ('', "backspace"): RPN_Engine.op_backspace,
+    ('g', "backspace"): RPN_Engine.op_clear_x,
+
+    ('g', "rtos"): RPN_Engine.op_program_mode,
+    ('', "rtos"): Flow( 'R/S' ),
+    ('f', "rtos"): Flow( 'PSE' ),
+    ('g', "gsb"): Flow( 'RTN' ),
+    ('', "sst"): RPN_Engine.op_sst,
+    ('g', "sst"): RPN_Engine.op_bst,
+    ('f', "r-down"): RPN_Engine.op_clear_program,
+    ('g', "multiplication"): Flow( 'TEST', compare( lambda x, y: x == 0, descriptors=True ) ),
+    ('g', "division"): Flow( 'TEST', compare( lambda x, y: x <= y ) ),
+
+    ('f', "sst"): prefix_op( 'LBL' ),
+    ('', "gto"): prefix_op( 'GTO' ),
+    ('', "gsb"): prefix_op( 'GSB' ),
+    ('', "sto"): prefix_op( 'STO' ),
+    ('STO', "decimal"): prefix_op( 'STO.' ),
+    ('', "rcl"): prefix_op( 'RCL' ),
+    ('RCL', "decimal"): prefix_op( 'RCL.' ),
+    ('f', "digit-5"): prefix_op( 'DSE' ),
+    ('DSE', "decimal"): prefix_op( 'DSE.' ),
+    ('f', "digit-6"): prefix_op( 'ISG' ),
+    ('ISG', "decimal"): prefix_op( 'ISG.' ),
+    ('g', "subtraction"): prefix_op( 'TEST' ),
+    ('f', "division"): prefix_op( 'SOLVE' ),
+    ('f', "multiplication"): prefix_op( 'INTEGRATE' ),
+    ('f', "sin"): prefix_op( 'DIM' ),
+    ('f', "chs"): prefix_op( 'MATRIX' ),
+    ('f', "eex"): prefix_op( 'RESULT' ),
+    ('STO', "shift-g"): prefix_op( 'STOg' ),
+    ('RCL', "shift-g"): prefix_op( 'RCLg' ),
+    ('STO', "chs"): prefix_op( 'STOMATRIX' ),
+    ('RCL', "chs"): prefix_op( 'RCLMATRIX' ),
+    ('DIM', "cos"): RPN_Engine.dimension_registers,
+    ('g', "rcl"): RPN_Engine.op_memory,
+
+    ('f', "enter"): RPN_Engine.op_random,
+    ('STO', "enter"): RPN_Engine.store_seed,
+    ('RCL', "enter"): RPN_Engine.recall_seed,
+
+    ('f', "tan"): RPN_Engine.op_complex_i,
+    ('f', "subtraction"): RPN_Engine.op_re_im,
+    # flag 8 is complex mode, the other flags are not implemented
+    ('g', "digit-4"): prefix_op( 'SF' ),
+    ('g', "digit-5"): prefix_op( 'CF' ),
+    ('g', "digit-6"): prefix_op( 'F?' ),
+    ('SF', "digit-8"): lambda engine: engine.set_complex( True ),
+    ('CF', "digit-8"): lambda engine: engine.set_complex( False ),
+    ('F?', "digit-8"): Flow( 'TEST', lambda engine: engine.complex_mode ),
+}
+OPERATIONS.update( { ('', "digit-"+d): digit_op( d ) for d in "0123456789" } )
+for key, label in LABEL_KEYS.items():
+    if not label.isdigit():
+        # f A to f E run the program at that label
+        OPERATIONS[ 'f', key ] = Flow( 'GSB', label )
+        RPN_Engine.BACKGROUND.add( OPERATIONS[ 'f', key ] )
+    for kind in ( 'LBL', 'GTO', 'GSB' ):
+        OPERATIONS[ kind, key ] = Flow( kind, label )
+    RPN_Engine.BACKGROUND.add( OPERATIONS[ 'GSB', key ] )
+    OPERATIONS[ 'SOLVE', key ] = register_op( RPN_Engine.solve_label, label )
+    OPERATIONS[ 'INTEGRATE', key ] = register_op( RPN_Engine.integrate_label, label )
+    RPN_Engine.BACKGROUND.update( ( OPERATIONS[ 'SOLVE', key ], OPERATIONS[ 'INTEGRATE', key ] ) )
+for key, name in LABEL_KEYS.items():
+    if name.isdigit():
+        continue
+    OPERATIONS[ 'DIM', key ] = register_op( RPN_Engine.dimension, name )
+    OPERATIONS[ 'RESULT', key ] = register_op( RPN_Engine.set_result, name )
+    OPERATIONS[ 'STO', key ] = register_op( RPN_Engine.store_element, name )
+    OPERATIONS[ 'RCL', key ] = register_op( RPN_Engine.recall_element, name )
+    OPERATIONS[ 'STOg', key ] = register_op( RPN_Engine.store_indexed, name )
+    OPERATIONS[ 'RCLg', key ] = register_op( RPN_Engine.recall_indexed, name )
+    OPERATIONS[ 'STOMATRIX', key ] = register_op( RPN_Engine.store_matrix, name )
+    OPERATIONS[ 'RCLMATRIX', key ] = register_op( RPN_Engine.recall_matrix, name )
+for n in range( 10 ):
+    key = "digit-%d" % n
+    OPERATIONS[ 'STO', key ] = register_op( RPN_Engine.store, n )
+    OPERATIONS[ 'STO.', key ] = register_op( RPN_Engine.store, 10 + n )
+    OPERATIONS[ 'RCL', key ] = register_op( RPN_Engine.recall, n )
+    OPERATIONS[ 'RCL.', key ] = register_op( RPN_Engine.recall, 10 + n )
+    OPERATIONS[ 'DSE', key ] = Flow( 'LOOP', register_op( RPN_Engine.loop_control, n, -1 ) )
+    OPERATIONS[ 'DSE.', key ] = Flow( 'LOOP', register_op( RPN_Engine.loop_control, 10 + n, -1 ) )
+    OPERATIONS[ 'ISG', key ] = Flow( 'LOOP', register_op( RPN_Engine.loop_control, n, 1 ) )
+    OPERATIONS[ 'ISG.', key ] = Flow( 'LOOP', register_op( RPN_Engine.loop_control, 10 + n, 1 ) )
+    OPERATIONS[ 'TEST', key ] = Flow( 'TEST', compare( TESTS[n], n in EQUALITY_TESTS ) )
+    OPERATIONS[ 'MATRIX', key ] = register_op( RPN_Engine.matrix_function, n )
+# STO and RCL with register arithmetic, each with a decimal register prefix
+ARITHMETIC = { "addition": ( '+', "add" ), "subtraction": ( '-', "subtract" ),
+               "multiplication": ( '*', "multiply" ), "division": ( '/', "divide" ) }
+for prefix, method in ( ( 'STO', RPN_Engine.store_arithmetic ), ( 'RCL', RPN_Engine.recall_arithmetic ) ):
+    for key, ( symbol, operation ) in ARITHMETIC.items():
+        shift = prefix + symbol
+        OPERATIONS[ prefix, key ] = prefix_op( shift )
+        OPERATIONS[ shift, "decimal" ] = prefix_op( shift + '.' )
+        for n in range( 10 ):
+            OPERATIONS[ shift, "digit-%d" % n ] = register_op( method, n, operation )
+            OPERATIONS[ shift + '.', "digit-%d" % n ] = register_op( method, 10 + n, operation )
+        OPERATIONS[ shift, "cos" ] = register_op( method, INDIRECT, operation )
+        OPERATIONS[ shift, "tan" ] = register_op( method, I_REGISTER, operation )
+# I and (i) for STO, RCL, DSE and ISG
+for kind, index in ( ( "tan", I_REGISTER ), ( "cos", INDIRECT ) ):
+    OPERATIONS[ 'STO', kind ] = register_op( RPN_Engine.store, index )
+    OPERATIONS[ 'RCL', kind ] = register_op( RPN_Engine.recall, index )
+    OPERATIONS[ 'DSE', kind ] = Flow( 'LOOP', register_op( RPN_Engine.loop_control, index, -1 ) )
+    OPERATIONS[ 'ISG', kind ] = Flow( 'LOOP', register_op( RPN_Engine.loop_control, index, 1 ) )
+# pressing the other shift switches to it, pressing the same one cancels
+OPERATIONS[ 'g', "shift-f" ] = RPN_Engine.op_shift_f
+OPERATIONS[ 'f', "shift-g" ] = RPN_Engine.op_shift_g
+OPERATIONS[ 'f', "on" ] = OPERATIONS[ 'g', "on" ] = RPN_Engine.op_on
+
+
+def build_keymap( operations:dict ) -> dict:
+    """Dispatch table over every (shift, key id) pair, unassigned pairs are no-ops"""
+    shifts = { '' } | { shift for shift, key in operations }
+    keymap = { (shift, key): RPN_Engine.op_noop for shift in shifts for key in KEY_IDS }
+    keymap.update( operations )
+    return keymap
+
+RPN_Engine.KEYMAP = build_keymap( OPERATIONS )
+RPN_Engine.BACKGROUND.add( OPERATIONS[ '', "rtos" ] )
+RPN_Engine.PREFIXES.update( { RPN_Engine.op_shift_f, RPN_Engine.op_shift_g } )
+
+
+def evaluate( keys ) -> float:
+    """Evaluate a keystroke script on a fresh engine and return X"""
+    return RPN_Engine().run( keys )
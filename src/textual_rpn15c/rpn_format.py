@@ -0,0 +1,132 @@
+"""
+LCD formatting for the 15c engine.
+Numbers are shown in FIX, SCI or ENG notation on the ten digit LCD, falling
+back to SCI when FIX cannot show them, the exponent takes the last two digit
+cells. The LCD itself works on cells, a separator cell in front of every
+digit cell; text becomes cells in one pass. Both steps are pure functions of
+their arguments behind small LRU caches, as the same values are redisplayed
+after every mode change, stack roll and refresh.
+"""
+
+import math
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+N_DIGITS = 10
+# every segment lit, what the unlit cells show faintly
+OFF_TEXT = "-" + ",".join( "8"*N_DIGITS )
+SEPARATORS = "-.,"
+DIGIT_CHARACTERS = " 0123456789ABCDEF"
+NOTATIONS = ( "FIX", "SCI", "ENG" )
+# the 15c range, beyond it the LCD shows the overflow value
+MAXIMUM = 9.999999999e99
+MINIMUM = 1e-99
+
+
+@lru_cache( maxsize=256 )
+def lcd_cells( text:str, characters:str=DIGIT_CHARACTERS ) -> tuple:
+    """The (character, active) pair of every separator and digit cell for LCD text"""
+    cells = []
+    pos = 0
+    n_chars = len( text )
+    for idx in range( N_DIGITS ):
+        separator = ( OFF_TEXT[ 2*idx ], False )
+        digit = ( OFF_TEXT[ 2*idx+1 ], False )
+        if pos < n_chars and text[pos] in SEPARATORS:
+            separator = ( text[pos], True )
+            pos += 1
+        if pos < n_chars and text[pos] in characters:
+            digit = ( text[pos], True )
+            pos += 1
+        cells.append( separator )
+        cells.append( digit )
+    return tuple( cells )
+
+
+def with_exponent( sign:str, mantissa:str, exponent:str, width:int=N_DIGITS ) -> str:
+    """Mantissa from the left, the exponent such as '-05' in the last two of width digit cells"""
+    digits = len( mantissa ) - mantissa.count( "." )
+    return sign + mantissa + " "*( width - 2 - digits ) + exponent
+
+
+def decimal_value( magnitude ) -> Decimal:
+    """magnitude as the decimal it was keyed or printed as, not its binary neighbour"""
+    return magnitude if isinstance( magnitude, Decimal ) else Decimal( repr( float( magnitude ) ) )
+
+
+def rounded( value:Decimal, exponent:int ) -> Decimal:
+    """value rounded to a multiple of 10**exponent, halves away from zero like the 15c"""
+    return value.quantize( Decimal( 1 ).scaleb( exponent ), ROUND_HALF_UP )
+
+
+def scientific( magnitude:float, digits:int ) -> tuple:
+    """(significant digits, decimal exponent) of magnitude rounded to digits + 1 figures"""
+    if not magnitude:
+        return "0"*( digits + 1 ), 0
+    value = decimal_value( magnitude )
+    exponent = value.adjusted()
+    mantissa = rounded( value.scaleb( -exponent ), -digits )
+    if mantissa >= 10:
+        # 9.99995 rounds up into the next decade
+        exponent += 1
+        mantissa = rounded( value.scaleb( -exponent ), -digits )
+    return "".join( map( str, mantissa.as_tuple().digits ) ), exponent
+
+
+@lru_cache( maxsize=256 )
+def lcd_text( number:float, notation:str="FIX", digits:int=4, width:int=N_DIGITS ) -> str:
+    """LCD text of number in notation with digits decimals or, for SCI and ENG, digits + 1 figures,
+    in width digit cells, at least 4"""
+    if number != number or number == 0 or abs( number ) < MINIMUM:
+        number = 0.0
+    sign = "-" if number < 0 else ""
+    magnitude = min( abs( number ), MAXIMUM )
+    if notation == "FIX" and magnitude < 10.0**width:
+        value = decimal_value( magnitude )
+        shown = rounded( value, -digits )
+        if shown < 10**width and ( shown or not magnitude ):
+            decimals = min( digits, width - len( str( int( shown ) ) ) )
+            shown = rounded( value, -decimals )
+            if shown >= 10**width:
+                return lcd_text( number, "SCI", digits, width )
+            return sign + f"{shown:,f}" + ( "" if decimals else "." )
+        # too large or too small for FIX
+        notation = "SCI"
+    # one blank cell at least between mantissa and exponent
+    digits = min( digits, 6, width - 4 )
+    figures, exponent = scientific( magnitude, digits )
+    if exponent > 99:
+        figures, exponent = "9"*( digits + 1 ), 99
+    if notation == "ENG":
+        shift = exponent % 3
+        exponent -= shift
+        figures = figures.ljust( shift + 1, "0" )
+        mantissa = figures[ :shift + 1 ] + "." + figures[ shift + 1: ]
+    else:
+        mantissa = figures[0] + "." + figures[1:]
+    return with_exponent( sign, mantissa, ( "-" if exponent < 0 else "" ) + "%02d" % abs( exponent ), width )
+
+
+def entry_text( buffer:str ) -> str:
+    """LCD text of digit entry, the exponent keyed after EEX goes to the last two digit cells"""
+    mantissa, eex, exponent = buffer.partition( "e" )
+    if not eex:
+        return buffer
+    sign = "-" if mantissa.startswith( "-" ) else ""
+    negative = "-" if exponent.startswith( "-" ) else ""
+    return with_exponent( sign, mantissa.lstrip( "-" ), negative + exponent.lstrip( "-" ).rjust( 2, "0" ) )
+
+
+def entry_value( buffer:str, number=float ) -> float:
+    """The number digit entry stands for, an exponent still being keyed counts as 0"""
+    mantissa, eex, exponent = buffer.partition( "e" )
+    if eex and exponent.lstrip( "-" ):
+        return number( mantissa + "e" + exponent )
+    return number( mantissa )
+
+
+def tolerance( number:float, notation:str, digits:int ) -> float:
+    """Half a unit in the last displayed digit of number"""
+    if notation == "FIX" or not number or not math.isfinite( number ):
+        return 0.5*10**-digits
+    return 0.5*10**( math.floor( math.log10( abs( number ) ) ) - min( digits, 6 ) )
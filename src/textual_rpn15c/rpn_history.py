@@ -0,0 +1,111 @@
+"""
+Undo history for the 15c engine.
+After every key the engine's state becomes a Version. A version copies the
+stack slots and shares the registers, matrices, statistics and program with
+the version before it unless the key changed them, so a step that only moves
+the stack costs a constant amount of memory. The oldest versions are evicted
+once the history is at its depth.
+"""
+
+from collections import deque
+
+try:
+    from .rpn_matrix import Matrices
+except ImportError:
+    from rpn_matrix import Matrices
+
+
+class Version:
+    """One immutable machine state and the key that led to it"""
+
+    __slots__ = ( "key", "state", "buffer_X", "result_name", "registers", "matrices", "moments", "program" )
+
+    def matrices_equal( self, matrices:Matrices ) -> bool:
+        mine = self.matrices
+        if len( mine ) != len( matrices ):
+            return False
+        for name, matrix in matrices.items():
+            other = mine.get( name )
+            if ( other is None or other.rows != matrix.rows or other.cols != matrix.cols
+                    or other.data != matrix.data ):
+                return False
+        return True
+
+
+class History:
+    """Versions oldest first with a cursor, undo moves it back and redo forward"""
+
+    def __init__( self, depth:int=1000 ) -> None:
+        self.versions = deque( maxlen=max( depth, 1 ) )
+        self.position = -1
+
+    def __len__( self ) -> int:
+        return len( self.versions )
+
+    @property
+    def current( self ) -> Version | None:
+        return self.versions[ self.position ] if self.versions else None
+
+    def record( self, engine, key:str | None=None ) -> bool:
+        """Add the engine state as a new version unless it is the current one, True when added.
+        Parts the key did not change are shared with the current version."""
+        state = engine.state
+        previous = self.current
+        if previous is None:
+            registers = engine.numbers.registers( engine.registers )
+            matrices = engine.matrices.copy()
+            moments = engine.statistics.moments()
+            program = list( engine.program )
+        else:
+            registers = previous.registers
+            if registers != engine.registers:
+                registers = engine.numbers.registers( engine.registers )
+            matrices = previous.matrices
+            if not previous.matrices_equal( engine.matrices ):
+                matrices = engine.matrices.copy()
+            moments = previous.moments
+            if moments != engine.statistics.moments():
+                moments = engine.statistics.moments()
+            program = previous.program
+            if program != engine.program:
+                program = list( engine.program )
+            old = previous.state
+            if ( registers is previous.registers and matrices is previous.matrices
+                    and moments is previous.moments and program is previous.program
+                    and previous.buffer_X == engine.buffer_X and previous.result_name == engine.result_name
+                    and old.X is state.X and old.Y is state.Y and old.Z is state.Z and old.T is state.T
+                    and old.last_X is state.last_X and old.notation == state.notation
+                    and old.fix == state.fix and old.angle == state.angle
+                    and old.imaginary == state.imaginary ):
+                return False
+        version = Version.__new__( Version )
+        version.key = key
+        version.state = state.copy()
+        version.buffer_X = engine.buffer_X
+        version.result_name = engine.result_name
+        version.registers = registers
+        version.matrices = matrices
+        version.moments = moments
+        version.program = program
+        # a new branch drops the versions that could have been redone
+        while len( self.versions ) > self.position + 1:
+            self.versions.pop()
+        self.versions.append( version )
+        self.position = len( self.versions ) - 1
+        return True
+
+    def undo( self ) -> Version | None:
+        if self.position <= 0:
+            return None
+        self.position -= 1
+        return self.versions[ self.position ]
+
+    def redo( self ) -> Version | None:
+        if self.position >= len( self.versions ) - 1:
+            return None
+        self.position += 1
+        return self.versions[ self.position ]
+
+    def clear( self ) -> None:
+        self.versions.clear()
+        self.position = -1
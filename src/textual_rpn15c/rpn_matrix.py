@@ -0,0 +1,293 @@
+"""
+Matrices A to E for the 15c MATRIX functions.
+Elements live in one contiguous row-major array('d'). The LU decomposition
+of a matrix is computed on demand and cached until the matrix is modified,
+so a determinant followed by solves against the same system factors once.
+NumPy is used for the heavy lifting when it is installed, viewing the
+same buffer without copies.
+"""
+
+import math
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from .rpn_program import RPN_Error
+except ImportError:
+    from rpn_program import RPN_Error
+
+
+class LU:
+    """Row pivoted LU factors of a square matrix, L and U share one n×n table"""
+
+    __slots__ = ( "n", "table", "perm", "sign", "singular" )
+
+    def __init__( self, data:array, n:int ) -> None:
+        self.n = n
+        self.sign = 1.0
+        self.singular = False
+        if numpy is not None:
+            self.factor_numpy( data )
+        else:
+            self.factor_python( data )
+
+    def factor_numpy( self, data:array ) -> None:
+        n = self.n
+        a = numpy.array( data, dtype=float ).reshape( n, n )
+        perm = numpy.arange( n )
+        for k in range( n ):
+            p = k + int( numpy.argmax( numpy.abs( a[k:, k] ) ) )
+            if a[p, k] == 0:
+                self.singular = True
+                continue
+            if p != k:
+                a[[k, p]] = a[[p, k]]
+                perm[[k, p]] = perm[[p, k]]
+                self.sign = -self.sign
+            a[k+1:, k] /= a[k, k]
+            a[k+1:, k+1:] -= numpy.outer( a[k+1:, k], a[k, k+1:] )
+        self.table = a
+        self.perm = perm
+
+    def factor_python( self, data:array ) -> None:
+        n = self.n
+        a = [ data[ i*n:(i+1)*n ].tolist() for i in range( n ) ]
+        perm = list( range( n ) )
+        for k in range( n ):
+            p = max( range( k, n ), key=lambda i: abs( a[i][k] ) )
+            pivot = a[p][k]
+            if pivot == 0:
+                self.singular = True
+                continue
+            if p != k:
+                a[k], a[p] = a[p], a[k]
+                perm[k], perm[p] = perm[p], perm[k]
+                self.sign = -self.sign
+            tail = a[k][k+1:]
+            for i in range( k+1, n ):
+                row = a[i]
+                factor = row[k]/pivot
+                row[k] = factor
+                if factor:
+                    row[k+1:] = [ r - factor*t for r, t in zip( row[k+1:], tail ) ]
+        self.table = a
+        self.perm = perm
+
+    def determinant( self ) -> float:
+        if self.singular:
+            return 0.0
+        det = self.sign
+        table = self.table
+        for i in range( self.n ):
+            det *= table[i][i]
+        return float( det )
+
+    def solve( self, rhs:array, cols:int ) -> array:
+        """Solve A·X = B for the n×cols matrix B in rhs, row-major in and out"""
+        if self.singular:
+            raise RPN_Error( 0, "singular matrix" )
+        n = self.n
+        lu = self.table
+        if numpy is not None:
+            b = numpy.frombuffer( rhs, dtype=float ).reshape( n, cols )
+            x = b[ self.perm ].copy()
+            for i in range( n ):
+                x[i] -= lu[i, :i] @ x[:i]
+            for i in reversed( range( n ) ):
+                x[i] = ( x[i] - lu[i, i+1:] @ x[i+1:] )/lu[i, i]
+            return array( 'd', x.tobytes() )
+        x = [ rhs[ p*cols:(p+1)*cols ].tolist() for p in self.perm ]
+        for i in range( n ):
+            row = lu[i]
+            xi = x[i]
+            for k in range( i ):
+                factor = row[k]
+                if factor:
+                    xi[:] = [ v - factor*w for v, w in zip( xi, x[k] ) ]
+        for i in reversed( range( n ) ):
+            row = lu[i]
+            xi = x[i]
+            for k in range( i+1, n ):
+                factor = row[k]
+                if factor:
+                    xi[:] = [ v - factor*w for v, w in zip( xi, x[k] ) ]
+            pivot = row[i]
+            xi[:] = [ v/pivot for v in xi ]
+        return array( 'd', [ v for row in x for v in row ] )
+
+
+class Matrix:
+    """A named rows×cols matrix, shown on the stack by its descriptor"""
+
+    __slots__ = ( "name", "rows", "cols", "data", "_lu" )
+
+    def __init__( self, name:str | None=None, rows:int=0, cols:int=0, data:array | None=None ) -> None:
+        self.name = name
+        self.rows = rows
+        self.cols = cols
+        self.data = data if data is not None else array( 'd', bytes( 8*rows*cols ) )
+        self._lu = None
+
+    def __repr__( self ) -> str:
+        return f"Matrix({self.name!r}, {self.rows}, {self.cols})"
+
+    def copy( self ) -> 'Matrix':
+        """An independent copy, the cached factors are never modified and stay shared"""
+        other = Matrix( self.name, self.rows, self.cols, array( 'd', self.data ) )
+        other._lu = self._lu
+        return other
+
+    def descriptor( self ) -> str:
+        """LCD text, the name followed by the dimensions"""
+        return f"{self.name or ' '}{self.rows:5d}{self.cols:4d}"
+
+    def modified( self ) -> None:
+        self._lu = None
+
+    def dimension( self, rows:int, cols:int ) -> None:
+        """Redimension keeping the elements in row-major order, as the 15c does"""
+        if rows < 0 or cols < 0:
+            raise RPN_Error( 1, "improper matrix dimension" )
+        missing = rows*cols - len( self.data )
+        if missing < 0:
+            del self.data[ rows*cols: ]
+        else:
+            self.data.extend( array( 'd', bytes( 8*missing ) ) )
+        self.rows = rows
+        self.cols = cols
+        self.modified()
+
+    def assign( self, other:'Matrix' ) -> None:
+        """Take the dimensions and elements of other"""
+        self.rows = other.rows
+        self.cols = other.cols
+        self.data = array( 'd', other.data )
+        self.modified()
+
+    def fill( self, value:float ) -> None:
+        self.data = array( 'd', [ value ] )*( self.rows*self.cols )
+        self.modified()
+
+    def offset( self, row:int, col:int ) -> int:
+        if not ( 1 <= row <= self.rows and 1 <= col <= self.cols ):
+            raise RPN_Error( 3, f"no element {row},{col} in matrix {self.name}" )
+        return ( row - 1 )*self.cols + col - 1
+
+    def __getitem__( self, index:tuple ) -> float:
+        return self.data[ self.offset( *index ) ]
+
+    def __setitem__( self, index:tuple, value:float ) -> None:
+        self.data[ self.offset( *index ) ] = value
+        self._lu = None
+
+    def view( self ):
+        """A NumPy view sharing this matrix's buffer"""
+        return numpy.frombuffer( self.data, dtype=float ).reshape( self.rows, self.cols )
+
+    def lu( self ) -> LU:
+        if self.rows != self.cols:
+            raise RPN_Error( 11, f"matrix {self.name} is not square" )
+        if self._lu is None:
+            self._lu = LU( self.data, self.rows )
+        return self._lu
+
+    def determinant( self ) -> float:
+        return self.lu().determinant()
+
+    def solve( self, rhs:'Matrix' ) -> 'Matrix':
+        """self⁻¹·rhs"""
+        if rhs.rows != self.rows:
+            raise RPN_Error( 11, "matrix dimensions do not match" )
+        return Matrix( None, rhs.rows, rhs.cols, self.lu().solve( rhs.data, rhs.cols ) )
+
+    def inverse( self ) -> 'Matrix':
+        n = self.rows
+        identity = array( 'd', bytes( 8*n*n ) )
+        identity[ ::n+1 ] = array( 'd', [1.0] )*n
+        return Matrix( None, n, n, self.lu().solve( identity, n ) )
+
+    def transpose( self ) -> 'Matrix':
+        rows, cols = self.rows, self.cols
+        data = self.data
+        return Matrix( None, cols, rows, array( 'd', [ data[ r*cols + c ] for c in range( cols ) for r in range( rows ) ] ) )
+
+    def row_norm( self ) -> float:
+        cols = self.cols
+        return max( ( math.fsum( abs( v ) for v in self.data[ r*cols:(r+1)*cols ] ) for r in range( self.rows ) ), default=0.0 )
+
+    def frobenius_norm( self ) -> float:
+        return math.sqrt( math.fsum( v*v for v in self.data ) )
+
+    def map( self, func ) -> 'Matrix':
+        return Matrix( None, self.rows, self.cols, array( 'd', map( func, self.data ) ) )
+
+    def elementwise( self, other:'Matrix', func ) -> 'Matrix':
+        if ( self.rows, self.cols ) != ( other.rows, other.cols ):
+            raise RPN_Error( 11, "matrix dimensions do not match" )
+        return Matrix( None, self.rows, self.cols, array( 'd', map( func, self.data, other.data ) ) )
+
+    def matmul( self, other:'Matrix' ) -> 'Matrix':
+        if self.cols != other.rows:
+            raise RPN_Error( 11, "matrix dimensions do not match" )
+        if numpy is not None:
+            product = self.view() @ other.view()
+            return Matrix( None, self.rows, other.cols, array( 'd', product.tobytes() ) )
+        n, m = self.cols, other.cols
+        columns = [ other.data[ c::m ] for c in range( m ) ]
+        data = array( 'd' )
+        for r in range( self.rows ):
+            row = self.data[ r*n:(r+1)*n ]
+            data.extend( math.fsum( map( float.__mul__, row, column ) ) for column in columns )
+        return Matrix( None, self.rows, m, data )
+
+    # stack arithmetic, Y op X with either side a matrix
+
+    def __add__( self, other ):
+        if isinstance( other, Matrix ):
+            return self.elementwise( other, float.__add__ )
+        return self.map( lambda v: v + other )
+
+    __radd__ = __add__
+
+    def __sub__( self, other ):
+        if isinstance( other, Matrix ):
+            return self.elementwise( other, float.__sub__ )
+        return self.map( lambda v: v - other )
+
+    def __rsub__( self, other ):
+        return self.map( lambda v: other - v )
+
+    def __mul__( self, other ):
+        if isinstance( other, Matrix ):
+            return self.matmul( other )
+        return self.map( lambda v: v*other )
+
+    __rmul__ = __mul__
+
+    def __truediv__( self, other ):
+        if isinstance( other, Matrix ):
+            # Y ÷ X with both matrices solves X·R = Y
+            return other.solve( self )
+        return self.map( lambda v: v/other )
+
+    def __rtruediv__( self, other ):
+        inverse = self.inverse()
+        return inverse if other == 1 else inverse*other
+
+    def __neg__( self ):
+        return self.map( float.__neg__ )
+
+
+class Matrices( dict ):
+    """Matrices A to E by name, each created when it is first used"""
+
+    def __missing__( self, name:str ) -> Matrix:
+        matrix = self[ name ] = Matrix( name )
+        return matrix
+
+    def copy( self ) -> 'Matrices':
+        return Matrices( ( name, matrix.copy() ) for name, matrix in self.items() )
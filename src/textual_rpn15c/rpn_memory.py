@@ -0,0 +1,347 @@
+"""
+Continuous Memory for the 15c engine.
+A calculator is kept in two files: a binary snapshot of the whole machine and
+an append-only journal of fixed size records, one group per refresh, holding
+only the stack, setting, register, statistics and matrix element values that
+changed. Startup maps the snapshot and replays the journal up to its last
+complete group. Program edits, redimensioning and a journal past its limit
+write a new snapshot and start an empty journal.
+"""
+
+import mmap
+import os
+import struct
+from array import array
+
+try:
+    from .rpn_format import NOTATIONS
+    from .rpn_matrix import Matrices, Matrix
+    from .rpn_vector import Vector
+except ImportError:
+    from rpn_format import NOTATIONS
+    from rpn_matrix import Matrices, Matrix
+    from rpn_vector import Vector
+
+SNAPSHOT_MAGIC = b"RPN15CS6"
+JOURNAL_MAGIC = b"RPN15CJ2"
+# magic, generation, X Y Z T LSTx, descriptor names of those, notation, fix, angle, result, registers, matrices, program bytes,
+# statistics moments, complex mode and the imaginary X Y Z T LSTx, RAN# seed
+SNAPSHOT = struct.Struct( "<8sQ5d5sBBBcHBI6dB5dQ" )
+SHAPE = struct.Struct( "<cHH" )
+JOURNAL = struct.Struct( "<8sQ" )
+# tag, matrix of an element, index, value
+RECORD = struct.Struct( "<BBId" )
+
+COMMIT, STACK, DESCRIPTOR, FIX, ANGLE, RESULT, REGISTER, MOMENT, ELEMENT, NOTATION, IMAGINARY, SEED = range( 12 )
+STACK_NAMES = ( "X", "Y", "Z", "T", "last_X" )
+ANGLES = ( "deg", "rad", "grad" )
+MATRIX_NAMES = "ABCDE"
+MOMENTS = ( "n", "mean_x", "mean_y", "m2_x", "m2_y", "c_xy" )
+
+
+def default_path() -> str:
+    """$XDG_STATE_HOME/rpn-15c/memory, ~/.local/state by default"""
+    state = os.environ.get( "XDG_STATE_HOME" ) or os.path.join( os.path.expanduser( "~" ), ".local", "state" )
+    return os.path.join( state, "rpn-15c", "memory" )
+
+
+def same( a:float, b:float ) -> bool:
+    """Equal values, NaN being the same as NaN"""
+    return a == b or ( a != a and b != b )
+
+
+def kept( value ):
+    """What is kept of a stack value: a vector came from a file and is not, it is NaN"""
+    return float( "nan" ) if isinstance( value, Vector ) else value
+
+
+class ContinuousMemory:
+    """Snapshot and journal files of one calculator, and a mirror of what they hold"""
+
+    def __init__( self, path:str, journal_limit:int=1 << 16 ) -> None:
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.journal_limit = journal_limit
+        self.journal = None
+        self.journal_size = 0
+        self.generation = 0
+        self.stack = ()
+        self.imaginary = None
+        self.seed = 0
+        self.settings = ()
+        self.moments = ()
+        self.registers = array( 'd' )
+        self.shapes = ()
+        self.elements = {}
+        self.program = []
+
+    # mirror of the files
+
+    def mirror( self, engine ) -> None:
+        state = engine.state
+        self.stack = tuple( kept( value ) for value in ( state.X, state.Y, state.Z, state.T, state.last_X ) )
+        self.imaginary = None if state.imaginary is None else array( 'd', state.imaginary )
+        self.seed = engine.random.state
+        self.settings = ( state.notation, state.fix, state.angle, engine.result_name )
+        statistics = engine.statistics
+        self.moments = tuple( getattr( statistics, name ) for name in MOMENTS )
+        self.registers = array( 'd', engine.registers )
+        self.shapes = self.matrix_shapes( engine )
+        self.elements = { name: array( 'd', engine.matrices[ name ].data ) for name, rows, cols in self.shapes }
+        self.program = list( engine.program )
+
+    @staticmethod
+    def matrix_shapes( engine ) -> tuple:
+        return tuple( ( name, matrix.rows, matrix.cols ) for name, matrix in sorted( engine.matrices.items() )
+                      if matrix.rows*matrix.cols )
+
+    # snapshot
+
+    def encode( self, engine ) -> bytes:
+        state = engine.state
+        stack = ( state.X, state.Y, state.Z, state.T, state.last_X )
+        values = [ float( "nan" ) if isinstance( value, Matrix ) else kept( value ) for value in stack ]
+        names = bytes( ord( value.name or "\0" ) if isinstance( value, Matrix ) else 0 for value in stack )
+        shapes = self.matrix_shapes( engine )
+        program = "\n".join( " ".join( line ) for line in engine.program ).encode()
+        statistics = engine.statistics
+        imaginary = state.imaginary
+        parts = [ SNAPSHOT.pack( SNAPSHOT_MAGIC, self.generation, *values, names, NOTATIONS.index( state.notation ), state.fix,
+                                 ANGLES.index( state.angle ), engine.result_name.encode(),
+                                 len( engine.registers ), len( shapes ), len( program ),
+                                 *( float( getattr( statistics, name ) ) for name in MOMENTS ),
+                                 imaginary is not None, *( ( 0.0, )*5 if imaginary is None else imaginary ),
+                                 engine.random.state ),
+                  array( 'd', engine.registers ).tobytes() ]
+        for name, rows, cols in shapes:
+            parts.append( SHAPE.pack( name.encode(), rows, cols ) )
+            parts.append( engine.matrices[ name ].data.tobytes() )
+        parts.append( program )
+        return b"".join( parts )
+
+    def decode( self, engine, view ) -> None:
+        """Load a snapshot from a buffer, ValueError when it is not one"""
+        if len( view ) < SNAPSHOT.size or view[:8] != SNAPSHOT_MAGIC:
+            raise ValueError( "not a rpn-15c memory snapshot" )
+        ( _, generation, X, Y, Z, T, last_X, names, notation, fix, angle, result, n_registers, n_matrices, program_size,
+          *moments, complex_mode, iX, iY, iZ, iT, last_iX, seed ) = SNAPSHOT.unpack_from( view )
+        offset = SNAPSHOT.size
+        registers = array( 'd' )
+        registers.frombytes( view[ offset:offset + 8*n_registers ] )
+        offset += 8*n_registers
+        matrices = Matrices()
+        for _ in range( n_matrices ):
+            name, rows, cols = SHAPE.unpack_from( view, offset )
+            offset += SHAPE.size
+            data = array( 'd' )
+            data.frombytes( view[ offset:offset + 8*rows*cols ] )
+            offset += 8*rows*cols
+            name = name.decode()
+            matrices[ name ] = Matrix( name, rows, cols, data )
+        program = bytes( view[ offset:offset + program_size ] ).decode()
+        if len( registers ) != n_registers or offset + program_size != len( view ):
+            raise ValueError( "truncated rpn-15c memory snapshot" )
+        engine.state_reset()
+        engine.program_reset()
+        state = engine.state
+        numbers = engine.numbers
+        for index, value in enumerate( ( X, Y, Z, T, last_X ) ):
+            value = matrices[ chr( names[ index ] ) ] if names[ index ] else numbers.number( value )
+            setattr( state, STACK_NAMES[ index ], value )
+        engine.random.state = seed
+        if complex_mode:
+            state.imaginary = array( 'd', ( iX, iY, iZ, iT, last_iX ) )
+        state.notation = NOTATIONS[ notation ]
+        state.fix = fix
+        state.angle = ANGLES[ angle ]
+        engine.result_name = result.decode()
+        engine.registers = numbers.registers( map( numbers.number, registers ) )
+        engine.matrices = matrices
+        for name, value in zip( MOMENTS, moments ):
+            setattr( engine.statistics, name, value )
+        engine.statistics.n = int( engine.statistics.n )
+        engine.program = [ tuple( line.split() ) for line in program.split( "\n" ) ] if program else []
+        self.generation = generation
+
+    def write_file( self, path:str, data:bytes ) -> None:
+        """Replace path with data, a crash leaves either the old or the new file"""
+        temporary = path + ".tmp"
+        with open( temporary, "wb" ) as output:
+            output.write( data )
+            output.flush()
+            os.fsync( output.fileno() )
+        os.replace( temporary, path )
+
+    def compact( self, engine ) -> None:
+        """Write the whole machine as a new snapshot and start an empty journal"""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        os.makedirs( os.path.dirname( os.path.abspath( self.path ) ), exist_ok=True )
+        self.generation += 1
+        self.write_file( self.path, self.encode( engine ) )
+        # a journal of an older generation is ignored, so a crash between the two files is harmless
+        self.write_file( self.journal_path, JOURNAL.pack( JOURNAL_MAGIC, self.generation ) )
+        self.open_journal()
+        self.mirror( engine )
+
+    # journal
+
+    def open_journal( self ) -> None:
+        self.journal = open( self.journal_path, "ab", buffering=0 )
+        self.journal_size = self.journal.tell()
+
+    def replay( self, engine, data:bytes ) -> int:
+        """Apply every complete group of the journal, returns the length of that part"""
+        if len( data ) < JOURNAL.size:
+            return 0
+        magic, generation = JOURNAL.unpack_from( data )
+        if magic != JOURNAL_MAGIC or generation != self.generation:
+            return 0
+        committed = offset = JOURNAL.size
+        group = []
+        end = len( data ) - RECORD.size
+        while offset <= end:
+            record = RECORD.unpack_from( data, offset )
+            offset += RECORD.size
+            if record[0] == COMMIT:
+                for tag, matrix, index, value in group:
+                    self.apply( engine, tag, index, value, matrix )
+                group = []
+                committed = offset
+            else:
+                group.append( record )
+        return committed
+
+    @staticmethod
+    def apply( engine, tag:int, index:int, value:float, matrix:int=0 ) -> None:
+        if tag == STACK:
+            setattr( engine.state, STACK_NAMES[ index ], engine.numbers.number( value ) )
+        elif tag == DESCRIPTOR:
+            setattr( engine.state, STACK_NAMES[ index ], engine.matrices[ chr( int( value ) ) ] )
+        elif tag == IMAGINARY:
+            engine.state.imaginary[ index ] = value
+        elif tag == SEED:
+            engine.random.state = int( value )
+        elif tag == NOTATION:
+            engine.state.notation = NOTATIONS[ int( value ) ]
+        elif tag == FIX:
+            engine.state.fix = int( value )
+        elif tag == ANGLE:
+            engine.state.angle = ANGLES[ int( value ) ]
+        elif tag == RESULT:
+            engine.result_name = chr( int( value ) )
+        elif tag == REGISTER:
+            engine.registers[ index ] = engine.numbers.number( value )
+        elif tag == MOMENT:
+            setattr( engine.statistics, MOMENTS[ index ], int( value ) if index == 0 else value )
+        elif tag == ELEMENT:
+            element = engine.matrices[ MATRIX_NAMES[ matrix ] ]
+            element.data[ index ] = value
+            element.modified()
+
+    def changes( self, engine ) -> list | None:
+        """Records for what changed since the last save, None when only a new snapshot will do"""
+        if ( len( engine.registers ) != len( self.registers ) or engine.program != self.program
+                or self.matrix_shapes( engine ) != self.shapes
+                or ( engine.state.imaginary is None ) != ( self.imaginary is None ) ):
+            return None
+        records = []
+        pack = RECORD.pack
+        state = engine.state
+        for index, ( value, old ) in enumerate( zip( ( state.X, state.Y, state.Z, state.T, state.last_X ), self.stack ) ):
+            value = kept( value )
+            if isinstance( value, Matrix ):
+                if value is not old:
+                    if value.name not in MATRIX_NAMES:
+                        return None
+                    records.append( pack( DESCRIPTOR, 0, index, ord( value.name ) ) )
+            elif isinstance( old, Matrix ) or not same( value, old ):
+                records.append( pack( STACK, 0, index, value ) )
+        imaginary = state.imaginary
+        if imaginary is not None and imaginary != self.imaginary:
+            for index, ( value, old ) in enumerate( zip( imaginary, self.imaginary ) ):
+                if not same( value, old ):
+                    records.append( pack( IMAGINARY, 0, index, value ) )
+        if engine.random.state != self.seed:
+            # ten digits, exact in a double
+            records.append( pack( SEED, 0, 0, engine.random.state ) )
+        notation, fix, angle, result = self.settings
+        if state.notation != notation:
+            records.append( pack( NOTATION, 0, 0, NOTATIONS.index( state.notation ) ) )
+        if state.fix != fix:
+            records.append( pack( FIX, 0, 0, state.fix ) )
+        if state.angle != angle:
+            records.append( pack( ANGLE, 0, 0, ANGLES.index( state.angle ) ) )
+        if engine.result_name != result:
+            records.append( pack( RESULT, 0, 0, ord( engine.result_name ) ) )
+        registers = array( 'd', engine.registers )
+        if registers.tobytes() != self.registers.tobytes():
+            for index, ( value, old ) in enumerate( zip( registers, self.registers ) ):
+                if not same( value, old ):
+                    records.append( pack( REGISTER, 0, index, value ) )
+        statistics = engine.statistics
+        for index, ( name, old ) in enumerate( zip( MOMENTS, self.moments ) ):
+            value = getattr( statistics, name )
+            if not same( value, old ):
+                records.append( pack( MOMENT, 0, index, value ) )
+        for name, data in self.elements.items():
+            current = engine.matrices[ name ].data
+            if current.tobytes() != data.tobytes():
+                matrix = MATRIX_NAMES.index( name )
+                for offset, ( value, old ) in enumerate( zip( current, data ) ):
+                    if not same( value, old ):
+                        records.append( pack( ELEMENT, matrix, offset, value ) )
+        return records
+
+    def save( self, engine ) -> None:
+        """Journal what changed as one group, one small sequential write"""
+        if self.journal is None:
+            self.compact( engine )
+            return
+        records = self.changes( engine )
+        if records is None or self.journal_size >= self.journal_limit:
+            self.compact( engine )
+            return
+        if records:
+            records.append( RECORD.pack( COMMIT, 0, 0, 0.0 ) )
+            data = b"".join( records )
+            self.journal.write( data )
+            self.journal_size += len( data )
+            self.mirror( engine )
+
+    def load( self, engine ) -> bool:
+        """Restore engine from the files, False when there is no usable memory"""
+        try:
+            with open( self.path, "rb" ) as snapshot, \
+                    mmap.mmap( snapshot.fileno(), 0, access=mmap.ACCESS_READ ) as mapped, \
+                    memoryview( mapped ) as view:
+                self.decode( engine, view )
+        except ( OSError, ValueError, struct.error, UnicodeDecodeError, IndexError ):
+            self.generation = 0
+            engine.program_reset()
+            engine.state_reset()
+            return False
+        try:
+            with open( self.journal_path, "rb" ) as journal:
+                data = journal.read()
+        except OSError:
+            data = b""
+        committed = self.replay( engine, data )
+        if committed:
+            # drop a torn group at the end and keep appending after the last complete one
+            if committed != len( data ):
+                os.truncate( self.journal_path, committed )
+            self.open_journal()
+            self.mirror( engine )
+        else:
+            self.compact( engine )
+        return True
+
+    def close( self, engine=None ) -> None:
+        """Compact into the snapshot when engine is given, otherwise keep the journal as it is"""
+        if engine is not None:
+            self.compact( engine )
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
@@ -0,0 +1,275 @@
+"""
+Numeric backends for the 15c engine.
+Every number operation of the engine is a method of its backend, looked up
+by name, so the operations themselves are the same for all backends: binary
+floats for speed, decimal rounded to 10 digits in the 15c range like the
+real calculator, or 34 digit decimal for high precision. Angles in degrees
+and grads are reduced to a quadrant before converting, so sin 180° is 0.
+"""
+
+import decimal
+import math
+import operator
+from array import array
+from functools import lru_cache
+
+try:
+    from .rpn_combinatorics import (LOG_MAX, MEMO_SIZE, combinations, factorial, integers, log_combinations,
+                                    log_permutations, permutations)
+    from .rpn_program import RPN_Error
+except ImportError:
+    from rpn_combinatorics import (LOG_MAX, MEMO_SIZE, combinations, factorial, integers, log_combinations,
+                                   log_permutations, permutations)
+    from rpn_program import RPN_Error
+
+NAN = float('nan')
+QUARTER_TURNS = { 'deg': 90, 'grad': 100 }
+# decimal signals carry their conditions instead of a message
+SIGNALS = { decimal.DivisionByZero: "division by zero", decimal.Overflow: "overflow",
+            decimal.InvalidOperation: "invalid operation" }
+PI = decimal.Decimal( "3.14159265358979323846264338327950288419716939937510582097494459" )
+# more than the 34 digit backend needs for |x| ≤ π, a bound rather than a tuning knob
+SERIES_TERMS = 100
+
+
+def power( y:float, x:float ) -> float:
+    """yˣ, rejecting overflowing results from their logarithm before computing"""
+    if y < 0 and x != math.floor( x ):
+        raise ValueError( "yˣ of a negative y needs an integer x" )
+    if y and math.isfinite( x ) and x*math.log( abs( y ) ) > LOG_MAX:
+        raise OverflowError( "yˣ overflows" )
+    return y**x
+
+
+def describe( error:Exception ) -> str:
+    """The message of an error, a decimal signal named by what it signals"""
+    for signal, text in SIGNALS.items():
+        if isinstance( error, signal ):
+            return text
+    return str( error )
+
+
+class Numbers:
+    """Arithmetic and functions on one kind of number. Subclasses supply the
+    primitives, the trigonometric functions in the current angle mode are shared."""
+
+    name = ""
+
+    def quadrant( self, x, angle:str ) -> tuple:
+        """(quarter turns, remainder in radians), the reduction is exact in degrees and grads"""
+        if not self.finite( x ):
+            raise RPN_Error( 1, "sin, cos and tan need a finite x" )
+        quarter = QUARTER_TURNS.get( angle )
+        if quarter is None:
+            return 0, x
+        turns = round( x/quarter )
+        return turns, self.radians( x - quarter*turns, quarter )
+
+    def sine( self, x, angle:str ):
+        turns, r = self.quadrant( x, angle )
+        value = self.cos( r ) if turns % 2 else self.sin( r )
+        return -value if turns % 4 >= 2 and value else value
+
+    def cosine( self, x, angle:str ):
+        turns, r = self.quadrant( x, angle )
+        value = self.sin( r ) if turns % 2 else self.cos( r )
+        return -value if ( turns + 1 ) % 4 >= 2 and value else value
+
+    def tangent( self, x, angle:str ):
+        turns, r = self.quadrant( x, angle )
+        if turns % 2:
+            return -self.reciprocal( self.tan( r ) )
+        return self.tan( r )
+
+    def __repr__( self ) -> str:
+        return f"<{self.name} numbers>"
+
+
+class FloatNumbers( Numbers ):
+    """Binary floats, the fastest backend"""
+
+    name = "float"
+    nan = NAN
+    zero = 0.0
+    one = 1.0
+    pi = math.pi
+    number = float
+    add = operator.add
+    subtract = operator.sub
+    multiply = operator.mul
+    divide = operator.truediv
+    negate = operator.neg
+    absolute = abs
+    finite = staticmethod( math.isfinite )
+    sqrt = math.sqrt
+    exp = math.exp
+    ln = math.log
+    log10 = math.log10
+    sin = math.sin
+    cos = math.cos
+    tan = math.tan
+    power = staticmethod( power )
+    factorial = staticmethod( factorial )
+    permutations = staticmethod( permutations )
+    combinations = staticmethod( combinations )
+    RADIANS = { quarter: math.pi/( 2*quarter ) for quarter in QUARTER_TURNS.values() }
+
+    def registers( self, values ) -> array:
+        return array( 'd', values )
+
+    def zeros( self, n:int ) -> array:
+        return array( 'd', bytes( 8*n ) )
+
+    def radians( self, x:float, quarter:int ) -> float:
+        return x*self.RADIANS[ quarter ]
+
+    def square( self, x:float ) -> float:
+        return x*x
+
+    def reciprocal( self, x:float ) -> float:
+        return 1/x
+
+    def ten_power( self, x:float ) -> float:
+        return power( 10.0, x )
+
+    def fraction( self, x:float ) -> float:
+        return math.modf( x )[0]
+
+    def integer( self, x:float ) -> float:
+        return math.modf( x )[1]
+
+
+class DecimalNumbers( Numbers ):
+    """Decimal floating point rounded to digits significant digits after every operation"""
+
+    def __init__( self, digits:int=10, exponent:int=99, name:str="decimal" ) -> None:
+        self.name = name
+        traps = [ decimal.DivisionByZero, decimal.InvalidOperation, decimal.Overflow ]
+        self.context = context = decimal.Context( prec=digits, rounding=decimal.ROUND_HALF_UP,
+                                                  Emax=exponent, Emin=-exponent, traps=traps )
+        # guard digits for series and angle conversion, rounded once at the end
+        self.work = work = decimal.Context( prec=digits + 5, Emax=2*exponent + 10, Emin=-2*exponent - 10,
+                                            traps=traps )
+        self.nan = decimal.Decimal( "NaN" )
+        self.zero = decimal.Decimal( 0 )
+        self.one = decimal.Decimal( 1 )
+        self.pi = context.plus( PI )
+        self.two_pi = work.multiply( 2, PI )
+        self.RADIANS = { quarter: work.divide( PI, 2*quarter ) for quarter in QUARTER_TURNS.values() }
+        self.add = context.add
+        self.subtract = context.subtract
+        self.multiply = context.multiply
+        self.divide = context.divide
+        self.negate = context.minus
+        self.absolute = context.abs
+        self.sqrt = context.sqrt
+        self.exp = context.exp
+        self.ln = context.ln
+        self.log10 = context.log10
+        self.power = context.power
+
+    def number( self, value ) -> decimal.Decimal:
+        """A backend number from entry text, an int or a float result of the float based parts,
+        a float by its shortest repr rather than its binary expansion"""
+        if isinstance( value, float ):
+            value = repr( value )
+        return self.context.create_decimal( value )
+
+    def registers( self, values ) -> list:
+        return list( values )
+
+    def zeros( self, n:int ) -> list:
+        return [ self.zero ]*n
+
+    def finite( self, x:decimal.Decimal ) -> bool:
+        return x.is_finite() if isinstance( x, decimal.Decimal ) else math.isfinite( x )
+
+    def radians( self, x:decimal.Decimal, quarter:int ) -> decimal.Decimal:
+        return self.work.multiply( x, self.RADIANS[ quarter ] )
+
+    def square( self, x:decimal.Decimal ) -> decimal.Decimal:
+        return self.context.multiply( x, x )
+
+    def reciprocal( self, x:decimal.Decimal ) -> decimal.Decimal:
+        return self.context.divide( 1, x )
+
+    def ten_power( self, x:decimal.Decimal ) -> decimal.Decimal:
+        return self.context.power( 10, x )
+
+    def integer( self, x:decimal.Decimal ) -> decimal.Decimal:
+        return x.to_integral_value( rounding=decimal.ROUND_DOWN, context=self.context )
+
+    def fraction( self, x:decimal.Decimal ) -> decimal.Decimal:
+        return self.context.subtract( x, self.integer( x ) )
+
+    def check_range( self, log:float, name:str ) -> None:
+        """Reject a result from its natural logarithm before computing it"""
+        exponent = log/math.log( 10 )
+        if exponent > self.context.Emax + 1:
+            raise OverflowError( f"{name} ≈ 10^{exponent:.0f} overflows" )
+
+    def product( self, log:float, name:str, factors ) -> decimal.Decimal:
+        """The factors multiplied at the working precision and rounded once, log is the natural
+        logarithm of the result"""
+        self.check_range( log, name )
+        multiply = self.work.multiply
+        result = self.one
+        for factor in factors:
+            result = multiply( result, factor )
+        return self.context.plus( result )
+
+    @lru_cache( maxsize=MEMO_SIZE )
+    def factorial( self, x:decimal.Decimal ) -> decimal.Decimal:
+        """A product for integers, exact while it fits the digits, through the float Γ otherwise"""
+        if x == x.to_integral_value() and x >= 0:
+            n = int( x )
+            return self.product( math.lgamma( n + 1 ), "x!", range( 2, n + 1 ) )
+        return self.number( factorial( float( x ) ) )
+
+    @lru_cache( maxsize=MEMO_SIZE )
+    def permutations( self, y:decimal.Decimal, x:decimal.Decimal ) -> decimal.Decimal:
+        n, k = integers( y, x )
+        return self.product( log_permutations( n, k ), "Py,x", range( n - k + 1, n + 1 ) )
+
+    @lru_cache( maxsize=MEMO_SIZE )
+    def combinations( self, y:decimal.Decimal, x:decimal.Decimal ) -> decimal.Decimal:
+        n, k = integers( y, x )
+        k = min( k, n - k )
+        self.check_range( log_combinations( n, k ), "Cy,x" )
+        multiply, divide = self.work.multiply, self.work.divide
+        result = self.one
+        for i in range( 1, k + 1 ):
+            result = divide( multiply( result, n - k + i ), i )
+        return self.context.plus( result )
+
+    def series( self, x:decimal.Decimal, cosine:bool ) -> decimal.Decimal:
+        """sin or cos of x radians at the working precision, NaN and infinities would never converge"""
+        if not x.is_finite():
+            raise RPN_Error( 1, "sin, cos and tan need a finite x" )
+        with decimal.localcontext( self.work ):
+            x = x.remainder_near( self.two_pi )
+            square = x*x
+            term = total = decimal.Decimal( 1 ) if cosine else x
+            for i in range( 0 if cosine else 1, 2*SERIES_TERMS, 2 ):
+                term = -term*square/( ( i + 1 )*( i + 2 ) )
+                if total + term == total:
+                    break
+                total += term
+            return total
+
+    def sin( self, x:decimal.Decimal ) -> decimal.Decimal:
+        return self.context.plus( self.series( x, False ) ) or self.zero
+
+    def cos( self, x:decimal.Decimal ) -> decimal.Decimal:
+        return self.context.plus( self.series( x, True ) ) or self.zero
+
+    def tan( self, x:decimal.Decimal ) -> decimal.Decimal:
+        return self.context.divide( self.series( x, False ), self.series( x, True ) )
+
+
+FLOAT = FloatNumbers()
+NUMBERS = {
+    "float": FLOAT,
+    "decimal": DecimalNumbers(),
+    "precise": DecimalNumbers( 34, 999999, "precise" ),
+}
@@ -0,0 +1,129 @@
+"""
+Opt-in operation profiler for rpn-15c.
+Nothing here is referenced by the engine or the view. When profiling is
+switched on the profiler shadows the methods of interest on the instances
+with timed wrappers, or moves the engine to a timed subclass, so an
+unprofiled calculator runs the exact same code as before. Timings go into
+power of two nanosecond histograms and can be dumped as JSON.
+"""
+
+import json
+import threading
+import time
+
+
+class Histogram:
+    """Call count, total and log2 buckets of durations in nanoseconds"""
+
+    __slots__ = ( "count", "total", "maximum", "buckets" )
+
+    def __init__( self ) -> None:
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+        self.buckets = [0]*48
+
+    def add( self, ns:int ) -> None:
+        self.count += 1
+        self.total += ns
+        if ns > self.maximum:
+            self.maximum = ns
+        self.buckets[ min( ns.bit_length(), 47 ) ] += 1
+
+    def percentile( self, fraction:float ) -> int:
+        """Upper bound of the bucket holding the fraction-th duration"""
+        rank = fraction*self.count
+        seen = 0
+        for bits, n in enumerate( self.buckets ):
+            seen += n
+            if n and seen >= rank:
+                return min( 1 << bits, self.maximum )
+        return self.maximum
+
+    def as_dict( self ) -> dict:
+        return {
+            "count": self.count,
+            "total ms": self.total/1e6,
+            "mean us": self.total/self.count/1e3 if self.count else 0.0,
+            "p50 us": self.percentile( 0.5 )/1e3,
+            "p99 us": self.percentile( 0.99 )/1e3,
+            "max us": self.maximum/1e3,
+            "buckets": { f"<{1 << bits}ns": n for bits, n in enumerate( self.buckets ) if n },
+        }
+
+
+class Profiler:
+    """Counters and timing histograms per key operation and per render step"""
+
+    def __init__( self, path:str | None=None ) -> None:
+        self.path = path
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def record( self, name:str, ns:int ) -> None:
+        with self.lock:
+            histogram = self.histograms.get( name )
+            if histogram is None:
+                histogram = self.histograms[ name ] = Histogram()
+            histogram.add( ns )
+
+    def timed( self, name:str, func ):
+        """func wrapped to record its duration under name"""
+        record = self.record
+        clock = time.perf_counter_ns
+
+        def wrapper( *args, **kwargs ):
+            start = clock()
+            try:
+                return func( *args, **kwargs )
+            finally:
+                record( name, clock() - start )
+        return wrapper
+
+    def wrap( self, obj, method:str, name:str ) -> None:
+        setattr( obj, method, self.timed( name, getattr( obj, method ) ) )
+
+    def instrument_engine( self, engine ) -> None:
+        """Time every key press under its shift and key, e.g. 'op f digit-0'.
+        The engine has __slots__, so it is switched to a timed subclass instead."""
+        record = self.record
+        clock = time.perf_counter_ns
+        base = type( engine )
+
+        class ProfiledEngine( base ):
+            __slots__ = ()
+
+            def press( self, key:str ) -> None:
+                name = f"op {self.shift} {key}" if self.shift else "op " + key
+                start = clock()
+                try:
+                    base.press( self, key )
+                finally:
+                    record( name, clock() - start )
+
+        engine.__class__ = ProfiledEngine
+
+    def instrument_display( self, lcd ) -> None:
+        self.wrap( lcd, "parse_value", "render parse_value" )
+        self.wrap( lcd, "render_line", "render render_line" )
+        self.wrap( lcd, "build_line", "render build_line" )
+
+    def report( self ) -> dict:
+        with self.lock:
+            return { name: histogram.as_dict() for name, histogram in sorted( self.histograms.items() ) }
+
+    def table( self, limit:int=20 ) -> str:
+        """The most expensive entries by total time, as fixed width text"""
+        with self.lock:
+            rows = sorted( self.histograms.items(), key=lambda item: -item[1].total )[:limit]
+            lines = [ f"{'':28s}{'count':>7s}{'mean µs':>10s}{'p99 µs':>10s}{'total ms':>10s}" ]
+            for name, h in rows:
+                lines.append( f"{name[:28]:28s}{h.count:7d}{h.total/h.count/1e3:10.1f}"
+                              f"{h.percentile( 0.99 )/1e3:10.1f}{h.total/1e6:10.2f}" )
+        return "\n".join( lines )
+
+    def dump( self, path:str | None=None ) -> None:
+        path = path or self.path
+        if path:
+            with open( path, "w" ) as output:
+                json.dump( self.report(), output, indent=2 )
@@ -0,0 +1,267 @@
+"""
+Keystroke program memory for the 15c engine.
+Program lines are recorded as the key ids that were pressed. Before running
+they are compiled once into a flat instruction list of (operation, kind,
+argument) with labels resolved to line indexes, so the interpreter never
+goes back through the keymap or the view.
+"""
+
+try:
+    from .keypad import KEY_CODES
+except ImportError:
+    from keypad import KEY_CODES
+
+
+class RPN_Error( Exception ):
+    """A calculator error, shown on the LCD as 'Error n'"""
+
+    def __init__( self, code:int, message:str ) -> None:
+        super().__init__( f"Error {code}: {message}" )
+        self.code = code
+
+
+class Cancelled( Exception ):
+    """A running program, SOLVE or ∫ was interrupted from the keyboard"""
+
+
+class Flow:
+    """A keymap operation that changes the flow of a running program"""
+
+    def __init__( self, kind:str, argument=None ) -> None:
+        self.kind = kind
+        self.argument = argument
+
+    def __call__( self, engine ) -> None:
+        engine.keyboard_flow( self )
+
+    def __repr__( self ) -> str:
+        return f"Flow({self.kind!r}, {self.argument!r})"
+
+
+class RPN_Program:
+    """Program memory, P/R mode and the interpreter, mixed into RPN_Engine"""
+
+    __slots__ = ( "program", "_code", "_labels", "line", "returns", "pending", "program_mode",
+                  "pause_on_pse", "paused", "cancelled" )
+
+    # (shift, key) pairs that act immediately in P/R mode instead of being recorded
+    PROGRAM_IMMEDIATE = frozenset( {
+        ('', "on"), ('f', "on"), ('g', "on"),
+        ('g', "rtos"), ('', "sst"), ('g', "sst"), ('', "backspace"), ('f', "r-down"),
+    } )
+    PREFIXES: set = set()
+
+    def program_reset( self ) -> None:
+        self.program = []
+        self.program_changed()
+
+    def program_changed( self ) -> None:
+        self._code = None
+        self._labels = None
+        self.line = 0
+        self.returns = []
+        self.pending = []
+        self.program_mode = False
+        self.pause_on_pse = False
+        self.paused = False
+        self.cancelled = False
+
+    def clone_program( self, other:'RPN_Program' ) -> None:
+        """Copy program memory into other, the compiled code is immutable and shared"""
+        other.program = list( self.program )
+        other._code = self._code
+        other._labels = self._labels
+        other.line = self.line
+        other.returns = list( self.returns )
+        other.pending = list( self.pending )
+        other.program_mode = self.program_mode
+        other.pause_on_pse = self.pause_on_pse
+        other.paused = self.paused
+        other.cancelled = False
+
+    def record( self, key:str, operation ) -> None:
+        """Record a key press in P/R mode, a line is complete once no prefix is pending"""
+        if operation in self.PREFIXES:
+            self.pending.append( key )
+            operation( self )
+            return
+        if operation is not self.op_noop.__func__:
+            self.reserve( 0, len( self.program ) + 1 )
+            self.line += 1
+            self.program.insert( self.line - 1, tuple( self.pending ) + (key,) )
+            self._code = None
+        self.pending = []
+
+    def program_display( self ) -> str:
+        if not self.line:
+            return "000-"
+        codes = [ "%2d" % KEY_CODES[ key ] for key in self.program[ self.line - 1 ] ]
+        return "%03d-" % self.line + ",".join( codes )
+
+    def op_program_mode( self ) -> None:
+        self.program_mode = not self.program_mode
+        self.pending = []
+
+    def op_sst( self ) -> None:
+        if self.program_mode:
+            self.line = ( self.line + 1 ) % ( len( self.program ) + 1 )
+        elif self.program:
+            self.execute( max( self.line, 1 ) - 1, single=True )
+
+    def op_bst( self ) -> None:
+        self.line = ( self.line - 1 ) % ( len( self.program ) + 1 )
+
+    def op_delete_line( self ) -> None:
+        if self.line:
+            del self.program[ self.line - 1 ]
+            self.line -= 1
+            self._code = None
+
+    def op_clear_program( self ) -> None:
+        if self.program_mode:
+            self.program_reset()
+            self.program_mode = True
+        else:
+            self.line = 0
+
+    def labels( self ) -> dict:
+        if self._labels is None:
+            self.compile()
+        return self._labels
+
+    def label_line( self, label:str ) -> int:
+        try:
+            return self.labels()[ label ]
+        except KeyError:
+            raise RPN_Error( 4, f"no label {label}" ) from None
+
+    def compile( self ) -> list:
+        """Flatten program memory into (operation, kind, argument) instructions"""
+        if self._code is not None:
+            return self._code
+        keymap = self.KEYMAP
+        operations = []
+        labels = {}
+        saved_shift = self.shift
+        for index, keys in enumerate( self.program ):
+            shift = ''
+            for key in keys[:-1]:
+                self.shift = shift
+                keymap[ shift, key ]( self )
+                shift = self.shift
+            operation = keymap[ shift, keys[-1] ]
+            if isinstance( operation, Flow ) and operation.kind == 'LBL':
+                labels.setdefault( operation.argument, index )
+            operations.append( operation )
+        self.shift = saved_shift
+        code = []
+        for operation in operations:
+            if not isinstance( operation, Flow ):
+                code.append( ( operation, None, None ) )
+            elif operation.kind == 'LBL':
+                code.append( ( None, 'LBL', None ) )
+            elif operation.kind in ( 'GTO', 'GSB' ):
+                if operation.argument not in labels:
+                    raise RPN_Error( 4, f"no label {operation.argument}" )
+                code.append( ( None, operation.kind, labels[ operation.argument ] + 1 ) )
+            else:
+                code.append( ( operation.argument, operation.kind, None ) )
+        self._code = code
+        self._labels = labels
+        return code
+
+    def execute( self, pc:int, single:bool=False ) -> None:
+        """Run compiled instructions from index pc until R/S, PSE or the final return"""
+        code = self.compile()
+        returns = self.returns
+        n_lines = len( code )
+        self.paused = False
+        try:
+            while True:
+                if pc >= n_lines:
+                    if not returns:
+                        pc = -1
+                        break
+                    pc = returns.pop()
+                    continue
+                operation, kind, argument = code[ pc ]
+                pc += 1
+                if kind is None:
+                    operation( self )
+                elif kind == 'GTO':
+                    # every endless loop passes a GTO or GSB, checking there keeps the hot path lean
+                    if self.cancelled:
+                        raise Cancelled( "program interrupted" )
+                    pc = argument
+                elif kind == 'GSB':
+                    if self.cancelled:
+                        raise Cancelled( "program interrupted" )
+                    returns.append( pc )
+                    pc = argument
+                elif kind == 'RTN':
+                    if not returns:
+                        pc = -1
+                        break
+                    pc = returns.pop()
+                elif kind == 'TEST':
+                    if not operation( self ):
+                        pc += 1
+                elif kind == 'LOOP':
+                    if operation( self ):
+                        pc += 1
+                elif kind == 'R/S':
+                    break
+                elif kind == 'PSE' and self.pause_on_pse:
+                    self.paused = True
+                    break
+                if single:
+                    break
+        finally:
+            if pc < 0:
+                returns.clear()
+                self.line = 0
+            else:
+                self.line = pc + 1 if pc < n_lines else 0
+
+    def call_label( self, label:str, x:float ) -> float:
+        """Evaluate the program at label as a function of x, as SOLVE and ∫ do.
+        The stack is filled with x and the result is left in X."""
+        if self.cancelled:
+            raise Cancelled( "interrupted" )
+        start = self.label_line( label ) + 1
+        saved = self.line, self.returns, self.paused, self.pause_on_pse
+        self.returns = []
+        self.pause_on_pse = False
+        self.buffer_X = ""
+        state = self.state
+        state.X = state.Y = state.Z = state.T = x
+        try:
+            self.execute( start )
+        finally:
+            self.line, self.returns, self.paused, self.pause_on_pse = saved
+        self.enter_actions()
+        return self.state.X
+
+    def resume( self ) -> None:
+        """Continue a program stopped by R/S or PSE"""
+        self.execute( max( self.line, 1 ) - 1 )
+
+    def keyboard_flow( self, flow:Flow ) -> None:
+        """A flow operation pressed from the keyboard in run mode"""
+        kind = flow.kind
+        if kind == 'GTO':
+            self.line = self.label_line( flow.argument ) + 1
+        elif kind == 'GSB':
+            # digits keyed before the program runs are a finished number, as for SOLVE and ∫
+            self.enter_actions()
+            self.returns = []
+            self.execute( self.label_line( flow.argument ) + 1 )
+        elif kind == 'RTN':
+            self.line = 0
+            self.returns = []
+        elif kind == 'R/S':
+            if self.program:
+                self.enter_actions()
+                self.resume()
+        elif kind in ( 'TEST', 'LOOP' ):
+            flow.argument( self )
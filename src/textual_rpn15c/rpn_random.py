@@ -0,0 +1,104 @@
+"""
+RAN# for the 15c engine.
+The generator is the 15c's linear congruence on ten digit integers,
+r ← (a·r + c) mod 10¹⁰, and RAN# is r/10¹⁰, so the same seed gives the same
+sequence every run. Bulk draws fill an array('d'); with NumPy a block of
+draws is computed at once from the last one by jumping ahead k steps,
+r_k = (A_k·r + C_k) mod 10¹⁰, without NumPy a plain loop fills it.
+"""
+
+import math
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from .rpn_program import RPN_Error
+except ImportError:
+    from rpn_program import RPN_Error
+
+MODULUS = 10**10
+MULTIPLIER = 1574352261
+INCREMENT = 1017980433
+# draws per NumPy block, and the split that keeps products of ten digit numbers in 64 bits
+BLOCK = 4096
+HALF = 10**5
+
+
+def jump_table( block:int ) -> tuple:
+    """(A_k, C_k) for k = 1 … block as uint64 arrays, r_k = (A_k·r + C_k) mod 10¹⁰"""
+    factors, offsets = [], []
+    a, c = 1, 0
+    for _ in range( block ):
+        a, c = a*MULTIPLIER % MODULUS, ( c*MULTIPLIER + INCREMENT ) % MODULUS
+        factors.append( a )
+        offsets.append( c )
+    return numpy.array( factors, dtype=numpy.uint64 ), numpy.array( offsets, dtype=numpy.uint64 )
+
+
+class RandomNumbers:
+    """The RAN# generator of one calculator, STO RAN# seeds it and RCL RAN# reads it back"""
+
+    __slots__ = ( "state", )
+    JUMPS = None
+
+    def __init__( self, seed:float=0.0 ) -> None:
+        self.seed( seed )
+
+    def copy( self ) -> 'RandomNumbers':
+        other = RandomNumbers.__new__( RandomNumbers )
+        other.state = self.state
+        return other
+
+    def seed( self, x:float ) -> None:
+        """A seed below 1 keeps its first ten decimals and reads back as is, a larger one its ten
+        mantissa digits"""
+        x = abs( float( x ) )
+        if not math.isfinite( x ):
+            raise RPN_Error( 1, "STO RAN# needs a finite seed" )
+        if x < 1:
+            self.state = round( x*MODULUS ) % MODULUS
+        else:
+            self.state = int( f"{x:.9e}".partition( "e" )[0].replace( ".", "" ) )
+
+    def value( self ) -> float:
+        """RCL RAN#: the seed, which is also the last number drawn"""
+        return self.state/MODULUS
+
+    def next( self ) -> float:
+        self.state = ( MULTIPLIER*self.state + INCREMENT ) % MODULUS
+        return self.state/MODULUS
+
+    def samples( self, n:int ) -> array:
+        """The next n draws in one buffer, the generator continues after the last"""
+        if numpy is not None and n >= BLOCK:
+            return array( 'd', self.numpy_samples( n ).tobytes() )
+        values = array( 'd', bytes( 8*n ) )
+        r = self.state
+        for i in range( n ):
+            r = ( MULTIPLIER*r + INCREMENT ) % MODULUS
+            values[i] = r/MODULUS
+        self.state = r
+        return values
+
+    def numpy_samples( self, n:int ):
+        if RandomNumbers.JUMPS is None:
+            RandomNumbers.JUMPS = jump_table( BLOCK )
+        factors, offsets = RandomNumbers.JUMPS
+        modulus = numpy.uint64( MODULUS )
+        half = numpy.uint64( HALF )
+        states = numpy.empty( n, dtype=numpy.uint64 )
+        r = self.state
+        for start in range( 0, n, BLOCK ):
+            count = min( BLOCK, n - start )
+            # A·r mod m as (A·high mod m)·10⁵ + A·low, every product below 2⁶⁴
+            high, low = numpy.uint64( r // HALF ), numpy.uint64( r % HALF )
+            block = ( factors[ :count ]*high % modulus )*half % modulus
+            block = ( block + factors[ :count ]*low % modulus + offsets[ :count ] ) % modulus
+            states[ start:start + count ] = block
+            r = int( block[-1] )
+        self.state = r
+        return states/float( MODULUS )
@@ -0,0 +1,71 @@
+"""
+Many independent calculator sessions in one process.
+A session is a bare RPN_Engine, no Textual objects at all. The keymap and
+every other operation table are class attributes shared by all sessions,
+the per session state lives in slots and matrices are only allocated once a
+session uses them.
+"""
+
+import itertools
+
+try:
+    from .rpn_engine import RPN_Engine
+except ImportError:
+    from rpn_engine import RPN_Engine
+
+
+class SessionPool:
+    """Sessions keyed by id, with create, snapshot, restore and clone"""
+
+    def __init__( self, engine_class=RPN_Engine ) -> None:
+        self.engine_class = engine_class
+        self.sessions = {}
+        self._ids = itertools.count( 1 )
+
+    def __len__( self ) -> int:
+        return len( self.sessions )
+
+    def __contains__( self, session_id ) -> bool:
+        return session_id in self.sessions
+
+    def __getitem__( self, session_id ) -> RPN_Engine:
+        return self.sessions[ session_id ]
+
+    def new_id( self ) -> int:
+        session_id = next( self._ids )
+        while session_id in self.sessions:
+            session_id = next( self._ids )
+        return session_id
+
+    def create( self, session_id=None ):
+        """Start a session in the power on state, returns its id"""
+        if session_id is None:
+            session_id = self.new_id()
+        self.sessions[ session_id ] = self.engine_class()
+        return session_id
+
+    def clone( self, session_id, new_id=None ):
+        """Start a session as a copy of another one, returns the new id"""
+        if new_id is None:
+            new_id = self.new_id()
+        self.sessions[ new_id ] = self.sessions[ session_id ].clone()
+        return new_id
+
+    def snapshot( self, session_id ) -> RPN_Engine:
+        """A detached copy of the session to restore later"""
+        return self.sessions[ session_id ].clone()
+
+    def restore( self, session_id, snapshot:RPN_Engine ) -> None:
+        self.sessions[ session_id ] = snapshot.clone()
+
+    def close( self, session_id ) -> None:
+        del self.sessions[ session_id ]
+
+    def press( self, session_id, key:str ) -> str:
+        """Press a key in a session and return its display"""
+        engine = self.sessions[ session_id ]
+        engine.press( key )
+        return engine.display()
+
+    def run( self, session_id, keys ) -> float:
+        return self.sessions[ session_id ].run( keys )
@@ -0,0 +1,143 @@
+"""
+Root finder behind f SOLVE.
+Like the 15c it starts from two estimates, searches outwards with secant
+steps until the function changes sign and then closes the bracket with
+Brent's inverse quadratic, secant and bisection hybrid. Evaluations are
+cached for the duration of a solve.
+"""
+
+import math
+
+EPSILON = 2.0**-52
+
+
+class NoRoot( ArithmeticError ):
+    """SOLVE gave up without finding a sign change"""
+
+
+class CachedFunction:
+    """Memoizes f(x) within one solve and counts the real evaluations"""
+
+    def __init__( self, func ) -> None:
+        self.func = func
+        self.cache = {}
+        self.evaluations = 0
+
+    def __call__( self, x:float ) -> float:
+        try:
+            return self.cache[ x ]
+        except KeyError:
+            pass
+        self.evaluations += 1
+        value = self.cache[ x ] = self.func( x )
+        return value
+
+    def safe( self, x:float ):
+        """f(x), or None where the function fails"""
+        try:
+            return self( x )
+        except ( ArithmeticError, ValueError ):
+            self.cache[ x ] = None
+            return None
+
+
+def opposite( fa:float, fb:float ) -> bool:
+    return ( fa < 0 ) != ( fb < 0 )
+
+
+def bracket( f:CachedFunction, a:float, b:float, fa:float, fb:float, max_evaluations:int ) -> tuple:
+    """Search outwards from a and b until f changes sign"""
+    attempts = 0
+    while not opposite( fa, fb ):
+        attempts += 1
+        if f.evaluations >= max_evaluations or attempts > max_evaluations:
+            raise NoRoot( "no sign change found" )
+        width = b - a
+        candidates = []
+        if fa != fb:
+            secant = b - fb*width/( fb - fa )
+            if math.isfinite( secant ) and secant not in ( a, b ):
+                candidates.append( secant )
+        candidates += [ b + k*width for k in ( 1, 4, 16 ) ]
+        candidates += [ a - k*width for k in ( 1, 4, 16 ) ]
+        for x in candidates:
+            fx = f.safe( x )
+            if fx is None:
+                continue
+            if fx == 0 or opposite( fx, fb ):
+                return b, x, fb, fx
+            if abs( fx ) < abs( fb ):
+                # the secant is making progress, follow it before expanding
+                break
+        # carry on from the two points closest to a root
+        points = sorted( ( abs( fx ), x, fx ) for x, fx in f.cache.items() if fx is not None )
+        ( _, a, fa ), ( _, b, fb ) = points[1], points[0]
+        if a == b:
+            raise NoRoot( "estimates collapsed" )
+    return a, b, fa, fb
+
+
+def brent( f:CachedFunction, a:float, b:float, fa:float, fb:float, tolerance:float, max_evaluations:int, progress=None ) -> tuple:
+    """Close a sign change bracket [a, b], returning (root, previous estimate, f(root))"""
+    c, fc = b, fb
+    d = e = b - a
+    while True:
+        if ( fb > 0 and fc > 0 ) or ( fb < 0 and fc < 0 ):
+            c, fc = a, fa
+            d = e = b - a
+        if abs( fc ) < abs( fb ):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol = 2*EPSILON*abs( b ) + 0.5*tolerance
+        half = 0.5*( c - b )
+        if abs( half ) <= tol or fb == 0:
+            return b, a, fb
+        if f.evaluations >= max_evaluations:
+            raise NoRoot( "no convergence" )
+        if abs( e ) >= tol and abs( fa ) > abs( fb ):
+            s = fb/fa
+            if a == c:
+                p = 2*half*s
+                q = 1 - s
+            else:
+                q = fa/fc
+                r = fb/fc
+                p = s*( 2*half*q*( q - r ) - ( b - a )*( r - 1 ) )
+                q = ( q - 1 )*( r - 1 )*( s - 1 )
+            if p > 0:
+                q = -q
+            p = abs( p )
+            if 2*p < min( 3*half*q - abs( tol*q ), abs( e*q ) ):
+                e = d
+                d = p/q
+            else:
+                d = e = half
+        else:
+            d = e = half
+        a, fa = b, fb
+        b += d if abs( d ) > tol else math.copysign( tol, half )
+        fb = f( b )
+        if progress is not None:
+            progress( b )
+
+
+def solve( func, a:float, b:float, tolerance:float, progress=None, max_evaluations:int=200 ) -> tuple:
+    """Find a root of func from the estimates a and b.
+
+    Stops once the bracket is narrower than tolerance, which callers set to
+    the resolution of the current display. Returns (root, previous estimate,
+    f(root), evaluation count).
+    """
+    f = CachedFunction( func )
+    if a == b:
+        b = a + ( abs( a )*1e-3 or 1e-3 )
+    fa, fb = f.safe( a ), f.safe( b )
+    if fa is None or fb is None:
+        raise NoRoot( "estimate outside the function domain" )
+    if fa == 0:
+        return a, b, fa, f.evaluations
+    if fb == 0:
+        return b, a, fb, f.evaluations
+    a, b, fa, fb = bracket( f, a, b, fa, fb, max_evaluations )
+    root, previous, value = brent( f, a, b, fa, fb, tolerance, max_evaluations, progress )
+    return root, previous, value, f.evaluations
@@ -0,0 +1,192 @@
+"""
+Σ+ statistics for the 15c engine.
+Instead of the raw sums Σx, Σx², Σy, Σy², Σxy the accumulator keeps running
+means and centered second moments, updated with Welford's method in O(1) per
+entry, so variances and the regression do not cancel away for data with a
+large offset. Bulk ingest reads x,y pairs in chunks, reduces each chunk with
+a two-pass computation and merges it with Chan's pairwise update.
+"""
+
+import math
+import operator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from .rpn_program import RPN_Error
+except ImportError:
+    from rpn_program import RPN_Error
+
+
+def chunk_moments( xs:list, ys:list ) -> tuple:
+    """(n, mean x, mean y, M2 x, M2 y, C xy) of one chunk, two-pass"""
+    n = len( xs )
+    if numpy is not None:
+        x = numpy.array( xs, dtype=float )
+        y = numpy.array( ys, dtype=float )
+        mean_x, mean_y = x.mean(), y.mean()
+        x -= mean_x
+        y -= mean_y
+        return n, float( mean_x ), float( mean_y ), float( x @ x ), float( y @ y ), float( x @ y )
+    mean_x = math.fsum( xs )/n
+    mean_y = math.fsum( ys )/n
+    dxs = [ x - mean_x for x in xs ]
+    dys = [ y - mean_y for y in ys ]
+    return ( n, mean_x, mean_y, math.fsum( map( operator.mul, dxs, dxs ) ),
+             math.fsum( map( operator.mul, dys, dys ) ), math.fsum( map( operator.mul, dxs, dys ) ) )
+
+
+class Statistics:
+    """Running moments of the x,y pairs entered with Σ+"""
+
+    __slots__ = ( "n", "mean_x", "mean_y", "m2_x", "m2_y", "c_xy" )
+
+    def __init__( self ) -> None:
+        self.clear()
+
+    def clear( self ) -> None:
+        self.n = 0
+        self.mean_x = self.mean_y = 0.0
+        self.m2_x = self.m2_y = self.c_xy = 0.0
+
+    def copy( self ) -> 'Statistics':
+        other = Statistics.__new__( Statistics )
+        other.n, other.mean_x, other.mean_y = self.n, self.mean_x, self.mean_y
+        other.m2_x, other.m2_y, other.c_xy = self.m2_x, self.m2_y, self.c_xy
+        return other
+
+    def moments( self ) -> tuple:
+        return self.n, self.mean_x, self.mean_y, self.m2_x, self.m2_y, self.c_xy
+
+    def assign( self, n:int, mean_x:float, mean_y:float, m2_x:float, m2_y:float, c_xy:float ) -> None:
+        self.n, self.mean_x, self.mean_y = n, mean_x, mean_y
+        self.m2_x, self.m2_y, self.c_xy = m2_x, m2_y, c_xy
+
+    def add( self, x:float, y:float ) -> None:
+        n = self.n + 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx/n
+        self.mean_y += dy/n
+        self.m2_x += dx*( x - self.mean_x )
+        self.m2_y += dy*( y - self.mean_y )
+        self.c_xy += dx*( y - self.mean_y )
+        self.n = n
+
+    def remove( self, x:float, y:float ) -> None:
+        """Σ-, the exact inverse of add"""
+        n = self.n - 1
+        if n <= 0:
+            self.clear()
+            return
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x -= dx/n
+        self.mean_y -= dy/n
+        self.m2_x -= dx*( x - self.mean_x )
+        self.m2_y -= dy*( y - self.mean_y )
+        self.c_xy -= ( x - self.mean_x )*dy
+        self.n = n
+
+    def merge( self, n:int, mean_x:float, mean_y:float, m2_x:float, m2_y:float, c_xy:float ) -> None:
+        """Combine with the moments of another sample"""
+        if not n:
+            return
+        total = self.n + n
+        dx = mean_x - self.mean_x
+        dy = mean_y - self.mean_y
+        weight = self.n*n/total
+        self.mean_x += dx*n/total
+        self.mean_y += dy*n/total
+        self.m2_x += m2_x + dx*dx*weight
+        self.m2_y += m2_y + dy*dy*weight
+        self.c_xy += c_xy + dx*dy*weight
+        self.n = total
+
+    def unmerge( self, n:int, mean_x:float, mean_y:float, m2_x:float, m2_y:float, c_xy:float ) -> None:
+        """Take out the moments of a sample merged before, the exact inverse of merge"""
+        rest = self.n - n
+        if rest <= 0:
+            self.clear()
+            return
+        total = self.n
+        rest_x = ( total*self.mean_x - n*mean_x )/rest
+        rest_y = ( total*self.mean_y - n*mean_y )/rest
+        dx = mean_x - rest_x
+        dy = mean_y - rest_y
+        weight = rest*n/total
+        self.mean_x, self.mean_y = rest_x, rest_y
+        self.m2_x -= m2_x + dx*dx*weight
+        self.m2_y -= m2_y + dy*dy*weight
+        self.c_xy -= c_xy + dx*dy*weight
+        self.n = rest
+
+    def ingest( self, lines, chunk:int=1 << 16 ) -> int:
+        """Accumulate 'x,y' or 'x y' lines, a single value is x with y = 0.
+        Returns the number of pairs read."""
+        count = 0
+        xs, ys = [], []
+        for line in lines:
+            fields = line.replace( ",", " " ).split()
+            if not fields or fields[0].startswith( "#" ):
+                continue
+            xs.append( float( fields[0] ) )
+            ys.append( float( fields[1] ) if len( fields ) > 1 else 0.0 )
+            if len( xs ) >= chunk:
+                self.merge( *chunk_moments( xs, ys ) )
+                count += len( xs )
+                xs, ys = [], []
+        if xs:
+            self.merge( *chunk_moments( xs, ys ) )
+            count += len( xs )
+        return count
+
+    def extend( self, xs, ys ) -> None:
+        """Accumulate the pairs of two equally long sequences at once"""
+        if len( xs ):
+            self.merge( *chunk_moments( xs, ys ) )
+
+    def discard( self, xs, ys ) -> None:
+        """Σ- of the pairs of two equally long sequences at once"""
+        if len( xs ):
+            self.unmerge( *chunk_moments( xs, ys ) )
+
+    def sums( self ) -> tuple:
+        """The 15c summation registers R2 to R7: n, Σx, Σx², Σy, Σy², Σxy"""
+        n = self.n
+        sum_x = n*self.mean_x
+        sum_y = n*self.mean_y
+        return ( float( n ), sum_x, self.m2_x + sum_x*self.mean_x, sum_y,
+                 self.m2_y + sum_y*self.mean_y, self.c_xy + sum_x*self.mean_y )
+
+    def require( self, n:int ) -> None:
+        if self.n < n:
+            raise RPN_Error( 2, "not enough statistics data" )
+
+    def mean( self ) -> tuple:
+        self.require( 1 )
+        return self.mean_x, self.mean_y
+
+    def std_dev( self ) -> tuple:
+        """Sample standard deviations (sx, sy)"""
+        self.require( 2 )
+        n = self.n - 1
+        return math.sqrt( max( self.m2_x, 0.0 )/n ), math.sqrt( max( self.m2_y, 0.0 )/n )
+
+    def linear_regression( self ) -> tuple:
+        """(slope, intercept) of the least squares line y = slope·x + intercept"""
+        self.require( 2 )
+        if self.m2_x <= 0:
+            raise RPN_Error( 2, "all x values are equal" )
+        slope = self.c_xy/self.m2_x
+        return slope, self.mean_y - slope*self.mean_x
+
+    def estimate( self, x:float ) -> tuple:
+        """(ŷ at x, correlation coefficient r)"""
+        slope, intercept = self.linear_regression()
+        if self.m2_y <= 0:
+            raise RPN_Error( 2, "all y values are equal" )
+        return slope*x + intercept, self.c_xy/math.sqrt( self.m2_x*self.m2_y )
@@ -0,0 +1,172 @@
+"""
+Vectors for the 15c engine: a column of values in X or Y, loaded from a file,
+that every unary and binary key transforms in one pass. Elements live in one
+contiguous array('d') that is never modified, each result is a new vector.
+With NumPy a key is one ufunc over a view of the buffer, without it a tight
+map over the array. Elements where a function is undefined become NaN, so
+one bad measurement does not stop the column.
+"""
+
+import math
+from array import array
+from itertools import repeat
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from .rpn_format import N_DIGITS, SEPARATORS, lcd_text
+    from .rpn_numbers import FLOAT, NAN, QUARTER_TURNS
+    from .rpn_program import RPN_Error
+except ImportError:
+    from rpn_format import N_DIGITS, SEPARATORS, lcd_text
+    from rpn_numbers import FLOAT, NAN, QUARTER_TURNS
+    from rpn_program import RPN_Error
+
+
+class Vector:
+    """A column of floats on the stack, shown as its first element and its length"""
+
+    __slots__ = ( "data", )
+
+    def __init__( self, data:array ) -> None:
+        self.data = data
+
+    def __len__( self ) -> int:
+        return len( self.data )
+
+    def descriptor( self, notation:str="FIX", digits:int=4 ) -> str:
+        """LCD text: the first element from the left, the length in the last digit cells"""
+        length = str( len( self.data ) )
+        width = N_DIGITS - len( length ) - 1
+        text = lcd_text( self.data[0], notation, digits, width ) if self.data and width >= 4 else ""
+        cells = sum( 1 for char in text if char not in SEPARATORS )
+        return text + " "*( width - cells + 1 ) + length
+
+    def view( self ):
+        return numpy.frombuffer( self.data, dtype=float )
+
+
+def read_vector( lines, column:int=0 ) -> Vector:
+    """A vector from one value per line, or from column of 'x,y' or 'x y' lines, # starts a comment.
+    A line without that number is a ValueError naming the line."""
+    data = array( 'd' )
+    append = data.append
+    for number, line in enumerate( lines, 1 ):
+        fields = line.replace( ",", " " ).split()
+        if not fields or fields[0].startswith( "#" ):
+            continue
+        try:
+            append( float( fields[ column ] ) )
+        except ( IndexError, ValueError ):
+            raise ValueError( f"line {number}: no number in field {column} of {line.strip()!r}" ) from None
+    return Vector( data )
+
+
+def write_vector( vector:Vector, file ) -> None:
+    """One element per line, each written so that it reads back exactly"""
+    file.writelines( f"{value!r}\n" for value in vector.data )
+
+
+def guarded( function ):
+    """function of floats giving NaN where it raises"""
+    def element( *args ) -> float:
+        try:
+            return function( *args )
+        except ( ArithmeticError, ValueError, RPN_Error ):
+            return NAN
+    return element
+
+
+def looped( function, *columns ) -> Vector:
+    """function over the columns in one map, element by element only when some raise"""
+    try:
+        return Vector( array( 'd', map( function, *columns ) ) )
+    except ( ArithmeticError, ValueError, RPN_Error ):
+        return Vector( array( 'd', map( guarded( function ), *columns ) ) )
+
+
+def from_numpy( values ) -> Vector:
+    """A vector of a NumPy result, infinities from poles and overflows become NaN"""
+    values[ ~numpy.isfinite( values ) ] = NAN
+    return Vector( array( 'd', values.tobytes() ) )
+
+
+if numpy is not None:
+    UFUNCS = {
+        "add": numpy.add,
+        "subtract": numpy.subtract,
+        "multiply": numpy.multiply,
+        "divide": numpy.true_divide,
+        "power": numpy.power,
+        "sqrt": numpy.sqrt,
+        "square": numpy.square,
+        "exp": numpy.exp,
+        "ln": numpy.log,
+        "ten_power": lambda x: numpy.power( 10.0, x ),
+        "log10": numpy.log10,
+        "reciprocal": lambda x: 1.0/x,
+        "absolute": numpy.absolute,
+        "negate": numpy.negative,
+        "fraction": lambda x: numpy.modf( x )[0],
+        "integer": numpy.trunc,
+    }
+else:
+    UFUNCS = {}
+
+
+def vector_function( name:str, x:Vector ) -> Vector:
+    """The float backend function name of every element"""
+    ufunc = UFUNCS.get( name )
+    if ufunc is not None:
+        with numpy.errstate( all="ignore" ):
+            return from_numpy( numpy.asarray( ufunc( x.view() ), dtype=float ) )
+    return looped( getattr( FLOAT, name ), x.data )
+
+
+def vector_operation( name:str, y, x ) -> Vector:
+    """The float backend operation name element by element, a scalar in X or Y applies to every one"""
+    if isinstance( y, Vector ) and isinstance( x, Vector ) and len( y ) != len( x ):
+        raise RPN_Error( 11, "vector lengths do not match" )
+    ufunc = UFUNCS.get( name )
+    if ufunc is not None:
+        with numpy.errstate( all="ignore" ):
+            values = ufunc( y.view() if isinstance( y, Vector ) else float( y ),
+                            x.view() if isinstance( x, Vector ) else float( x ) )
+        return from_numpy( numpy.asarray( values, dtype=float ) )
+    function = getattr( FLOAT, name )
+    if isinstance( y, Vector ) and isinstance( x, Vector ):
+        return looped( function, y.data, x.data )
+    if isinstance( y, Vector ):
+        return looped( function, y.data, repeat( float( x ) ) )
+    return looped( function, repeat( float( y ) ), x.data )
+
+
+def vector_circular( name:str, x:Vector, angle:str ) -> Vector:
+    """sin, cos or tan of every element in the angle mode, reduced exactly like single numbers"""
+    if numpy is None:
+        function = getattr( FLOAT, name )
+        return looped( lambda value: function( value, angle ), x.data )
+    values = x.view()
+    quarter = QUARTER_TURNS.get( angle )
+    with numpy.errstate( all="ignore" ):
+        if quarter is None:
+            turns, r = numpy.zeros( len( values ), dtype=numpy.int64 ), values
+        else:
+            rounded = numpy.round( values/quarter )
+            turns, r = rounded.astype( numpy.int64 ) % 4, ( values - quarter*rounded )*( math.pi/( 2*quarter ) )
+        odd = turns % 2 == 1
+        if name == "tangent":
+            tangent = numpy.tan( r )
+            result = numpy.where( odd, -1.0/tangent, tangent )
+        else:
+            sine, cosine = numpy.sin( r ), numpy.cos( r )
+            if name == "sine":
+                value, negative = numpy.where( odd, cosine, sine ), turns >= 2
+            else:
+                value, negative = numpy.where( odd, sine, cosine ), ( turns + 1 ) % 4 >= 2
+            # 0 - value keeps a zero positive
+            result = numpy.where( negative, 0.0 - value, value )
+    return from_numpy( result )
@@ -0,0 +1,59 @@
+"""
+Batch mode: every line on a fresh engine, results in input order whatever
+the number of worker processes, and malformed lines reported, not raised.
+"""
+
+import io
+
+import pytest
+
+from textual_rpn15c.rpn_batch import error_text, evaluate_line, evaluate_lines, run_batch
+from textual_rpn15c.rpn_numbers import NUMBERS
+
+
+@pytest.mark.parametrize( "line, result", [
+    ( "2 3 + sqrt", "2.23606797749979" ),
+    ( "digit-2 enter digit-3 addition", "5.0" ),
+    ( "2 digit-3 multiplication", "6.0" ),
+    ( "1 0 /", "Error: ZeroDivisionError: float division by zero" ),
+    ( "2 3x +", "Error: ValueError: token 2 '3x' is not a number, key or word" ),
+] )
+def test_evaluate_line( line:str, result:str ) -> None:
+    assert evaluate_line( line ) == result
+
+
+@pytest.mark.parametrize( "name", sorted( NUMBERS ) )
+def test_malformed_token_is_named_by_every_backend( name:str ) -> None:
+    assert evaluate_line( "2 3x +", name ) == "Error: ValueError: token 2 '3x' is not a number, key or word"
+
+
+def test_decimal_backend() -> None:
+    assert evaluate_line( "0.1 0.2 +", "decimal" ) == "0.3"
+    assert evaluate_line( "1 0 /", "decimal" ).startswith( "Error" )
+
+
+def test_lines_are_independent() -> None:
+    lines = [ "digit-5 sto digit-1 digit-7", "rcl digit-1" ]
+    assert list( evaluate_lines( lines, jobs=1 ) ) == [ "7.0", "0.0" ]
+
+
+@pytest.mark.parametrize( "jobs", [ 1, 2 ] )
+def test_results_in_input_order( jobs:int ) -> None:
+    lines = [ f"{n} 1 +\n" for n in range( 50 ) ] + [ "  \n" ]
+    results = list( evaluate_lines( lines, jobs=jobs, chunk=3 ) )
+    assert results == [ f"{n + 1.0}" for n in range( 50 ) ]
+
+
+def test_run_batch_counts_failures( tmp_path ) -> None:
+    first, second = tmp_path/"first", tmp_path/"second"
+    first.write_text( "2 2 *\nnonsense\n" )
+    second.write_text( "\n1 0 /\n9 sqrt\n" )
+    out = io.StringIO()
+    assert run_batch( [ str( first ), str( second ) ], jobs=1, out=out ) == 2
+    lines = out.getvalue().splitlines()
+    assert lines[0] == "4.0" and lines[3] == "3.0"
+    assert all( line.startswith( "Error" ) for line in lines[1:3] )
+
+
+def test_error_text() -> None:
+    assert error_text( ValueError( "bad" ) ) == "Error: ValueError: bad"
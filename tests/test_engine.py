@@ -0,0 +1,221 @@
+"""
+Behaviour of the headless engine: keystrokes in, X and the display out, on
+every numeric backend. Errors a user can provoke must be calculator errors,
+never a Python exception that would end the TUI.
+"""
+
+import math
+from decimal import Decimal
+
+import pytest
+
+from textual_rpn15c.keypad import KEY_IDS, keystrokes
+from textual_rpn15c.rpn_engine import RPN_Engine, RPN_Error
+from textual_rpn15c.rpn_matrix import Matrix
+from textual_rpn15c.rpn_numbers import NUMBERS
+
+# what a key may raise, the TUI shows these as errors on the LCD
+CALCULATOR_ERRORS = ( RPN_Error, ArithmeticError, ValueError )
+# keys that wait for an argument key
+PREFIXES = ( [ "sto" ], [ "rcl" ], [ "gto" ], [ "gsb" ], [ "shift-f", "sin" ], [ "shift-f", "chs" ],
+             [ "shift-g", "subtraction" ], [ "shift-f", "digit-5" ], [ "shift-f", "division" ],
+             [ "shift-f", "multiplication" ], [ "sto", "addition" ], [ "rcl", "shift-g" ] )
+# DIM A 2×2, fill it with 4 7 2 6 through R0 and R1, recall its descriptor
+MATRIX_A = ( "digit-2 enter digit-2 shift-f sin sqrt-x shift-f chs digit-1 "
+             "digit-4 sto sqrt-x digit-7 sto sqrt-x digit-2 sto sqrt-x digit-6 sto sqrt-x rcl chs sqrt-x" )
+
+
+def run( engine:RPN_Engine, text:str ):
+    """X after pasting text: numbers, expression words and key ids"""
+    return engine.run( keystrokes( text ) )
+
+
+@pytest.fixture( params=sorted( NUMBERS ) )
+def numbers( request ):
+    return NUMBERS[ request.param ]
+
+
+def test_arithmetic( numbers ) -> None:
+    engine = RPN_Engine( numbers )
+    assert run( engine, "3 2 + 4 *" ) == 20
+    assert run( engine, "2 sqrt sq" ) == pytest.approx( 2 )
+    assert engine.display() == "2.0000"
+
+
+def test_stack_lift_and_roll() -> None:
+    engine = RPN_Engine()
+    run( engine, "1 2 3 4 enter" )
+    state = engine.state
+    assert ( state.X, state.Y, state.Z, state.T ) == ( 4, 3, 2, 1 )
+    run( engine, "rdn" )
+    assert ( state.X, state.Y, state.Z, state.T ) == ( 3, 2, 1, 4 )
+    run( engine, "swap" )
+    assert ( state.X, state.Y ) == ( 2, 3 )
+
+
+def test_decimal_backend_is_exact_in_ten_digits() -> None:
+    engine = RPN_Engine( NUMBERS[ "decimal" ] )
+    assert run( engine, "0.1 0.2 +" ) == Decimal( "0.3" )
+    assert run( engine, "2 3 /" ) == Decimal( "0.6666666667" )
+
+
+def test_sin_180_degrees_is_zero( numbers ) -> None:
+    engine = RPN_Engine( numbers )
+    assert run( engine, "180 sin" ) == 0
+    assert run( engine, "90 cos" ) == 0
+
+
+@pytest.mark.parametrize( "shift", [ "", "shift-f", "shift-g" ] )
+def test_every_key_at_power_on( numbers, shift:str ) -> None:
+    """The empty registers hold NaN, no key may hang or leak a Python error on them"""
+    for mode in ( "digit-7", "digit-8", "digit-9" ):
+        for key in sorted( KEY_IDS ):
+            engine = RPN_Engine( numbers )
+            engine.run( [ "shift-g", mode ] )
+            try:
+                engine.run( [ shift, key ] if shift else [ key ] )
+            except CALCULATOR_ERRORS:
+                pass
+
+
+@pytest.mark.parametrize( "prefix", PREFIXES, ids=" ".join )
+def test_prefix_keys_at_power_on( numbers, prefix:list ) -> None:
+    for key in sorted( KEY_IDS ):
+        engine = RPN_Engine( numbers )
+        try:
+            engine.run( prefix + [ key ] )
+        except CALCULATOR_ERRORS:
+            pass
+
+
+@pytest.mark.parametrize( "keys", [
+    "sin", "cos", "tan", "shift-g sto", "wye-x", "digit-2 wye-x", "shift-f digit-0", "sum", "shift-g sum",
+    "sto digit-1", "sto addition digit-1", "shift-f digit-7", "sto enter",
+    "shift-g digit-8 sin", "digit-1 enter sto shift-g sqrt-x", "digit-1 enter rcl shift-g sqrt-x",
+    "shift-g subtraction digit-1", "shift-f tan", "shift-f addition",
+] )
+def test_descriptor_in_scalar_operation( numbers, keys:str ) -> None:
+    engine = RPN_Engine( numbers )
+    engine.run( MATRIX_A )
+    with pytest.raises( RPN_Error ) as error:
+        engine.run( keys )
+    assert error.value.code == 1
+
+
+def test_matrix_operations( numbers ) -> None:
+    engine = RPN_Engine( numbers )
+    engine.run( MATRIX_A )
+    assert engine.display().startswith( "A" )
+    assert engine.run( "shift-f chs digit-9" ) == pytest.approx( 10 )
+    engine.run( "rcl chs sqrt-x rcl chs sqrt-x shift-f chs digit-5" )
+    # Aᵀ·A into the RESULT matrix A
+    assert list( engine.matrices[ 'A' ].data ) == [ 20, 40, 40, 85 ]
+
+
+def test_matrix_5_needs_two_descriptors( numbers ) -> None:
+    engine = RPN_Engine( numbers )
+    with pytest.raises( RPN_Error ) as error:
+        engine.run( "digit-2 division subtraction shift-f chs digit-5" )
+    assert error.value.code == 1
+
+
+def test_matrix_system_solve() -> None:
+    engine = RPN_Engine()
+    engine.run( MATRIX_A )
+    # B = (1, 2)ᵀ, C = B ÷ A
+    engine.run( "digit-2 enter digit-1 shift-f sin exp-x shift-f chs digit-1 "
+                "digit-1 sto exp-x digit-2 sto exp-x shift-f eex ten-x "
+                "rcl chs exp-x rcl chs sqrt-x division" )
+    assert isinstance( engine.state.X, Matrix )
+    assert list( engine.matrices[ 'C' ].data ) == pytest.approx( [ -0.8, 0.6 ] )
+
+
+def program( engine:RPN_Engine, label:str, body:str ) -> None:
+    """Key in LBL label, body, RTN in program mode"""
+    engine.run( f"shift-g rtos shift-f sst {label} {body} shift-g gsb shift-g rtos" )
+
+
+def test_program_subroutine( numbers ) -> None:
+    engine = RPN_Engine( numbers )
+    program( engine, "sqrt-x", "shift-g sqrt-x digit-1 addition" )
+    assert engine.run( "digit-3 shift-f sqrt-x" ) == 10
+
+
+def test_missing_label() -> None:
+    with pytest.raises( RPN_Error ) as error:
+        RPN_Engine().run( "gto digit-9" )
+    assert error.value.code == 4
+
+
+def test_solve( numbers ) -> None:
+    engine = RPN_Engine( numbers )
+    program( engine, "sqrt-x", "shift-g sqrt-x digit-2 subtraction" )
+    root = engine.run( "digit-1 enter digit-2 shift-f division sqrt-x" )
+    assert float( root ) == pytest.approx( math.sqrt( 2 ), abs=1e-4 )
+
+
+def test_solve_without_root() -> None:
+    engine = RPN_Engine()
+    program( engine, "sqrt-x", "shift-g sqrt-x digit-1 addition" )
+    with pytest.raises( RPN_Error ) as error:
+        engine.run( "digit-1 enter digit-2 shift-f division sqrt-x" )
+    assert error.value.code == 8
+
+
+def test_integrate_follows_the_display_format( numbers ) -> None:
+    engine = RPN_Engine( numbers )
+    program( engine, "exp-x", "shift-g sqrt-x" )
+    value = engine.run( "digit-0 enter digit-3 shift-f multiplication exp-x" )
+    assert float( value ) == pytest.approx( 9, abs=5e-4 )
+    assert float( engine.state.Y ) <= 5e-4*3
+
+
+def test_statistics() -> None:
+    engine = RPN_Engine()
+    for y, x in ( ( 1, 2 ), ( 3, 4 ), ( 5, 6 ) ):
+        run( engine, f"{y} {x} sum" )
+    assert engine.state.X == 3
+    assert engine.run( "shift-g digit-0" ) == pytest.approx( 4 )
+    assert engine.state.Y == pytest.approx( 3 )
+    run( engine, "5 6 shift-g sum" )
+    assert engine.state.X == 2
+
+
+def test_random_is_repeatable() -> None:
+    first, second = RPN_Engine(), RPN_Engine()
+    draws = [ run( first, "0.5 sto enter ran ran" ) ]
+    draws.append( run( second, "0.5 sto enter ran ran" ) )
+    assert draws[0] == draws[1]
+    assert 0 <= draws[0] < 1
+
+
+def test_history_undo_redo() -> None:
+    engine = RPN_Engine()
+    engine.enable_history()
+    run( engine, "2 3 +" )
+    assert engine.value == 5
+    assert engine.undo()
+    assert engine.value == 3
+    assert engine.redo()
+    assert engine.value == 5
+
+
+def test_vector_keys_and_statistics( numbers ) -> None:
+    engine = RPN_Engine( numbers )
+    assert engine.load_vector( [ "1", "4", "# comment", "9" ] ) == 3
+    engine.run( "sqrt-x" )
+    assert list( engine.state.X.data ) == [ 1, 2, 3 ]
+    engine.run( "sum" )
+    assert engine.state.X == 3
+    with pytest.raises( RPN_Error ) as error:
+        engine.load_vector( [ "1", "x" ] )
+    assert "line 2" in str( error.value )
+
+
+def test_clone_is_independent() -> None:
+    engine = RPN_Engine()
+    run( engine, "7 sto 1" )
+    other = engine.clone()
+    run( other, "8 sto 1" )
+    assert engine.registers[1] == 7
+    assert other.registers[1] == 8
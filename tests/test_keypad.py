@@ -0,0 +1,43 @@
+"""
+Pasted and typed text to button ids: numbers, expression words and key ids.
+"""
+
+import pytest
+
+from textual_rpn15c.keypad import KEY_CODES, KEY_IDS, keystrokes, number_keys
+from textual_rpn15c.rpn_engine import RPN_Engine
+
+
+def test_every_key_has_a_code() -> None:
+    assert set( KEY_IDS ) <= set( KEY_CODES )
+    assert KEY_CODES[ "sqrt-x" ] == 11 and KEY_CODES[ "digit-7" ] == 7 and KEY_CODES[ "enter" ] == 36
+
+
+@pytest.mark.parametrize( "token, keys", [
+    ( "12", [ "digit-1", "digit-2" ] ),
+    ( "-1.5", [ "digit-1", "decimal", "digit-5", "chs" ] ),
+    ( "2e-3", [ "digit-2", "eex", "digit-3", "chs" ] ),
+    ( "1.2.3", None ),
+    ( "inf", None ),
+    ( "sin", None ),
+] )
+def test_number_keys( token:str, keys ) -> None:
+    assert number_keys( token ) == keys
+
+
+def test_enter_between_numbers_only() -> None:
+    assert keystrokes( "1 2 + 3 sqrt" ) == [ "digit-1", "enter", "digit-2", "addition", "digit-3", "sqrt-x" ]
+
+
+def test_words_and_key_ids() -> None:
+    assert keystrokes( "2 LN rcl" ) == [ "digit-2", "shift-g", "exp-x", "rcl" ]
+
+
+def test_unknown_token() -> None:
+    with pytest.raises( ValueError, match="cannot enter 'foo'" ):
+        keystrokes( "1 foo" )
+
+
+def test_keymap_accepts_what_the_engine_can_press() -> None:
+    engine = RPN_Engine()
+    assert engine.run( keystrokes( "2 1e1 * ln", RPN_Engine.KEYMAP ) ) == pytest.approx( 2.995732273553991 )
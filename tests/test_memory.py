@@ -0,0 +1,144 @@
+"""
+Continuous Memory: a calculator saved to its snapshot and journal comes back
+as it was left, and a torn or foreign file never gets half applied.
+"""
+
+import math
+import os
+
+import pytest
+
+from textual_rpn15c.keypad import keystrokes
+from textual_rpn15c.rpn_engine import RPN_Engine
+from textual_rpn15c.rpn_memory import RECORD, ContinuousMemory
+from textual_rpn15c.rpn_numbers import NUMBERS
+
+# DIM A 2×1 with 4 and 7, a program, statistics, FIX 2, RAD and RAN# seeded
+SETUP = ( "digit-2 enter digit-1 shift-f sin sqrt-x shift-f chs digit-1 digit-4 sto sqrt-x digit-7 sto sqrt-x "
+          "shift-g rtos shift-f sst sqrt-x shift-g sqrt-x shift-g gsb shift-g rtos "
+          "digit-3 enter digit-5 sum digit-2 shift-f digit-7 shift-g digit-8 "
+          "digit-5 sto enter digit-4 digit-2 sto digit-3 rcl chs sqrt-x" )
+
+
+def machine( engine:RPN_Engine ) -> tuple:
+    """Everything Continuous Memory keeps, comparable between engines"""
+    state = engine.state
+    stack = tuple( value.name if hasattr( value, "name" ) else float( value )
+                   for value in ( state.X, state.Y, state.Z, state.T, state.last_X ) )
+    matrices = { name: ( matrix.rows, matrix.cols, list( matrix.data ) )
+                 for name, matrix in engine.matrices.items() if matrix.rows }
+    return ( stack, state.notation, state.fix, state.angle, engine.result_name, list( map( float, engine.registers ) ),
+             matrices, engine.statistics.moments(), engine.program, engine.random.state )
+
+
+def same( a:tuple, b:tuple ) -> bool:
+    return repr( a ) == repr( b )
+
+
+@pytest.fixture
+def path( tmp_path ) -> str:
+    return os.path.join( tmp_path, "state", "memory" )
+
+
+def restored( path:str, numbers=NUMBERS[ "float" ] ) -> RPN_Engine:
+    engine = RPN_Engine( numbers )
+    memory = ContinuousMemory( path )
+    assert memory.load( engine )
+    memory.close()
+    return engine
+
+
+@pytest.mark.parametrize( "name", sorted( NUMBERS ) )
+def test_snapshot_round_trip( path:str, name:str ) -> None:
+    engine = RPN_Engine( NUMBERS[ name ] )
+    engine.run( SETUP )
+    memory = ContinuousMemory( path )
+    memory.save( engine )
+    memory.close()
+    assert same( machine( restored( path, NUMBERS[ name ] ) ), machine( engine ) )
+
+
+def test_journal_round_trip( path:str ) -> None:
+    """Saved after every key like the TUI: journal groups, with new snapshots for DIM and program edits"""
+    engine = RPN_Engine()
+    memory = ContinuousMemory( path )
+    for key in SETUP.split():
+        engine.press( key )
+        memory.save( engine )
+    engine.run( keystrokes( "12.5 sto 1 1 2 +" ) )
+    memory.save( engine )
+    memory.close()
+    assert os.path.getsize( path + ".journal" ) > RECORD.size
+    assert same( machine( restored( path ) ), machine( engine ) )
+
+
+def test_torn_group_is_dropped( path:str ) -> None:
+    engine = RPN_Engine()
+    memory = ContinuousMemory( path )
+    engine.run( keystrokes( "7 enter" ) )
+    memory.save( engine )
+    engine.run( keystrokes( "8 sto 2" ) )
+    memory.save( engine )
+    expected = machine( engine )
+    engine.run( keystrokes( "9 sto 3" ) )
+    memory.save( engine )
+    memory.close()
+    journal = path + ".journal"
+    complete = os.path.getsize( journal )
+    # a crash in the middle of the last group: its commit record never made it
+    os.truncate( journal, complete - RECORD.size - 3 )
+    engine = restored( path )
+    assert same( machine( engine ), expected )
+    assert os.path.getsize( journal ) < complete - RECORD.size
+
+
+def test_journal_of_another_generation_is_ignored( path:str ) -> None:
+    engine = RPN_Engine()
+    memory = ContinuousMemory( path )
+    memory.save( engine )
+    engine.run( keystrokes( "5 sto 1" ) )
+    memory.save( engine )
+    with open( path + ".journal", "rb" ) as journal:
+        old_journal = journal.read()
+    engine.run( keystrokes( "6 sto 1" ) )
+    memory.close( engine )
+    # the new snapshot with a journal left from before it
+    with open( path + ".journal", "wb" ) as journal:
+        journal.write( old_journal )
+    assert restored( path ).registers[1] == 6
+
+
+@pytest.mark.parametrize( "content", [ b"", b"not a snapshot", b"RPN15CS6" + bytes( 20 ) ] )
+def test_unusable_snapshot( path:str, content:bytes ) -> None:
+    os.makedirs( os.path.dirname( path ) )
+    with open( path, "wb" ) as snapshot:
+        snapshot.write( content )
+    engine = RPN_Engine()
+    engine.run( "digit-5 enter" )
+    assert not ContinuousMemory( path ).load( engine )
+    assert math.isnan( engine.state.X )
+
+
+def test_missing_memory( path:str ) -> None:
+    assert not ContinuousMemory( path ).load( RPN_Engine() )
+
+
+def test_vector_is_not_kept( path:str ) -> None:
+    engine = RPN_Engine()
+    engine.load_vector( [ "1", "2" ] )
+    memory = ContinuousMemory( path )
+    memory.save( engine )
+    memory.close()
+    assert math.isnan( restored( path ).state.X )
+
+
+def test_full_journal_is_compacted( path:str ) -> None:
+    engine = RPN_Engine()
+    memory = ContinuousMemory( path, journal_limit=4*RECORD.size )
+    memory.save( engine )
+    for n in range( 1, 10 ):
+        engine.run( keystrokes( f"{n} sto {n}" ) )
+        memory.save( engine )
+        assert os.path.getsize( path + ".journal" ) <= 16 + 8*RECORD.size
+    memory.close()
+    assert same( machine( restored( path ) ), machine( engine ) )
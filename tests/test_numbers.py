@@ -0,0 +1,160 @@
+"""
+Numeric building blocks below the engine: the backends, combinatorics,
+the RAN# generator, LCD formatting and the SOLVE and ∫ algorithms.
+"""
+
+import math
+from decimal import Decimal
+
+import pytest
+
+from textual_rpn15c.rpn_combinatorics import combinations, factorial, permutations
+from textual_rpn15c.rpn_format import lcd_text, tolerance
+from textual_rpn15c.rpn_integrate import NoConvergence, integrate
+from textual_rpn15c.rpn_numbers import NUMBERS
+from textual_rpn15c.rpn_program import RPN_Error
+from textual_rpn15c.rpn_random import RandomNumbers
+from textual_rpn15c.rpn_solve import NoRoot, solve
+
+
+@pytest.fixture( params=sorted( NUMBERS ) )
+def numbers( request ):
+    return NUMBERS[ request.param ]
+
+
+@pytest.mark.parametrize( "angle", [ "deg", "rad", "grad" ] )
+@pytest.mark.parametrize( "name", [ "sine", "cosine", "tangent" ] )
+def test_trigonometry_of_non_finite_x( numbers, angle:str, name:str ) -> None:
+    function = getattr( numbers, name )
+    with pytest.raises( RPN_Error ):
+        function( numbers.nan, angle )
+    with pytest.raises( RPN_Error ):
+        function( numbers.number( "inf" ) if numbers.name == "float" else Decimal( "Infinity" ), angle )
+
+
+def test_trigonometry_matches_math( numbers ) -> None:
+    for x in ( 0.5, 1, 3, -2.5, 100 ):
+        assert float( numbers.sine( numbers.number( x ), "rad" ) ) == pytest.approx( math.sin( x ), abs=1e-9 )
+        assert float( numbers.cosine( numbers.number( x ), "rad" ) ) == pytest.approx( math.cos( x ), abs=1e-9 )
+    assert float( numbers.tangent( numbers.number( 45 ), "deg" ) ) == pytest.approx( 1 )
+
+
+def test_decimal_rounds_half_up_to_its_digits() -> None:
+    decimal = NUMBERS[ "decimal" ]
+    assert decimal.divide( decimal.number( 1 ), decimal.number( 3 ) ) == Decimal( "0.3333333333" )
+    assert decimal.number( "2.0000000005" ) == Decimal( "2.000000001" )
+    assert NUMBERS[ "precise" ].divide( 1, 3 ) == Decimal( "0." + "3"*34 )
+
+
+def test_decimal_from_float_uses_the_shortest_repr() -> None:
+    assert NUMBERS[ "decimal" ].number( 0.1 ) == Decimal( "0.1" )
+
+
+def test_combinatorics_are_exact() -> None:
+    assert factorial( 5.0 ) == 120
+    assert factorial( 0.5 ) == pytest.approx( math.gamma( 1.5 ) )
+    assert permutations( 10.0, 3.0 ) == 720
+    assert combinations( 50.0, 25.0 ) == math.comb( 50, 25 )
+    precise = NUMBERS[ "precise" ]
+    assert precise.combinations( precise.number( 100 ), precise.number( 50 ) ) == math.comb( 100, 50 )
+    assert precise.factorial( precise.number( 30 ) ) == math.factorial( 30 )
+
+
+@pytest.mark.parametrize( "arguments", [ ( 3.0, 5.0 ), ( 2.5, 1.0 ), ( math.nan, 1.0 ), ( 5.0, math.inf ) ] )
+def test_combinatorics_domain( arguments:tuple ) -> None:
+    with pytest.raises( ValueError ):
+        combinations( *arguments )
+
+
+@pytest.mark.parametrize( "x", [ -3.0, math.nan, math.inf ] )
+def test_factorial_domain( x:float ) -> None:
+    with pytest.raises( ValueError ):
+        factorial( x )
+
+
+def test_factorial_overflow() -> None:
+    with pytest.raises( OverflowError ):
+        factorial( 171.0 )
+
+
+def test_random_sequence() -> None:
+    generator = RandomNumbers( 0.5 )
+    assert generator.value() == 0.5
+    draws = [ generator.next() for _ in range( 5 ) ]
+    assert len( set( draws ) ) == 5 and all( 0 <= draw < 1 for draw in draws )
+    again = RandomNumbers( 0.5 )
+    assert list( again.samples( 5 ) ) == draws
+    assert again.value() == draws[-1]
+    copy = again.copy()
+    assert copy.next() == again.next()
+
+
+def test_random_seed_keeps_ten_digits() -> None:
+    assert RandomNumbers( 1234567.891 ).state == 1234567891
+
+
+@pytest.mark.parametrize( "seed", [ math.nan, math.inf ] )
+def test_random_seed_must_be_finite( seed:float ) -> None:
+    with pytest.raises( RPN_Error ):
+        RandomNumbers( seed )
+
+
+@pytest.mark.parametrize( "number, notation, digits, text", [
+    ( 2.5, "FIX", 0, "3." ),
+    ( 0.5, "FIX", 0, "1." ),
+    ( -2.5, "FIX", 0, "-3." ),
+    ( 0.15, "FIX", 1, "0.2" ),
+    ( 1234567.25, "FIX", 1, "1,234,567.3" ),
+    ( 1e-5, "FIX", 4, "1.0000   -05" ),
+    ( 9.99995, "SCI", 3, "1.000    01" ),
+    ( 1.25, "SCI", 1, "1.3      00" ),
+    ( 999.95, "ENG", 3, "1.000    03" ),
+    ( 1e100, "FIX", 4, "9.9999   99" ),
+    ( math.nan, "FIX", 4, "0.0000" ),
+    ( Decimal( "2.5" ), "FIX", 0, "3." ),
+] )
+def test_lcd_text( number, notation:str, digits:int, text:str ) -> None:
+    assert lcd_text( number, notation, digits ) == text
+
+
+def test_tolerance_follows_the_display() -> None:
+    assert tolerance( 1234.0, "FIX", 2 ) == 0.005
+    assert tolerance( 1234.0, "SCI", 2 ) == pytest.approx( 5 )
+
+
+def test_solve() -> None:
+    root, previous, value, evaluations = solve( lambda x: x*x - 2, 1, 2, 1e-12 )
+    assert root == pytest.approx( math.sqrt( 2 ), abs=1e-12 )
+    assert abs( value ) < 1e-10
+    assert evaluations < 20
+
+
+def test_solve_searches_outwards() -> None:
+    root = solve( lambda x: math.log( x ) - 1, 5, 6, 1e-12 )[0]
+    assert root == pytest.approx( math.e )
+
+
+def test_solve_without_sign_change() -> None:
+    with pytest.raises( NoRoot ):
+        solve( lambda x: x*x + 1, 1, 2, 1e-9 )
+
+
+def test_integrate() -> None:
+    value, error, evaluations = integrate( math.sin, 0, math.pi, lambda magnitude: 5e-10 )
+    assert value == pytest.approx( 2, abs=1e-9 )
+    assert error <= 5e-10*math.pi
+    assert evaluations % 15 == 0
+
+
+def test_integrate_tolerance_scales_with_the_integrand() -> None:
+    def accuracy( magnitude:float ) -> float:
+        return tolerance( magnitude, "SCI", 2 )
+    small = integrate( math.sqrt, 0, 1, accuracy )
+    large = integrate( lambda x: 1e6*math.sqrt( x ), 0, 1, accuracy )
+    assert large[0] == pytest.approx( 1e6*small[0], rel=1e-3 )
+    assert large[2] == small[2]
+
+
+def test_integrate_gives_up() -> None:
+    with pytest.raises( NoConvergence ):
+        integrate( lambda x: 1/x if x else 0.0, -1, 2, lambda magnitude: 1e-12, max_evaluations=150 )